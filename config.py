@@ -47,10 +47,36 @@ class Config:
         "base": "⚡ Nhanh, độ chính xác trung bình",
         "small": "⚖️ Cân bằng tốc độ và chất lượng",
         "medium": "✨ Chất lượng cao (khuyến nghị)",
-        "large": "🎯 Chất lượng cao nhất, rất chậm"
+        "large": "🎯 Chất lượng cao nhất, rất chậm",
+        "base-int8": "🚀 base int8 (CPU): nhanh hơn ~1.5-2x, sai số tăng nhẹ",
+        "small-int8": "🚀 small int8 (CPU): nhanh hơn ~1.5-2x, sai số tăng nhẹ",
+        "medium-int8": "🚀 medium int8 (CPU): nhanh hơn ~1.5-2x, RAM ~1/3, sai số tăng nhẹ",
+        "large-int8": "🚀 large int8 (CPU): nhanh hơn ~1.5-2x, RAM ~1/3, sai số tăng nhẹ"
     }
     DEFAULT_MODEL = "medium"
     
+    # Model int8 (dynamic quantization các lớp Linear, chỉ chạy CPU)
+    WHISPER_QUANTIZED_MODELS = ["base-int8", "small-int8", "medium-int8", "large-int8"]
+    QUANTIZED_MODEL_DIR = os.path.join(os.path.expanduser("~"), ".cache", "video_translator", "models")
+    
+    # Model Pool (nhiều model dùng chung toàn process)
+    MODEL_POOL_MAX_MB = 8192  # Giới hạn RAM cho các model đang giữ, vượt quá sẽ bỏ model ít dùng nhất
+    MODEL_IDLE_TIMEOUT = 600  # Unload model không dùng sau N giây (0 = không unload)
+    MODEL_POOL_JANITOR_INTERVAL = 30  # Chu kỳ kiểm tra model rảnh (seconds)
+    PRELOAD_MODEL_ON_STARTUP = True  # Load trước model đã lưu trong settings trên thread nền
+    MODEL_WARMUP = True  # Chạy thử 1 giây im lặng sau khi load để job đầu tiên không chậm
+    WHISPER_MODEL_RAM_MB = {  # Ước tính trước khi load (fp32)
+        "tiny": 150,
+        "base": 300,
+        "small": 950,
+        "medium": 3000,
+        "large": 6200,
+        "base-int8": 180,
+        "small-int8": 450,
+        "medium-int8": 1200,
+        "large-int8": 2400
+    }
+    
     # Languages
     LANGUAGES = {
         "Tiếng Việt": "vi",
@@ -70,20 +96,121 @@ class Config:
     
     # Processing Settings
     MAX_WORKERS = 10  # Số thread dịch song song
-    RETRY_ATTEMPTS = 3  # Số lần thử lại khi dịch thất bại
-    RETRY_DELAY = 0.5  # Delay giữa các lần retry (seconds)
+    RETRY_ATTEMPTS = 3  # Số lần thử khi gọi translate_text trực tiếp (lượt dịch chính: mỗi backend một lần)
+    RETRY_DELAY = 0.5  # Delay cơ sở của backoff khi retry (seconds), nhân đôi mỗi lần + jitter
+    BACKOFF_MAX_DELAY = 30  # Delay retry tối đa (seconds), trừ khi server yêu cầu Retry-After dài hơn
+    DEFERRED_RETRY_DELAYS = [5, 20, 60]  # Đoạn lỗi được dịch lại sau lượt chính, chờ trước mỗi lượt (seconds)
+    UNTRANSLATED_POLICY = "warn"  # Đoạn vẫn lỗi: "warn" (giữ text gốc, log số thứ tự) hoặc "fail" (dừng job)
+    TRANSLATE_BATCH_ENABLED = True  # Gói nhiều đoạn vào một request (mỗi đoạn một dòng)
+    TRANSLATE_BATCH_MAX_CHARS = 4500  # Google giới hạn 5000 ký tự mỗi request
+    TRANSLATE_BATCH_MAX_SEGMENTS = 40  # Gói nhỏ hơn -> dịch lại ít hơn khi tách không khớp
+    TRANSLATE_TIMEOUT = 20  # Timeout mỗi request dịch (seconds)
+    TRANSLATION_PLANNER_ENABLED = True  # Gộp đoạn trùng, bỏ qua đoạn không cần dịch (♪, dấu câu...)
+    
+    # Translation Backend
+    TRANSLATION_BACKEND = "google"  # "google" (online) hoặc "local" (model seq2seq trên máy, không cần mạng)
+    LOCAL_MT_MODELS = {}  # {mã ngôn ngữ đích: thư mục model}, ví dụ {"vi": "D:/models/opus-mt-zh-vi"}
+    LOCAL_MT_MODEL_DIR = os.path.join(os.path.expanduser("~"), ".cache", "video_translator", "mt_models")  # Mặc định: <dir>/opus-mt-zh-<mã>
+    LOCAL_MT_DEVICE = "cpu"
+    LOCAL_MT_BATCH_SIZE = 16  # Số đoạn mỗi lần chạy model (đoạn đã sắp theo độ dài)
+    LOCAL_MT_THREADS = None  # Số thread torch cho model dịch (None = mặc định của torch)
+    LOCAL_MT_PACK_SEGMENTS = 256  # Số đoạn mỗi phần việc (sắp theo độ dài trong phần việc)
+    LOCAL_MT_MAX_LENGTH = 256  # Số token tối đa mỗi đoạn (vào và ra)
+    LOCAL_MT_NUM_BEAMS = 1  # 1 = greedy, nhanh nhất trên CPU
+    
+    # Tail latency & failover (thống kê, circuit breaker dùng chung cho mọi job)
+    TRANSLATION_FALLBACK_BACKENDS = []  # Backend dự phòng theo thứ tự, ví dụ ["local"]
+    HEDGE_ENABLED = True  # Request chậm hơn percentile -> gửi thêm một bản, lấy bản về trước
+    HEDGE_PERCENTILE = 95
+    HEDGE_MIN_DELAY = 1.0  # Không hedge sớm hơn (seconds)
+    HEDGE_MIN_SAMPLES = 20  # Số request cần đo trước khi bắt đầu hedge
+    HEDGE_MAX_RATIO = 0.1  # Tối đa 10% request có bản dự phòng
+    PROVIDER_LATENCY_WINDOW = 200  # Số latency gần nhất dùng tính percentile
+    BREAKER_FAILURE_THRESHOLD = 5  # Lỗi liên tiếp -> ngắt backend
+    BREAKER_RESET_SECONDS = 30  # Sau thời gian này cho một request thử lại
+    
+    # Async Translation Transport (aiohttp: một event loop, connection keep-alive dùng chung)
+    ASYNC_TRANSPORT_ENABLED = True  # Cần aiohttp; không có thì dùng GoogleTranslator trên thread
+    ASYNC_MAX_IN_FLIGHT = 200  # Số request dịch đang chờ tối đa
+    ASYNC_MAX_CONNECTIONS = 20  # Số kết nối HTTP mở cùng lúc (request còn lại xếp hàng)
+    ASYNC_KEEPALIVE_TIMEOUT = 30  # Giữ kết nối rảnh để dùng lại (seconds)
+    
+    # Rate Control (dùng chung cho mọi job gọi cùng backend)
+    RATE_CONTROL_ENABLED = True
+    RATE_REQUESTS_PER_SECOND = 10  # Token bucket: số request mỗi giây (0 = không giới hạn)
+    RATE_CHARS_PER_SECOND = 20000  # Token bucket: số ký tự gửi đi mỗi giây (0 = không giới hạn)
+    RATE_BURST_SECONDS = 2  # Dung lượng bucket = rate x số giây này
+    RATE_INITIAL_CONCURRENCY = 4  # Số request đồng thời lúc bắt đầu (AIMD tự tăng/giảm)
+    RATE_MIN_CONCURRENCY = 1
+    RATE_MAX_CONCURRENCY = 32
+    RATE_LATENCY_FACTOR = 2.0  # Latency > hệ số x latency nền -> coi là quá tải
+    RATE_DECREASE_FACTOR = 0.5  # Giảm concurrency khi lỗi / 429
+    RATE_SLOW_DECREASE_FACTOR = 0.8  # Giảm concurrency khi latency tăng vọt
+    
+    # Translation Memory (cache bản dịch dùng chung giữa các job)
+    TRANSLATION_MEMORY_ENABLED = True
+    TRANSLATION_MEMORY_PATH = os.path.join(os.path.expanduser("~"), ".cache", "video_translator", "translation_memory.db")
+    TRANSLATION_MEMORY_MAX_ENTRIES = 200000  # Vượt quá sẽ xóa bản dịch lâu không dùng nhất
+    TRANSLATION_MEMORY_BUSY_TIMEOUT = 10  # Chờ khi job khác đang ghi (seconds)
     
     # Audio Settings
     AUDIO_SAMPLE_RATE = 16000
     AUDIO_CHANNELS = 1
+    KEEP_EXTRACTED_AUDIO = False  # Ghi thêm extracted_audio.wav để debug (opt-in)
+    
+    # Voice Activity Detection (bỏ qua khoảng lặng/nhạc nền trước Whisper)
+    VAD_ENABLED = True
+    VAD_FRAME_MS = 30  # Độ dài mỗi frame phân tích
+    VAD_NOISE_PERCENTILE = 10  # Percentile năng lượng dùng làm nền nhiễu
+    VAD_ENERGY_MARGIN_DB = 8.0  # Giọng nói phải to hơn nền nhiễu bao nhiêu dB
+    VAD_MIN_ENERGY_DB = -45.0  # Ngưỡng năng lượng tuyệt đối (dBFS)
+    VAD_MAX_ZCR = 0.35  # Zero-crossing cao hơn -> nhiễu/tiếng xì, không phải giọng nói
+    VAD_MIN_MODULATION_DB = 3.0  # Năng lượng giọng nói dao động; nhạc nền đều (0 = tắt)
+    VAD_MODULATION_WINDOW_MS = 1000
+    VAD_MIN_SPEECH_MS = 250  # Bỏ các vùng ngắn hơn
+    VAD_MERGE_GAP_MS = 500  # Gộp các vùng cách nhau ít hơn
+    VAD_PADDING_MS = 300  # Thêm vào hai đầu mỗi vùng
+    
+    # Parallel Transcription (chia audio tại khoảng lặng, mỗi process một model)
+    TRANSCRIBE_WORKERS = 1  # >1: phiên âm song song trên nhiều process (tốn RAM x N model)
+    TRANSCRIBE_CHUNK_SECONDS = 300  # Độ dài tối đa mỗi chunk
+    TRANSCRIBE_DEDUP_TOLERANCE = 1.0  # Bỏ câu trùng ở biên chunk nếu cách nhau ít hơn (seconds)
+    TRANSCRIBE_POLL_INTERVAL = 0.2  # Chu kỳ kiểm tra cancel khi chờ worker (seconds)
+    CANCEL_POLL_INTERVAL = 0.1  # Chu kỳ kiểm tra cancel khi chờ chỗ trống gửi request dịch (seconds)
+    
+    # Batched Whisper (nhiều cửa sổ 30 giây độc lập trong một lần chạy encoder/decoder)
+    WHISPER_BATCH_SIZE = 1  # >1: bật; nhanh hơn trên CPU nhiều core nhưng mất ngữ cảnh giữa các cửa sổ
+    WHISPER_BEAM_SIZE = None  # None: greedy; 5: beam search (chậm hơn, chính xác hơn)
+    
+    # Streaming Pipeline (dịch song song với phiên âm)
+    STREAMING_PIPELINE = True  # False: phiên âm xong cả file rồi mới dịch
+    STREAM_CHUNK_SECONDS = 120  # Phiên âm theo chunk cắt tại khoảng lặng, dịch ngay khi chunk xong
+    SEGMENT_QUEUE_SIZE = 200  # Số đoạn tối đa chờ dịch (đầy -> phiên âm tạm dừng)
+    
+    # Checkpoint phiên âm (chạy lại sau khi crash/hủy sẽ tiếp tục từ chunk cuối đã xong)
+    TRANSCRIBE_CHECKPOINT = True
+    
+    # Audio Cache (PCM đã giải mã, dùng lại khi xử lý lại cùng video)
+    AUDIO_CACHE_ENABLED = True
+    AUDIO_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "video_translator", "audio")
+    AUDIO_CACHE_MAX_MB = 4096  # Vượt quá sẽ xóa file ít dùng nhất (LRU)
+    AUDIO_CACHE_HASH_SAMPLE_MB = 8  # Số MB đầu/cuối video dùng để hash nội dung
     
     # Threading
     CPU_THREADS = os.cpu_count() or 4
     
+    # FFmpeg
+    FFMPEG_POLL_INTERVAL = 0.1  # Chu kỳ kiểm tra cancel (seconds)
+    FFMPEG_TERMINATE_TIMEOUT = 3.0  # Chờ FFmpeg dừng trước khi kill (seconds)
+    FFMPEG_STDERR_LINES = 200  # Số dòng stderr cuối giữ lại để báo lỗi
+    FFMPEG_READ_CHUNK = 1024 * 1024  # Kích thước khối đọc stdout (bytes)
+    PCM_BUFFER_MARGIN = 5  # Cấp thêm cho mảng PCM so với thời lượng ffprobe (seconds)
+    
     # File Settings
     SETTINGS_FILE = "video_translator_settings.json"
     OUTPUT_DIR_SUFFIX = "_output"
     TEMP_AUDIO_FILE = "extracted_audio.wav"
+    CHECKPOINT_FILE = "transcription_checkpoint.jsonl"
     
     # Subtitle Settings
     SUBTITLE_FONTSIZE = 16
@@ -91,8 +218,14 @@ class Config:
     SUBTITLE_OUTLINE_COLOR = "&H000000"
     SUBTITLE_OUTLINE = 2
     SUBTITLE_BOLD = 1
+    SUBTITLE_WRITE_BUFFER = 1024 * 1024  # Buffer ghi mỗi file phụ đề (bytes)
+    
+    # Media Probe (ffprobe)
+    PROBE_TIMEOUT = 30  # seconds
+    PROBE_CACHE_SIZE = 64  # Số file giữ metadata trong bộ nhớ
+    PREFERRED_AUDIO_LANGUAGES = ["chi", "zho", "zh", "cmn", "yue"]  # Ưu tiên audio track tiếng Trung
     
-    # Progress Steps
+    # Progress Steps (dùng khi không có metadata để ước tính)
     PROGRESS_AUDIO_START = 5
     PROGRESS_AUDIO_COMPLETE = 20
     PROGRESS_TRANSCRIBE_START = 25
@@ -104,6 +237,24 @@ class Config:
     PROGRESS_EMBED_START = 96
     PROGRESS_COMPLETE = 100
     
+    # Ước tính thời gian từng bước (CPU) để chia thanh progress và tính ETA
+    ESTIMATE_AUDIO_SPEED = 300  # FFmpeg tách audio nhanh gấp N lần thời gian thực
+    ESTIMATE_WHISPER_RTF = {  # Giây xử lý cho mỗi giây audio
+        "tiny": 0.1,
+        "base": 0.2,
+        "small": 0.5,
+        "medium": 1.2,
+        "large": 2.5,
+        "base-int8": 0.12,
+        "small-int8": 0.3,
+        "medium-int8": 0.7,
+        "large-int8": 1.5
+    }
+    ESTIMATE_SEGMENTS_PER_MINUTE = 15
+    ESTIMATE_TRANSLATE_SECONDS = 0.5  # Thời gian dịch một đoạn
+    ESTIMATE_EMBED_SPEED = 2.0  # Burn-in phụ đề nhanh gấp N lần thời gian thực
+    ETA_MIN_PERCENT = 3  # Dưới mức này dùng ước tính ban đầu thay cho tốc độ đo được
+    
     # Dependencies
     REQUIRED_MODULES = {
         'whisper': 'openai-whisper',
@@ -0,0 +1,126 @@
+"""
+Async Transport - Gọi Google Translate bằng asyncio (aiohttp, keep-alive, timeout mỗi request)
+"""
+
+import asyncio
+import threading
+
+from bs4 import BeautifulSoup
+
+from config import Config
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+GOOGLE_TRANSLATE_URL = "https://translate.google.com/m"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+
+
+class TransportError(Exception):
+    """Request dịch thất bại (HTTP lỗi, timeout, không tìm thấy bản dịch)"""
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def parse_google_response(html):
+    """Lấy bản dịch từ trang /m của Google Translate (giữ nguyên các dòng)"""
+    soup = BeautifulSoup(html, "html.parser")
+    element = soup.find("div", {"class": "t0"}) or soup.find("div", {"class": "result-container"})
+    if element is None:
+        raise TransportError("Không tìm thấy bản dịch trong response")
+    return element.get_text().strip()
+
+
+class AsyncTranslationTransport:
+    """Event loop riêng trên thread nền, một aiohttp session dùng chung (connection pool)
+
+    Các thread khác gọi translate() (sync facade) hoặc submit() coroutine vào loop này,
+    nên worker dịch, VideoProcessor và GUI không cần biết tới asyncio.
+    """
+
+    def __init__(self, url=None, max_connections=None, timeout=None):
+        if aiohttp is None:
+            raise ImportError("aiohttp chưa được cài đặt")
+        self.url = url or GOOGLE_TRANSLATE_URL
+        self.max_connections = max_connections or Config.ASYNC_MAX_CONNECTIONS
+        self.timeout = timeout or Config.TRANSLATE_TIMEOUT
+        self.session = None
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run_loop, daemon=True)
+        self.thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def _get_session(self):
+        """Session tạo trong event loop ở lần gọi đầu"""
+        if self.session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=Config.ASYNC_KEEPALIVE_TIMEOUT
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"User-Agent": USER_AGENT}
+            )
+        return self.session
+
+    async def translate_async(self, text, source, target):
+        """Dịch một đoạn text (chạy trong event loop của transport)"""
+        params = {"sl": source, "tl": target, "q": text}
+        try:
+            async with self._get_session().get(self.url, params=params) as response:
+                body = await response.text()
+                if response.status >= 400:
+                    raise TransportError(
+                        f"HTTP {response.status}",
+                        status=response.status,
+                        retry_after=response.headers.get("Retry-After")
+                    )
+        except asyncio.TimeoutError:
+            raise TransportError(f"Quá thời gian chờ ({self.timeout}s)")
+        except aiohttp.ClientError as e:
+            raise TransportError(str(e))
+        return parse_google_response(body)
+
+    def submit(self, coro):
+        """Chạy coroutine trong event loop, trả về concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def translate(self, text, source, target):
+        """Sync facade: dịch một đoạn text, chặn thread gọi cho tới khi có kết quả"""
+        return self.submit(self.translate_async(text, source, target)).result()
+
+    def close(self):
+        """Đóng session và dừng event loop"""
+        async def shutdown():
+            if self.session is not None:
+                await self.session.close()
+                self.session = None
+
+        if self.loop.is_running():
+            self.submit(shutdown()).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_async_transport():
+    """Transport dùng chung trong process (None nếu tắt hoặc chưa cài aiohttp)"""
+    global _transport
+    if not Config.ASYNC_TRANSPORT_ENABLED or aiohttp is None:
+        return None
+    with _transport_lock:
+        if _transport is None:
+            _transport = AsyncTranslationTransport()
+        return _transport
@@ -0,0 +1,171 @@
+"""
+Batched Whisper - Phiên âm nhiều cửa sổ 30 giây độc lập trong một batch (encoder + decoder)
+"""
+
+import numpy as np
+import torch
+import whisper
+from whisper.audio import CHUNK_LENGTH, HOP_LENGTH, N_FRAMES, SAMPLE_RATE
+from whisper.tokenizer import get_tokenizer
+
+from config import Config
+from utils.vad import plan_chunks, split_long_regions
+
+# Mỗi timestamp token của Whisper ứng với 2 frame mel (20 ms)
+TIME_PRECISION = 2 * HOP_LENGTH / SAMPLE_RATE
+
+# Ngưỡng giống whisper.transcribe
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+
+
+def plan_windows(regions, duration=None):
+    """Chia vùng giọng nói thành các cửa sổ độc lập, mỗi cửa sổ ghép lại dài tối đa 30 giây
+
+    Trả về danh sách cửa sổ, mỗi cửa sổ là danh sách vùng [(start, end), ...].
+    Nếu truyền duration (không bật VAD), các cửa sổ phủ liền mạch toàn bộ audio,
+    cắt tại khoảng lặng khi có thể.
+    """
+    if duration is not None:
+        chunks = plan_chunks(regions, CHUNK_LENGTH, duration)
+        return [[region] for chunk in chunks for region in split_long_regions(chunk, CHUNK_LENGTH)]
+
+    windows = []
+    length = 0.0
+    for start, end in split_long_regions(regions, CHUNK_LENGTH):
+        if windows and length + (end - start) <= CHUNK_LENGTH:
+            windows[-1].append((start, end))
+            length += end - start
+        else:
+            windows.append([(start, end)])
+            length = end - start
+    return windows
+
+
+def log_mel_batch(audios, n_mels, device):
+    """Log-mel của nhiều đoạn audio (pad/cắt về 30 giây) -> tensor (batch, n_mels, 3000)"""
+    mels = [
+        whisper.log_mel_spectrogram(
+            whisper.pad_or_trim(torch.from_numpy(np.ascontiguousarray(audio, dtype=np.float32))),
+            n_mels=n_mels
+        )[:, :N_FRAMES]
+        for audio in audios
+    ]
+    return torch.stack(mels).to(device)
+
+
+def parse_segments(tokens, tokenizer, duration):
+    """Tách token có timestamp của một cửa sổ thành segments (giây, tính từ đầu cửa sổ)"""
+    timestamp_begin = tokenizer.timestamp_begin
+
+    def text_of(part):
+        return tokenizer.decode([t for t in part if t < tokenizer.eot])
+
+    def to_seconds(token):
+        return min((token - timestamp_begin) * TIME_PRECISION, duration)
+
+    segments = []
+    last = 0
+    for i in range(1, len(tokens)):
+        # Hai timestamp liền nhau: kết thúc segment trước, bắt đầu segment sau
+        if tokens[i - 1] >= timestamp_begin and tokens[i] >= timestamp_begin:
+            part = tokens[last:i]
+            segments.append((to_seconds(part[0]), to_seconds(part[-1]), text_of(part)))
+            last = i
+
+    rest = tokens[last:]
+    text = text_of(rest)
+    if text.strip():
+        # Phần cuối không có timestamp đóng: kéo tới hết cửa sổ
+        start = to_seconds(rest[0]) if rest[0] >= timestamp_begin else 0.0
+        end = to_seconds(rest[-1]) if len(rest) > 1 and rest[-1] >= timestamp_begin else duration
+        segments.append((start, max(start, end), text))
+
+    return [
+        {'start': start, 'end': end, 'text': text}
+        for start, end, text in segments
+        if text.strip()
+    ]
+
+
+def _is_silence(result):
+    """Cửa sổ không có giọng nói (bỏ qua, không decode lại)"""
+    return result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD
+
+
+def _needs_fallback(result):
+    """Kết quả lặp/kém tin cậy -> decode lại ở temperature cao hơn (như whisper.transcribe)"""
+    if _is_silence(result):
+        return False
+    return (
+        result.compression_ratio > COMPRESSION_RATIO_THRESHOLD
+        or result.avg_logprob < LOGPROB_THRESHOLD
+    )
+
+
+class BatchedWhisper:
+    """Chạy encoder/decoder Whisper trên nhiều cửa sổ độc lập cùng lúc"""
+
+    def __init__(self, model, language='zh', task='transcribe', beam_size=None):
+        self.model = model
+        self.language = language
+        self.task = task
+        self.beam_size = beam_size if beam_size is not None else Config.WHISPER_BEAM_SIZE
+        self.fp16 = model.device.type == 'cuda'
+        self.tokenizer = get_tokenizer(
+            model.is_multilingual,
+            num_languages=model.num_languages,
+            language=language,
+            task=task
+        )
+
+    def decode_options(self, temperature):
+        """DecodingOptions cho một temperature (beam search chỉ dùng khi temperature = 0)"""
+        return whisper.DecodingOptions(
+            language=self.language,
+            task=self.task,
+            temperature=temperature,
+            beam_size=self.beam_size if temperature == 0 else None,
+            fp16=self.fp16
+        )
+
+    def transcribe(self, audios):
+        """Phiên âm một batch cửa sổ (mảng float32 16 kHz, mỗi cái <= 30 giây)
+
+        Trả về danh sách segments cho từng cửa sổ, timestamp tính từ đầu cửa sổ.
+        """
+        if not audios:
+            return []
+
+        mel = log_mel_batch(audios, self.model.dims.n_mels, self.model.device)
+        if self.fp16:
+            mel = mel.half()
+
+        results = [None] * len(audios)
+        pending = list(range(len(audios)))
+
+        with torch.no_grad():
+            # Encoder chạy một lần cho cả batch, các lần decode lại dùng chung audio features
+            features = self.model.embed_audio(mel)
+            for i, temperature in enumerate(TEMPERATURES):
+                decoded = self.model.decode(features[pending], self.decode_options(temperature))
+                last = i == len(TEMPERATURES) - 1
+                retry = []
+                for index, result in zip(pending, decoded):
+                    results[index] = result
+                    if not last and _needs_fallback(result):
+                        retry.append(index)
+                pending = retry
+                if not pending:
+                    break
+
+        windows = []
+        for audio, result in zip(audios, results):
+            if _is_silence(result):
+                windows.append([])
+                continue
+            duration = len(audio) / SAMPLE_RATE
+            windows.append(parse_segments(result.tokens, self.tokenizer, duration))
+        return windows
@@ -0,0 +1,137 @@
+"""
+Transcription Checkpoint - Lưu segments từng chunk đã phiên âm để chạy tiếp khi bị gián đoạn
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from config import Config
+
+CHECKPOINT_VERSION = 1
+# Số mẫu audio lấy ra (cách đều) để tạo fingerprint, không phải hash cả file nhiều trăm MB
+FINGERPRINT_SAMPLES = 1 << 20
+
+
+def audio_fingerprint(audio):
+    """Fingerprint của audio đã giải mã: độ dài + mẫu cách đều"""
+    audio = np.asarray(audio)
+    step = max(1, len(audio) // FINGERPRINT_SAMPLES)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(len(audio)).encode())
+    digest.update(np.ascontiguousarray(audio[::step], dtype='<f4').tobytes())
+    return digest.hexdigest()
+
+
+def plan_fingerprint(chunks):
+    """Fingerprint của cách chia chunk (phụ thuộc VAD và độ dài chunk)"""
+    rounded = [[(round(start, 3), round(end, 3)) for start, end in regions] for regions in chunks]
+    return hashlib.blake2b(json.dumps(rounded).encode(), digest_size=16).hexdigest()
+
+
+class TranscriptionCheckpoint:
+    """File JSONL trong thư mục output: dòng đầu là key của job, mỗi dòng sau là một chunk
+
+    Ghi thêm (append + fsync) sau mỗi chunk nên nếu app bị tắt ngang chỉ mất chunk đang chạy;
+    dòng cuối ghi dở bị bỏ qua khi đọc lại.
+    """
+
+    def __init__(self, output_dir, logger=None):
+        self.path = os.path.join(output_dir, Config.CHECKPOINT_FILE)
+        self.logger = logger
+
+    def log(self, message):
+        """Log message"""
+        if self.logger:
+            self.logger(message)
+
+    def make_key(self, audio, model_size, chunks):
+        """Key của job: checkpoint chỉ dùng lại khi cùng audio, model và cách chia chunk"""
+        return {
+            'version': CHECKPOINT_VERSION,
+            'audio': audio_fingerprint(audio),
+            'model': model_size,
+            'plan': plan_fingerprint(chunks),
+            'chunks': len(chunks),
+        }
+
+    def resume(self, audio, model_size, chunks):
+        """Đọc các chunk đã xong (theo thứ tự) và chuẩn bị file để ghi tiếp
+
+        Trả về danh sách segments của từng chunk đã hoàn tất ([] nếu chạy từ đầu).
+        """
+        key = self.make_key(audio, model_size, chunks)
+        completed = self._read(key)
+
+        if completed:
+            self.log(f"♻️ Tiếp tục từ checkpoint: {len(completed)}/{len(chunks)} chunk đã phiên âm")
+
+        # Ghi lại file chỉ với phần hợp lệ: bỏ dòng ghi dở để các dòng append sau đọc được
+        self._rewrite(key, completed)
+        return completed
+
+    def append(self, index, segments):
+        """Lưu segments (timeline gốc) của một chunk vừa phiên âm xong"""
+        record = {
+            'chunk': index,
+            'segments': [
+                {'start': seg['start'], 'end': seg['end'], 'text': seg['text']}
+                for seg in segments
+            ]
+        }
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            self.log(f"⚠️ Không thể ghi checkpoint: {str(e)}")
+
+    def remove(self):
+        """Xóa file checkpoint"""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def _read(self, key):
+        """Các chunk liên tiếp từ 0 đã lưu cho đúng key, [] nếu không khớp"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except (OSError, UnicodeDecodeError):
+            return []
+
+        try:
+            if not lines or json.loads(lines[0]) != key:
+                return []
+        except ValueError:
+            return []
+
+        completed = []
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if record.get('chunk') != len(completed):
+                break
+            completed.append(record['segments'])
+
+        return completed[:key['chunks']]
+
+    def _rewrite(self, key, completed):
+        """Ghi lại toàn bộ checkpoint (atomic: file tạm rồi đổi tên)"""
+        tmp_path = f"{self.path}.tmp-{os.getpid()}"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(key) + "\n")
+                for index, segments in enumerate(completed):
+                    f.write(json.dumps({'chunk': index, 'segments': segments}, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.log(f"⚠️ Không thể ghi checkpoint: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -0,0 +1,258 @@
+"""
+Model Pool - Registry model Whisper dùng chung toàn process
+"""
+
+import gc
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import torch
+import whisper
+
+from config import Config
+from .quantized_whisper import load_quantized_model, split_model_name
+
+
+def load_whisper_model(model_size, logger=None):
+    """Load model Whisper từ disk ('<size>-int8': bản lượng tử hóa int8 cho CPU)"""
+    base_size, quantized = split_model_name(model_size)
+    if quantized:
+        return load_quantized_model(base_size, logger=logger)
+    return whisper.load_model(model_size)
+
+
+def warmup_model(model):
+    """Chạy thử 1 giây im lặng để torch cấp phát bộ nhớ/kernel trước job đầu tiên"""
+    silence = np.zeros(Config.AUDIO_SAMPLE_RATE, dtype=np.float32)
+    model.transcribe(
+        silence,
+        language='zh',
+        verbose=None,
+        fp16=model.device.type == 'cuda'
+    )
+
+
+def model_memory_mb(model):
+    """Dung lượng RAM thực tế của weights (MB)"""
+    # state_dict thay vì parameters(): weight int8 của lớp quantized không phải Parameter
+    total = 0
+    for value in model.state_dict().values():
+        tensors = value if isinstance(value, tuple) else (value,)
+        total += sum(t.numel() * t.element_size() for t in tensors if isinstance(t, torch.Tensor))
+    return total / (1024 * 1024)
+
+
+class _ModelEntry:
+    """Một model trong pool"""
+
+    def __init__(self, model_size, estimated_mb):
+        self.model_size = model_size
+        self.model = None
+        self.memory_mb = estimated_mb
+        self.last_used = time.time()
+        self.in_use = 0
+        self.ready = threading.Event()
+        self.error = None
+        self.warm = False
+        # Whisper gắn hook kv-cache lên chính model khi decode -> mỗi lúc chỉ một luồng chạy
+        self.infer_lock = threading.Lock()
+
+
+class WhisperModelPool:
+    """Giữ nhiều model trong giới hạn RAM: LRU eviction, tự unload khi rảnh, thread-safe"""
+
+    def __init__(self, max_mb=None, idle_timeout=None, loader=None):
+        self.max_mb = Config.MODEL_POOL_MAX_MB if max_mb is None else max_mb
+        self.idle_timeout = Config.MODEL_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        # loader(model_size, logger): logger nhận log của bước load (cache int8...)
+        self.loader = loader or load_whisper_model
+        self.entries = {}
+        self.lock = threading.Lock()
+        self._janitor = None
+
+    def get(self, model_size, logger=None):
+        """Lấy model (load nếu chưa có; đợi nếu luồng khác đang load)"""
+        entry = self._acquire(model_size, logger)
+        self._release(entry)
+        return entry.model
+
+    @contextmanager
+    def lease(self, model_size, logger=None):
+        """Mượn model để chạy: không bị evict/unload, không chạy song song với luồng khác"""
+        entry = self._acquire(model_size, logger)
+        try:
+            with entry.infer_lock:
+                yield entry.model
+                # Đã chạy inference thật -> không cần warm-up nữa
+                entry.warm = True
+        finally:
+            self._release(entry)
+
+    def preload(self, model_size, warmup=True, on_status=None):
+        """Load và warm-up model trên thread nền; job đến sau sẽ đợi chính lần load này"""
+        def report(state, message):
+            if on_status:
+                on_status(state, message)
+
+        def run():
+            report('loading', f"⏳ Đang load model {model_size}...")
+            try:
+                entry = self._acquire(model_size, None)
+            except Exception as e:
+                report('error', f"⚠️ Không thể load model {model_size}: {str(e)}")
+                return
+
+            try:
+                with entry.infer_lock:
+                    if warmup and not entry.warm:
+                        report('loading', f"🔥 Đang warm-up model {model_size}...")
+                        warmup_model(entry.model)
+                        entry.warm = True
+                report('ready', f"✓ Model {model_size} sẵn sàng")
+            except Exception as e:
+                report('error', f"⚠️ Warm-up model {model_size} lỗi: {str(e)}")
+            finally:
+                self._release(entry)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def _release(self, entry):
+        """Trả model về pool"""
+        with self.lock:
+            entry.in_use -= 1
+            entry.last_used = time.time()
+
+    def _acquire(self, model_size, logger):
+        """Tăng in_use của entry, load model nếu cần"""
+        log = logger or (lambda message: None)
+
+        with self.lock:
+            entry = self.entries.get(model_size)
+            owner = entry is None
+            if owner:
+                entry = _ModelEntry(model_size, Config.WHISPER_MODEL_RAM_MB.get(model_size, 0))
+                self._evict_for(entry.memory_mb, log)
+                self.entries[model_size] = entry
+            entry.in_use += 1
+            entry.last_used = time.time()
+
+        if owner:
+            self._load(entry, log)
+        elif not entry.ready.is_set():
+            log(f"⏳ Đang đợi model {model_size} (đang được load)...")
+            entry.ready.wait()
+        else:
+            log(f"⚡ Sử dụng model {model_size} đã cache")
+
+        if entry.error is not None:
+            with self.lock:
+                entry.in_use -= 1
+            raise entry.error
+
+        return entry
+
+    def _load(self, entry, log):
+        """Load model ngoài lock để các model khác vẫn dùng được"""
+        log(f"📥 Đang load model {entry.model_size}... (cache lần đầu)")
+        try:
+            entry.model = self.loader(entry.model_size, logger=log)
+            entry.memory_mb = model_memory_mb(entry.model)
+            log(f"✓ Model {entry.model_size} đã sẵn sàng ({entry.memory_mb:.0f} MB)")
+        except Exception as e:
+            entry.error = e
+            with self.lock:
+                if self.entries.get(entry.model_size) is entry:
+                    del self.entries[entry.model_size]
+        finally:
+            entry.ready.set()
+
+        if entry.error is None:
+            with self.lock:
+                self._evict_for(0, log, keep=entry)
+            self._start_janitor()
+
+    def _evict_for(self, needed_mb, log, keep=None):
+        """Bỏ các model ít dùng nhất (không đang dùng) tới khi đủ RAM. Gọi khi giữ lock"""
+        candidates = sorted(
+            (e for e in self.entries.values() if e is not keep and e.in_use == 0 and e.ready.is_set()),
+            key=lambda e: e.last_used
+        )
+        used = sum(e.memory_mb for e in self.entries.values())
+
+        for entry in candidates:
+            if used + needed_mb <= self.max_mb:
+                break
+            del self.entries[entry.model_size]
+            used -= entry.memory_mb
+            log(f"🧹 Giải phóng model {entry.model_size} (vượt giới hạn RAM)")
+
+        if used + needed_mb > self.max_mb:
+            log("⚠️ Vượt giới hạn RAM của pool (các model còn lại đang được dùng)")
+
+    def unload_idle(self):
+        """Unload các model không dùng quá idle_timeout giây"""
+        now = time.time()
+        with self.lock:
+            idle = [
+                size for size, e in self.entries.items()
+                if e.in_use == 0 and e.ready.is_set() and now - e.last_used > self.idle_timeout
+            ]
+            for size in idle:
+                del self.entries[size]
+        if idle:
+            gc.collect()
+        return idle
+
+    def unload(self, model_size):
+        """Unload một model (nếu không đang dùng)"""
+        with self.lock:
+            entry = self.entries.get(model_size)
+            if entry is None or entry.in_use or not entry.ready.is_set():
+                return False
+            del self.entries[model_size]
+        gc.collect()
+        return True
+
+    def clear(self):
+        """Unload tất cả model không đang dùng"""
+        for size in list(self.entries):
+            self.unload(size)
+
+    def loaded_models(self):
+        """Danh sách model đang có trong pool"""
+        with self.lock:
+            return [size for size, e in self.entries.items() if e.ready.is_set() and e.error is None]
+
+    def _start_janitor(self):
+        """Thread nền kiểm tra và unload model rảnh"""
+        if self.idle_timeout <= 0:
+            return
+        with self.lock:
+            if self._janitor is not None:
+                return
+            self._janitor = threading.Thread(target=self._janitor_loop, daemon=True)
+        self._janitor.start()
+
+    def _janitor_loop(self):
+        """Định kỳ unload model rảnh"""
+        interval = max(1.0, min(Config.MODEL_POOL_JANITOR_INTERVAL, self.idle_timeout))
+        while True:
+            time.sleep(interval)
+            self.unload_idle()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_model_pool():
+    """Pool model dùng chung cho mọi VideoProcessor trong process"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WhisperModelPool()
+        return _pool
@@ -0,0 +1,147 @@
+"""
+Parallel Transcriber - Phiên âm song song nhiều chunk trên process pool
+"""
+
+import multiprocessing
+import re
+import time
+from collections import deque
+
+from config import Config
+from utils.cancellation import raise_if_cancelled
+from utils.vad import concat_regions
+
+# Model Whisper riêng của mỗi worker process
+_worker_model = None
+
+
+def _init_worker(model_size, threads):
+    """Khởi tạo worker: giới hạn số thread và load model một lần"""
+    global _worker_model
+    import torch
+    from core.model_pool import load_whisper_model
+
+    torch.set_num_threads(threads)
+    _worker_model = load_whisper_model(model_size)
+
+
+def _transcribe_chunk(audio, options):
+    """Phiên âm một chunk trong worker process"""
+    started = time.time()
+    result = _worker_model.transcribe(audio, **options)
+    return result['segments'], time.time() - started
+
+
+def _normalize_text(text):
+    """Chuẩn hóa text để so trùng lặp ở biên chunk"""
+    return re.sub(r'\s+', '', text)
+
+
+class SegmentMerger:
+    """Gộp segments từng chunk theo thứ tự khi chunk hoàn tất, bỏ câu bị lặp ở biên chunk"""
+
+    def __init__(self, tolerance=None):
+        if tolerance is None:
+            tolerance = Config.TRANSCRIBE_DEDUP_TOLERANCE
+        self.tolerance = tolerance
+        self.last = None
+        self.count = 0
+
+    def add(self, segments):
+        """Nhận segments của chunk kế tiếp, trả về các segment mới (đã đánh lại id)"""
+        accepted = []
+        boundary = self.last
+        for seg in segments:
+            if boundary is not None:
+                same_text = _normalize_text(seg['text']) == _normalize_text(boundary['text'])
+                if same_text and seg['start'] - boundary['end'] <= self.tolerance:
+                    continue
+                if seg['end'] <= boundary['end']:
+                    # Nằm trọn trong phần chunk trước đã phủ
+                    continue
+                boundary = None
+            seg['id'] = self.count
+            self.count += 1
+            accepted.append(seg)
+
+        if accepted:
+            self.last = accepted[-1]
+        return accepted
+
+
+def merge_chunk_segments(chunk_segments, tolerance=None):
+    """Gộp segments các chunk theo thứ tự, bỏ câu bị lặp ở biên chunk"""
+    merger = SegmentMerger(tolerance)
+    merged = []
+    for segments in chunk_segments:
+        merged.extend(merger.add(segments))
+    return merged
+
+
+class ParallelTranscriber:
+    """Chia audio thành chunk và phiên âm trên N process, mỗi process một model"""
+
+    def __init__(self, model_size, workers=None, logger=None, progress=None):
+        self.model_size = model_size
+        self.workers = workers or Config.TRANSCRIBE_WORKERS
+        self.logger = logger
+        self.progress = progress
+
+    def log(self, message):
+        """Log message"""
+        if self.logger:
+            self.logger(message)
+
+    def transcribe(self, audio, chunks, options, cancel_flag=None):
+        """Phiên âm các chunk (danh sách vùng) song song, trả về segments đã gộp"""
+        return merge_chunk_segments(self.iter_chunks(audio, chunks, options, cancel_flag))
+
+    @staticmethod
+    def submit_chunk(pool, audio, regions, options):
+        """Cắt audio của một chunk và gửi vào pool, trả về (job, TimelineMap)"""
+        chunk_audio, timeline = concat_regions(audio, regions)
+        return pool.apply_async(_transcribe_chunk, (chunk_audio, options)), timeline
+
+    def iter_chunks(self, audio, chunks, options, cancel_flag=None):
+        """Phiên âm song song, trả segments (timeline gốc) của từng chunk theo thứ tự"""
+        workers = max(1, min(self.workers, len(chunks)))
+        threads = max(1, Config.CPU_THREADS // workers)
+        self.log(f"🚀 Phiên âm {len(chunks)} chunk trên {workers} process ({threads} thread/process)")
+
+        # spawn: an toàn với torch trên mọi hệ điều hành (không fork process đang có thread)
+        ctx = multiprocessing.get_context('spawn')
+        pool = ctx.Pool(
+            processes=workers,
+            initializer=_init_worker,
+            initargs=(self.model_size, threads)
+        )
+
+        try:
+            # Audio của chunk chỉ được cắt khi gửi đi: mỗi worker tối đa 2 chunk đang chờ,
+            # không giữ bản sao audio của mọi chunk cùng lúc
+            window = workers * 2
+            submitted = deque()
+            next_chunk = 0
+            for i in range(len(chunks)):
+                while next_chunk < len(chunks) and next_chunk < i + window:
+                    submitted.append(self.submit_chunk(pool, audio, chunks[next_chunk], options))
+                    next_chunk += 1
+
+                job, timeline = submitted.popleft()
+                while not job.ready():
+                    raise_if_cancelled(cancel_flag)
+                    job.wait(Config.TRANSCRIBE_POLL_INTERVAL)
+
+                segments, elapsed = job.get()
+
+                if self.progress:
+                    self.progress(i + 1, len(chunks))
+                self.log(f"  ⏳ Chunk {i + 1}/{len(chunks)}: {len(segments)} đoạn ({elapsed:.1f}s)")
+
+                yield timeline.remap_segments(segments)
+
+            pool.close()
+        finally:
+            # Dừng ngay các worker còn chạy (bị hủy, lỗi hoặc bên gọi ngừng đọc)
+            pool.terminate()
+            pool.join()
@@ -0,0 +1,216 @@
+"""
+Provider Health - Thống kê latency/lỗi, circuit breaker và hedged request cho từng backend dịch
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait as futures_wait
+
+from config import Config
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+STATE_NAMES = {CLOSED: "hoạt động", OPEN: "đang ngắt", HALF_OPEN: "đang thử lại"}
+
+
+class ProviderHealth:
+    """Tình trạng một backend dịch, dùng chung cho mọi job trong process
+
+    - Latency gần đây (cửa sổ PROVIDER_LATENCY_WINDOW) -> percentile cho hedged request
+    - Circuit breaker: BREAKER_FAILURE_THRESHOLD lỗi liên tiếp -> ngắt, sau
+      BREAKER_RESET_SECONDS cho một request thử; thành công thì đóng lại
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=Config.PROVIDER_LATENCY_WINDOW)
+        self.requests = 0
+        self.errors = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+
+    def allow(self):
+        """Có được gửi request tới provider này không (circuit breaker)"""
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= Config.BREAKER_RESET_SECONDS:
+                self.state = HALF_OPEN
+                self.probing = False
+            if self.state == HALF_OPEN and not self.probing:
+                # Chỉ một request thử trong lúc half-open
+                self.probing = True
+                return True
+            return False
+
+    def abandon_probe(self):
+        """Request thử kết thúc mà không có kết quả (bị hủy, lỗi trước khi gửi) -> cho request thử khác"""
+        with self.lock:
+            if self.state == HALF_OPEN:
+                self.probing = False
+
+    def retry_in(self):
+        """Số giây tới khi circuit cho request thử (0 nếu đang đóng)"""
+        with self.lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.opened_at + Config.BREAKER_RESET_SECONDS - time.monotonic())
+
+    def record_success(self, latency):
+        with self.lock:
+            self.requests += 1
+            self.latencies.append(latency)
+            self.failures = 0
+            self.state = CLOSED
+            self.probing = False
+
+    def record_failure(self, latency, logger=None):
+        with self.lock:
+            self.requests += 1
+            self.errors += 1
+            self.failures += 1
+            opened = self.state == HALF_OPEN or (
+                self.state == CLOSED and self.failures >= Config.BREAKER_FAILURE_THRESHOLD
+            )
+            if opened:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.probing = False
+        if opened and logger:
+            logger(f"🔌 Ngắt provider '{self.name}' {Config.BREAKER_RESET_SECONDS}s sau {self.failures} lỗi liên tiếp")
+
+    def percentile(self, percent):
+        """Latency ở percentile percent (None nếu chưa có mẫu)"""
+        with self.lock:
+            samples = sorted(self.latencies)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * percent / 100))
+        return samples[index]
+
+    def hedge_delay(self):
+        """Sau bao lâu thì gửi request dự phòng (None: chưa đủ mẫu hoặc tắt)"""
+        if not Config.HEDGE_ENABLED:
+            return None
+        with self.lock:
+            enough = len(self.latencies) >= Config.HEDGE_MIN_SAMPLES
+        if not enough:
+            return None
+        return max(Config.HEDGE_MIN_DELAY, self.percentile(Config.HEDGE_PERCENTILE))
+
+    def try_hedge(self):
+        """Giữ số request dự phòng <= HEDGE_MAX_RATIO tổng request (không nhân tải khi provider chậm)"""
+        with self.lock:
+            if self.hedges + 1 > Config.HEDGE_MAX_RATIO * max(self.requests, 1):
+                return False
+            self.hedges += 1
+            return True
+
+    def record_hedge_win(self):
+        with self.lock:
+            self.hedge_wins += 1
+
+    def describe(self):
+        """Tóm tắt để log"""
+        p50 = self.percentile(50)
+        p95 = self.percentile(95)
+        with self.lock:
+            requests, errors = self.requests, self.errors
+            hedges, wins, state = self.hedges, self.hedge_wins, self.state
+        error_rate = errors / requests * 100 if requests else 0
+        latency = f", p50 {p50:.2f}s, p95 {p95:.2f}s" if p50 is not None else ""
+        return (
+            f"{self.name}: {requests} request, {errors} lỗi ({error_rate:.1f}%){latency}, "
+            f"hedge {hedges} (nhanh hơn {wins}), {STATE_NAMES[state]}"
+        )
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider_health(name):
+    """ProviderHealth dùng chung cho backend name"""
+    with _providers_lock:
+        if name not in _providers:
+            _providers[name] = ProviderHealth(name)
+        return _providers[name]
+
+
+_hedge_pool = None
+_hedge_pool_lock = threading.Lock()
+
+
+def _get_hedge_pool():
+    global _hedge_pool
+    with _hedge_pool_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=Config.MAX_WORKERS * 2, thread_name_prefix="hedge")
+        return _hedge_pool
+
+
+def run_hedged(call, health):
+    """Gọi call(); chậm hơn hedge delay thì gửi thêm một bản, lấy kết quả thành công đầu tiên
+
+    Bản chậm hơn vẫn chạy nốt trên thread nền (request HTTP không hủy được), kết quả bị bỏ.
+    """
+    delay = health.hedge_delay()
+    if delay is None:
+        return call()
+
+    pool = _get_hedge_pool()
+    first = pool.submit(call)
+    done, _ = futures_wait([first], timeout=delay)
+    if done or not health.try_hedge():
+        return first.result()
+
+    hedge = pool.submit(call)
+    pending = {first, hedge}
+    error = None
+    while pending:
+        done, pending = futures_wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is hedge:
+                    health.record_hedge_win()
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+async def run_hedged_async(make_call, health):
+    """Bản async của run_hedged: make_call() tạo coroutine mới, bản thua bị hủy"""
+    delay = health.hedge_delay()
+    if delay is None:
+        return await make_call()
+
+    first = asyncio.ensure_future(make_call())
+    done, _ = await asyncio.wait({first}, timeout=delay)
+    if done or not health.try_hedge():
+        return await first
+
+    hedge = asyncio.ensure_future(make_call())
+    pending = {first, hedge}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        health.record_hedge_win()
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,95 @@
+"""
+Quantized Whisper - Model Whisper int8 (dynamic quantization) cho CPU
+"""
+
+import os
+
+import torch
+import whisper
+
+from config import Config
+
+QUANTIZED_SUFFIX = "-int8"
+CACHE_VERSION = 2
+
+
+def split_model_name(name):
+    """'small-int8' -> ('small', True); 'small' -> ('small', False)"""
+    if name.endswith(QUANTIZED_SUFFIX):
+        return name[:-len(QUANTIZED_SUFFIX)], True
+    return name, False
+
+
+def quantize_model(model):
+    """Lượng tử hóa int8 các lớp Linear của Whisper (tại chỗ), trả về chính model"""
+    # whisper.model.Linear chỉ ép dtype trong forward; quantize_dynamic chỉ nhận đúng
+    # nn.Linear nên đổi class về lớp cha (cùng weight/bias, model chạy fp32 trên CPU)
+    for module in model.modules():
+        if isinstance(module, whisper.model.Linear):
+            module.__class__ = torch.nn.Linear
+
+    return torch.ao.quantization.quantize_dynamic(
+        model,
+        {torch.nn.Linear},
+        dtype=torch.qint8,
+        inplace=True
+    )
+
+
+def cache_path(model_size, cache_dir=None):
+    """File cache model đã lượng tử hóa"""
+    cache_dir = cache_dir or Config.QUANTIZED_MODEL_DIR
+    return os.path.join(cache_dir, f"whisper-{model_size}{QUANTIZED_SUFFIX}.pt")
+
+
+def cache_key():
+    """Cache chỉ dùng lại khi cùng định dạng, cùng phiên bản whisper và torch (file lưu cả module)"""
+    return {'version': CACHE_VERSION, 'whisper': whisper.__version__, 'torch': torch.__version__}
+
+
+def _load_cached(path):
+    """Load model int8 từ file cache
+
+    File lưu nguyên module đã lượng tử hóa: không tạo weight fp32, không lượng tử hóa lại.
+    """
+    checkpoint = torch.load(path, map_location='cpu', weights_only=False)
+    if checkpoint.get('key') != cache_key():
+        raise ValueError("Cache model int8 khác phiên bản")
+    return checkpoint['model'].eval()
+
+
+def _save_cached(path, model):
+    """Ghi cache atomic: file tạm rồi đổi tên"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        torch.save({'key': cache_key(), 'model': model}, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_quantized_model(model_size, cache_dir=None, logger=None):
+    """Load model int8: dùng cache trên disk, lần đầu thì lượng tử hóa từ model fp32 rồi lưu lại"""
+    log = logger or (lambda message: None)
+    path = cache_path(model_size, cache_dir)
+
+    if os.path.exists(path):
+        try:
+            model = _load_cached(path)
+            log(f"⚡ Dùng model int8 đã cache: {model_size}")
+            return model
+        except Exception as e:
+            log(f"⚠️ Cache model int8 lỗi, lượng tử hóa lại: {str(e)}")
+
+    log(f"🔧 Đang lượng tử hóa int8 model {model_size} (chỉ lần đầu)...")
+    model = whisper.load_model(model_size, device='cpu')
+    model = quantize_model(model).eval()
+
+    try:
+        _save_cached(path, model)
+    except OSError as e:
+        log(f"⚠️ Không thể lưu cache model int8: {str(e)}")
+
+    return model
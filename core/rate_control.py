@@ -0,0 +1,272 @@
+"""
+Rate Control - Giới hạn tốc độ (token bucket), concurrency tự điều chỉnh (AIMD), backoff có jitter
+"""
+
+import asyncio
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+
+from deep_translator.exceptions import TooManyRequests
+
+from config import Config
+
+# Chu kỳ kiểm tra lại khi coroutine chờ slot concurrency (seconds)
+ASYNC_POLL_INTERVAL = 0.02
+# HTTP status coi là bị giới hạn tốc độ (giảm concurrency mạnh, tôn trọng Retry-After)
+THROTTLE_STATUSES = (429, 503)
+# Retry-After dài hơn mức này (seconds) bị cắt bớt, tránh treo job hàng giờ
+MAX_RETRY_AFTER = 300
+
+
+def parse_retry_after(value):
+    """Header Retry-After (số giây hoặc HTTP date) -> số giây, None nếu không đọc được"""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def throttle_info(error):
+    """(bị giới hạn tốc độ?, Retry-After) của một lỗi khi gọi dịch"""
+    if isinstance(error, TooManyRequests):
+        return True, None
+    throttled = getattr(error, 'status', None) in THROTTLE_STATUSES
+    return throttled, getattr(error, 'retry_after', None)
+
+
+def backoff_delay(attempt, retry_after=None, base=None, cap=None):
+    """Thời gian chờ trước lần thử lại thứ attempt (0, 1, ...): exponential + full jitter
+
+    Có Retry-After thì chờ ít nhất bằng giá trị đó (thêm jitter nhỏ để các request
+    không cùng lúc thử lại).
+    """
+    base = Config.RETRY_DELAY if base is None else base
+    cap = Config.BACKOFF_MAX_DELAY if cap is None else cap
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    retry_after = parse_retry_after(retry_after)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, MAX_RETRY_AFTER) + random.uniform(0, base))
+    return delay
+
+
+class TokenBucket:
+    """Token bucket thread-safe: reserve() trừ token ngay (cho phép âm), trả về thời gian phải chờ
+
+    Dùng được cho cả thread (time.sleep) và coroutine (asyncio.sleep).
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount=1.0):
+        """Lấy amount token, trả về số giây cần chờ trước khi được dùng"""
+        if self.rate <= 0:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+
+class AdaptiveConcurrency:
+    """Giới hạn số request đồng thời, tự điều chỉnh kiểu AIMD
+
+    Thành công với latency bình thường -> tăng dần (+1 mỗi "vòng" limit request);
+    lỗi/bị giới hạn (429) hoặc latency tăng vọt -> giảm theo tỉ lệ (tối đa một lần mỗi
+    khoảng latency, tránh giảm liên tiếp vì cả loạt request cùng lỗi).
+    """
+
+    def __init__(self, initial=None, minimum=None, maximum=None):
+        self.minimum = Config.RATE_MIN_CONCURRENCY if minimum is None else minimum
+        self.maximum = Config.RATE_MAX_CONCURRENCY if maximum is None else maximum
+        initial = Config.RATE_INITIAL_CONCURRENCY if initial is None else initial
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.in_flight = 0
+        self.baseline = None  # Latency tốt nhất gần đây (EWMA chậm)
+        self.last_decrease = 0.0
+        self.condition = threading.Condition()
+
+    def try_acquire(self):
+        with self.condition:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self):
+        """Chờ (thread) tới khi có slot"""
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    async def acquire_async(self):
+        """Chờ (coroutine) tới khi có slot, không chặn event loop"""
+        while not self.try_acquire():
+            await asyncio.sleep(ASYNC_POLL_INTERVAL)
+
+    def abandon(self):
+        """Trả slot của request bị hủy giữa chừng (không tính vào AIMD)"""
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def release(self, latency=None, ok=True, throttled=False):
+        """Trả slot và cập nhật limit theo kết quả request"""
+        with self.condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+
+            if ok and latency is not None:
+                if self.baseline is None:
+                    self.baseline = latency
+                else:
+                    # Baseline giảm nhanh khi nhanh hơn, tăng chậm khi chậm hơn
+                    weight = 0.5 if latency < self.baseline else 0.05
+                    self.baseline += (latency - self.baseline) * weight
+
+            slow = (
+                ok and latency is not None and self.baseline
+                and latency > self.baseline * Config.RATE_LATENCY_FACTOR
+            )
+            if not ok or throttled or slow:
+                cooldown = self.baseline or 1.0
+                if now - self.last_decrease >= cooldown:
+                    factor = Config.RATE_DECREASE_FACTOR if (throttled or not ok) else Config.RATE_SLOW_DECREASE_FACTOR
+                    self.limit = max(self.minimum, self.limit * factor)
+                    self.last_decrease = now
+            else:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+            self.condition.notify_all()
+
+
+class RequestTicket:
+    """Một request đang chạy: ghi nhận kết quả để cập nhật concurrency"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.ok = True
+        self.throttled = False
+        self.cancelled = False
+
+    def fail(self, throttled=False):
+        self.ok = False
+        self.throttled = throttled
+
+
+class RateController:
+    """Token bucket (request/giây, ký tự/giây) + concurrency AIMD + tạm dừng toàn bộ khi bị 429"""
+
+    def __init__(self, requests_per_second=None, chars_per_second=None, concurrency=None):
+        requests_per_second = Config.RATE_REQUESTS_PER_SECOND if requests_per_second is None else requests_per_second
+        chars_per_second = Config.RATE_CHARS_PER_SECOND if chars_per_second is None else chars_per_second
+        self.requests = TokenBucket(requests_per_second, max(1.0, requests_per_second * Config.RATE_BURST_SECONDS))
+        self.chars = TokenBucket(chars_per_second, max(Config.TRANSLATE_BATCH_MAX_CHARS, chars_per_second * Config.RATE_BURST_SECONDS))
+        self.concurrency = concurrency or AdaptiveConcurrency()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+        self.throttled_count = 0
+        self.error_count = 0
+        self.request_count = 0
+
+    def pause(self, seconds):
+        """Server yêu cầu chờ (Retry-After): dừng mọi request mới trong seconds giây"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def _wait_time(self, chars):
+        with self.lock:
+            paused = max(0.0, self.paused_until - time.monotonic())
+            self.request_count += 1
+        return max(paused, self.requests.reserve(1), self.chars.reserve(chars))
+
+    def _fail(self, ticket, error):
+        if isinstance(error, (asyncio.CancelledError, GeneratorExit)):
+            # Ví dụ bản thua của hedged request: không phải lỗi của provider
+            ticket.cancelled = True
+            return
+        throttled, retry_after = throttle_info(error)
+        ticket.fail(throttled)
+        retry_after = parse_retry_after(retry_after)
+        if retry_after:
+            self.pause(min(retry_after, MAX_RETRY_AFTER))
+
+    def _finish(self, ticket):
+        if ticket.cancelled:
+            self.concurrency.abandon()
+            return
+        if not ticket.ok:
+            with self.lock:
+                self.error_count += 1
+                if ticket.throttled:
+                    self.throttled_count += 1
+        self.concurrency.release(time.monotonic() - ticket.started, ticket.ok, ticket.throttled)
+
+    @contextmanager
+    def request(self, chars):
+        """Giữ slot cho một request (thread): chờ token, chờ concurrency"""
+        time.sleep(self._wait_time(chars))
+        self.concurrency.acquire()
+        ticket = RequestTicket()
+        try:
+            yield ticket
+        except BaseException as e:
+            self._fail(ticket, e)
+            raise
+        finally:
+            self._finish(ticket)
+
+    @asynccontextmanager
+    async def request_async(self, chars):
+        """Bản async của request()"""
+        await asyncio.sleep(self._wait_time(chars))
+        await self.concurrency.acquire_async()
+        ticket = RequestTicket()
+        try:
+            yield ticket
+        except BaseException as e:
+            self._fail(ticket, e)
+            raise
+        finally:
+            self._finish(ticket)
+
+    def describe(self):
+        """Tóm tắt để log"""
+        return (
+            f"concurrency {self.concurrency.limit:.1f}, {self.request_count} request, "
+            f"{self.error_count} lỗi ({self.throttled_count} bị giới hạn 429)"
+        )
+
+
+@asynccontextmanager
+async def unlimited_async():
+    """Context async không giới hạn (backend không dùng rate control)"""
+    yield None
+
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+
+def get_rate_controller(backend):
+    """Rate controller dùng chung cho mọi job gọi cùng một backend trong process"""
+    with _controllers_lock:
+        if backend not in _controllers:
+            _controllers[backend] = RateController()
+        return _controllers[backend]
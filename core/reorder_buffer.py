@@ -0,0 +1,33 @@
+"""
+Reorder Buffer - Trả kết quả dịch theo thứ tự timeline ngay khi đoạn đầu liên tục đã xong
+"""
+
+
+class ReorderBuffer:
+    """Nhận (index, entry) theo thứ tự bất kỳ, trả ra các entry theo index liên tục từ 0
+
+    ready(entry): entry đã dùng được chưa (ví dụ bản dịch không phải None); entry chưa sẵn
+    sàng giữ lại mọi đoạn phía sau cho tới khi được sửa và add() được gọi lại.
+    Không thread-safe: người gọi giữ lock quanh add() và việc xử lý kết quả trả về,
+    để thứ tự ghi ra đúng thứ tự trả về.
+    """
+
+    def __init__(self, ready=None):
+        self.ready = ready or (lambda entry: True)
+        self.next_index = 0
+        self.pending = {}
+
+    def add(self, items):
+        """Thêm các kết quả, trả về [entry] vừa nối tiếp được phần đã trả (có thể rỗng)"""
+        for index, entry in items:
+            self.pending[index] = entry
+
+        released = []
+        while self.next_index in self.pending and self.ready(self.pending[self.next_index]):
+            released.append(self.pending.pop(self.next_index))
+            self.next_index += 1
+        return released
+
+    def held(self):
+        """Các (index, entry) đang chờ, theo thứ tự index"""
+        return sorted(self.pending.items(), key=lambda item: item[0])
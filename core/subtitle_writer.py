@@ -2,102 +2,284 @@
 Subtitle Writer - Ghi file phụ đề
 """
 
-from utils.helpers import format_timestamp_srt, format_timestamp_vtt, format_timestamp_ass
+import os
+from collections import namedtuple
+
+from config import Config
+from utils.helpers import format_timestamps_srt, format_timestamps_vtt, format_timestamps_ass
+
+ASS_HEADER = (
+    "[Script Info]\n"
+    "Title: Video Translator Subtitle\n"
+    "ScriptType: v4.00+\n"
+    "WrapStyle: 0\n"
+    "ScaledBorderAndShadow: yes\n"
+    "YCbCr Matrix: TV.601\n\n"
+    # Styles
+    "[V4+ Styles]\n"
+    "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, "
+    "OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, "
+    "ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+    "Alignment, MarginL, MarginR, MarginV, Encoding\n"
+    "Style: Default,Arial,20,&H00FFFFFF,&H000000FF,&H00000000,&H00000000,"
+    "-1,0,0,0,100,100,0,0,1,2,2,2,10,10,10,1\n\n"
+    # Events
+    "[Events]\n"
+    "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+)
+
+# Một định dạng phụ đề: header đầu file, hàm format cả mảng timestamp, chuỗi nối start/end,
+# xuống dòng trong text song ngữ và cue(số thứ tự, dòng thời gian, text)
+SubtitleFormat = namedtuple('SubtitleFormat', 'header timestamps separator line_break cue')
+
+FORMATS = {
+    'srt': SubtitleFormat(
+        None, format_timestamps_srt, " --> ", "\n",
+        lambda number, timing, text: f"{number}\n{timing}\n{text}\n\n"
+    ),
+    'vtt': SubtitleFormat(
+        "WEBVTT\n\n", format_timestamps_vtt, " --> ", "\n",
+        lambda number, timing, text: f"{timing}\n{text}\n\n"
+    ),
+    'ass': SubtitleFormat(
+        ASS_HEADER, format_timestamps_ass, ",", "\\N",
+        lambda number, timing, text: f"Dialogue: 0,{timing},Default,,0,0,0,,{text}\n"
+    )
+}
+
+
+def get_format(format_type):
+    """SubtitleFormat theo tên (srt, vtt, ass; không phân biệt hoa thường)"""
+    subtitle_format = FORMATS.get(format_type.lower())
+    if subtitle_format is None:
+        raise ValueError(f"Unsupported format: {format_type}")
+    return subtitle_format
+
+
+def format_timings(subtitle_format, segments):
+    """Dòng thời gian (start + separator + end) của các đoạn, mọi timestamp format trong một lần gọi"""
+    count = len(segments)
+    stamps = subtitle_format.timestamps(
+        [seg['start'] for seg in segments] + [seg['end'] for seg in segments]
+    )
+    separator = subtitle_format.separator
+    return [f"{start}{separator}{end}" for start, end in zip(stamps[:count], stamps[count:])]
+
+
+def render_cues(subtitle_format, first_number, timings, texts):
+    """Nội dung các cue liên tiếp, đánh số từ first_number"""
+    cue = subtitle_format.cue
+    return "".join([
+        cue(number, timing, text)
+        for number, timing, text in zip(range(first_number, first_number + len(texts)), timings, texts)
+    ])
+
+
+def render_transcript(written, texts):
+    """Các dòng transcript nối vào sau written dòng đã ghi (không có xuống dòng cuối file)"""
+    if not texts:
+        return ""
+    text = "\n".join(texts)
+    return f"\n{text}" if written else text
+
+
+def subtitle_text(seg, mode, line_break="\n"):
+    """Nội dung một đoạn theo mode: chinese, translated hoặc bilingual"""
+    if mode == 'chinese':
+        return seg['chinese']
+    if mode == 'translated':
+        return seg['vietnamese']
+    return f"{seg['chinese']}{line_break}{seg['vietnamese']}"
+
+
+def partial_path(filename):
+    """File đang ghi dở: subtitle_vi.srt -> subtitle_vi.partial.srt"""
+    base, ext = os.path.splitext(filename)
+    return f"{base}.partial{ext}"
+
+
+class SubtitleStream:
+    """Một file phụ đề ghi dần theo thứ tự timeline
+
+    write() ghi thêm nội dung đã format sẵn vào <tên>.partial.<ext> bằng một lần write và
+    flush ngay, nên file dở dang đọc được khi job còn chạy; commit() đổi tên thành file cuối
+    (os.replace, không có lúc nào file cuối bị ghi dở). abort() chỉ đóng file, giữ lại phần
+    đã ghi.
+    """
+
+    def __init__(self, filename, header=None):
+        self.filename = filename
+        self.partial = partial_path(filename)
+        self.count = 0
+        self.file = open(self.partial, 'w', encoding='utf-8', buffering=Config.SUBTITLE_WRITE_BUFFER)
+        if header:
+            self.file.write(header)
+            self.file.flush()
+
+    def write(self, text, count):
+        """Ghi thêm count đoạn (text đã format, đúng thứ tự) vào cuối file"""
+        self.file.write(text)
+        self.file.flush()
+        self.count += count
+
+    def commit(self):
+        """Ghi xuống đĩa, đóng file và đổi tên thành file cuối"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.partial, self.filename)
+
+    def abort(self):
+        """Đóng file, giữ nguyên file .partial"""
+        if not self.file.closed:
+            self.file.close()
+
 
 class SubtitleWriter:
     """Ghi các loại file phụ đề khác nhau"""
-    
-    def __init__(self):
-        self.writers = {
-            'srt': self.write_srt,
-            'vtt': self.write_vtt,
-            'ass': self.write_ass
-        }
-    
+
     def write_subtitle(self, segments, filename, mode, format_type):
         """Ghi file phụ đề theo format"""
-        format_type = format_type.lower()
-        writer = self.writers.get(format_type)
-        
-        if not writer:
-            raise ValueError(f"Unsupported format: {format_type}")
-        
-        writer(segments, filename, mode)
-    
+        subtitle_format = get_format(format_type)
+        texts = [subtitle_text(seg, mode, subtitle_format.line_break) for seg in segments]
+        self.write_all(
+            self.open_subtitle(filename, format_type),
+            render_cues(subtitle_format, 1, format_timings(subtitle_format, segments), texts),
+            len(texts)
+        )
+
+    def open_subtitle(self, filename, format_type):
+        """Mở file phụ đề ghi dần (SubtitleStream) theo format"""
+        return SubtitleStream(filename, get_format(format_type).header)
+
+    def open_transcript(self, filename):
+        """Mở file transcript (text thuần, mỗi đoạn một dòng) ghi dần"""
+        return SubtitleStream(filename)
+
     def write_srt(self, segments, filename, mode):
         """Ghi file SRT"""
-        with open(filename, 'w', encoding='utf-8') as f:
-            for i, seg in enumerate(segments, 1):
-                start = format_timestamp_srt(seg['start'])
-                end = format_timestamp_srt(seg['end'])
-                
-                f.write(f"{i}\n")
-                f.write(f"{start} --> {end}\n")
-                
-                if mode == 'chinese':
-                    f.write(f"{seg['chinese']}\n\n")
-                elif mode == 'translated':
-                    f.write(f"{seg['vietnamese']}\n\n")
-                else:  # bilingual
-                    f.write(f"{seg['chinese']}\n{seg['vietnamese']}\n\n")
-    
+        self.write_subtitle(segments, filename, mode, 'srt')
+
     def write_vtt(self, segments, filename, mode):
         """Ghi file WebVTT"""
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write("WEBVTT\n\n")
-            
-            for i, seg in enumerate(segments, 1):
-                start = format_timestamp_vtt(seg['start'])
-                end = format_timestamp_vtt(seg['end'])
-                
-                f.write(f"{start} --> {end}\n")
-                
-                if mode == 'chinese':
-                    f.write(f"{seg['chinese']}\n\n")
-                elif mode == 'translated':
-                    f.write(f"{seg['vietnamese']}\n\n")
-                else:  # bilingual
-                    f.write(f"{seg['chinese']}\n{seg['vietnamese']}\n\n")
-    
+        self.write_subtitle(segments, filename, mode, 'vtt')
+
     def write_ass(self, segments, filename, mode):
         """Ghi file ASS (Advanced SubStation Alpha)"""
-        with open(filename, 'w', encoding='utf-8') as f:
-            # ASS Header
-            f.write("[Script Info]\n")
-            f.write("Title: Video Translator Subtitle\n")
-            f.write("ScriptType: v4.00+\n")
-            f.write("WrapStyle: 0\n")
-            f.write("ScaledBorderAndShadow: yes\n")
-            f.write("YCbCr Matrix: TV.601\n\n")
-            
-            # Styles
-            f.write("[V4+ Styles]\n")
-            f.write("Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, "
-                   "OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, "
-                   "ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
-                   "Alignment, MarginL, MarginR, MarginV, Encoding\n")
-            f.write("Style: Default,Arial,20,&H00FFFFFF,&H000000FF,&H00000000,&H00000000,"
-                   "-1,0,0,0,100,100,0,0,1,2,2,2,10,10,10,1\n\n")
-            
-            # Events
-            f.write("[Events]\n")
-            f.write("Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n")
-            
-            for seg in segments:
-                start = format_timestamp_ass(seg['start'])
-                end = format_timestamp_ass(seg['end'])
-                
-                if mode == 'chinese':
-                    text = seg['chinese']
-                elif mode == 'translated':
-                    text = seg['vietnamese']
-                else:  # bilingual
-                    text = f"{seg['chinese']}\\N{seg['vietnamese']}"
-                
-                f.write(f"Dialogue: 0,{start},{end},Default,,0,0,0,,{text}\n")
-    
+        self.write_subtitle(segments, filename, mode, 'ass')
+
     def write_transcript(self, segments, filename, language='vietnamese'):
         """Ghi file transcript (text thuần)"""
-        with open(filename, 'w', encoding='utf-8') as f:
-            texts = [seg.get(language, '') for seg in segments]
-            f.write('\n'.join(texts))
\ No newline at end of file
+        texts = [seg.get(language, '') for seg in segments]
+        self.write_all(self.open_transcript(filename), render_transcript(0, texts), len(texts))
+
+    @staticmethod
+    def write_all(stream, text, count):
+        """Ghi toàn bộ nội dung vào stream rồi commit"""
+        try:
+            stream.write(text, count)
+        except BaseException:
+            stream.abort()
+            raise
+        stream.commit()
+
+
+class SubtitleOutputs:
+    """Mọi file phụ đề của một job, ghi trong một lượt duyệt các đoạn
+
+    Phụ đề/transcript tiếng Trung đi theo ngôn ngữ đích đầu tiên; mỗi ngôn ngữ có file dịch,
+    song ngữ (bilingual_<mã> khi dịch nhiều ngôn ngữ) và transcript riêng. Mọi ngôn ngữ dùng
+    chung timeline phiên âm, nên timestamp của mỗi đoạn chỉ format một lần cho mọi file.
+    """
+
+    def __init__(self, writer, output_dir, export_format, target_langs):
+        self.prefix = os.path.join(output_dir, "subtitle")
+        self.first = target_langs[0]
+        self.format = get_format(export_format)
+        ext = export_format.lower()
+        multiple = len(target_langs) > 1
+        # Dòng thời gian đã format của các đoạn từ timing_base, bỏ dần phần mọi ngôn ngữ đã ghi
+        self.timings = []
+        self.timing_base = 0
+        self.chinese = []
+        self.streams = {}
+        try:
+            self.chinese = [
+                writer.open_subtitle(f"{self.prefix}_chinese.{ext}", ext),
+                writer.open_transcript(f"{self.prefix}_transcript_chinese.txt")
+            ]
+            for lang in target_langs:
+                bilingual = f"bilingual_{lang}" if multiple else "bilingual"
+                self.streams[lang] = [
+                    writer.open_subtitle(f"{self.prefix}_{lang}.{ext}", ext),
+                    writer.open_subtitle(f"{self.prefix}_{bilingual}.{ext}", ext),
+                    writer.open_transcript(f"{self.prefix}_transcript_{lang}.txt")
+                ]
+        except BaseException:
+            self.abort()
+            raise
+
+    def all_streams(self):
+        streams = list(self.chinese)
+        for lang_streams in self.streams.values():
+            streams.extend(lang_streams)
+        return streams
+
+    def timings_for(self, start, segments):
+        """Dòng thời gian của segments (bắt đầu từ đoạn thứ start), format khi chưa có"""
+        known = self.timing_base + len(self.timings)
+        end = start + len(segments)
+        if end > known:
+            self.timings.extend(format_timings(self.format, segments[known - start:]))
+        return self.timings[start - self.timing_base:end - self.timing_base]
+
+    def append(self, lang, segments):
+        """Ghi thêm các đoạn đã dịch (đúng thứ tự) của ngôn ngữ lang vào mọi file liên quan"""
+        if not segments:
+            return
+        translated, bilingual, transcript = self.streams[lang]
+        start = translated.count
+        timings = self.timings_for(start, segments)
+        cue = self.format.cue
+        line_break = self.format.line_break
+        with_chinese = lang == self.first
+
+        translated_cues = []
+        bilingual_cues = []
+        chinese_cues = []
+        texts = []
+        chinese_texts = []
+        for number, seg, timing in zip(range(start + 1, start + len(segments) + 1), segments, timings):
+            chinese = seg['chinese']
+            text = seg['vietnamese']
+            translated_cues.append(cue(number, timing, text))
+            bilingual_cues.append(cue(number, timing, f"{chinese}{line_break}{text}"))
+            texts.append(text)
+            if with_chinese:
+                chinese_cues.append(cue(number, timing, chinese))
+                chinese_texts.append(chinese)
+
+        count = len(segments)
+        translated.write("".join(translated_cues), count)
+        bilingual.write("".join(bilingual_cues), count)
+        transcript.write(render_transcript(transcript.count, texts), count)
+        if with_chinese:
+            chinese_subtitle, chinese_transcript = self.chinese
+            chinese_subtitle.write("".join(chinese_cues), count)
+            chinese_transcript.write(render_transcript(chinese_transcript.count, chinese_texts), count)
+
+        # Đoạn mọi ngôn ngữ đã ghi qua không cần dòng thời gian nữa
+        written = min(lang_streams[0].count for lang_streams in self.streams.values())
+        if written > self.timing_base:
+            del self.timings[:written - self.timing_base]
+            self.timing_base = written
+
+    def commit(self):
+        """Ghi xuống đĩa và đổi tên mọi file .partial thành file cuối"""
+        for stream in self.all_streams():
+            stream.commit()
+
+    def abort(self):
+        """Đóng mọi file, giữ lại các file .partial đã ghi"""
+        for stream in self.all_streams():
+            stream.abort()
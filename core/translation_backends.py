@@ -0,0 +1,180 @@
+"""
+Translation Backends - Các backend dịch phía sau TranslationEngine (Google online, model local)
+"""
+
+import os
+import threading
+
+from deep_translator import GoogleTranslator
+
+from config import Config
+from .async_transport import get_async_transport
+
+try:
+    import torch
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+except ImportError:
+    AutoModelForSeq2SeqLM = None
+    AutoTokenizer = None
+
+
+class TranslationBackend:
+    """Interface của một backend dịch
+
+    batched: True -> engine gửi danh sách đoạn qua translate_batch() thay vì ghép các dòng
+    vào một request; local: True -> không gọi mạng (không qua rate control).
+    """
+
+    name = None
+    batched = False
+    local = False
+    transport = None
+
+    def translate(self, text, source, target):
+        """Dịch một đoạn text"""
+        raise NotImplementedError
+
+    def translate_batch(self, texts, source, target):
+        """Dịch nhiều đoạn, trả về danh sách cùng thứ tự"""
+        return [self.translate(text, source, target) for text in texts]
+
+    def pack_limits(self):
+        """(số ký tự, số đoạn) tối đa trong một phần việc gửi cho worker"""
+        return Config.TRANSLATE_BATCH_MAX_CHARS, Config.TRANSLATE_BATCH_MAX_SEGMENTS
+
+    def close(self):
+        """Giải phóng tài nguyên (session, model)"""
+
+
+class GoogleBackend(TranslationBackend):
+    """Google Translate: qua async transport (aiohttp) nếu có, không thì GoogleTranslator"""
+
+    name = "google"
+
+    def __init__(self, transport=None):
+        self.transport = transport
+        self.translators = {}
+        self.lock = threading.Lock()
+
+    def translator(self, source, target):
+        """GoogleTranslator cho cặp ngôn ngữ (tạo một lần)"""
+        with self.lock:
+            if (source, target) not in self.translators:
+                self.translators[(source, target)] = GoogleTranslator(source=source, target=target)
+            return self.translators[(source, target)]
+
+    def translate(self, text, source, target):
+        if self.transport is not None:
+            return self.transport.translate(text, source, target)
+        return self.translator(source, target).translate(text)
+
+    async def translate_async(self, text, source, target):
+        """Dịch trong event loop của transport"""
+        return await self.transport.translate_async(text, source, target)
+
+
+class LocalSeq2SeqBackend(TranslationBackend):
+    """Model dịch seq2seq lưu trên máy (ví dụ MarianMT opus-mt-zh-vi), chạy trên CPU
+
+    Các đoạn trong một phần việc được sắp theo độ dài rồi chia batch LOCAL_MT_BATCH_SIZE,
+    nên mỗi batch ít padding. Model chỉ chạy một batch mỗi lúc (mỗi batch đã dùng hết
+    các thread của torch).
+    """
+
+    batched = True
+    local = True
+
+    def __init__(self, model_dir, batch_size=None, threads=None, device=None):
+        if AutoModelForSeq2SeqLM is None:
+            raise ImportError("transformers chưa được cài đặt (cần cho backend dịch local)")
+        if not os.path.isdir(model_dir):
+            raise FileNotFoundError(f"Không tìm thấy model dịch local: {model_dir}")
+        self.model_dir = model_dir
+        self.name = f"local:{os.path.basename(os.path.normpath(model_dir))}"
+        self.batch_size = batch_size or Config.LOCAL_MT_BATCH_SIZE
+        self.threads = threads if threads is not None else Config.LOCAL_MT_THREADS
+        self.device = device or Config.LOCAL_MT_DEVICE
+        self.model = None
+        self.tokenizer = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Load tokenizer + model từ thư mục (không tải gì từ mạng)"""
+        if self.threads:
+            # Số thread intra-op của torch là thiết lập chung của cả process
+            torch.set_num_threads(self.threads)
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir, local_files_only=True)
+        model = AutoModelForSeq2SeqLM.from_pretrained(self.model_dir, local_files_only=True)
+        self.model = model.to(self.device).eval()
+
+    def pack_limits(self):
+        # Phần việc lớn -> sắp theo độ dài hiệu quả hơn; không giới hạn ký tự như request HTTP
+        return float('inf'), Config.LOCAL_MT_PACK_SEGMENTS
+
+    def translate(self, text, source, target):
+        return self.translate_batch([text], source, target)[0]
+
+    def translate_batch(self, texts, source, target):
+        """Dịch theo batch, đoạn cùng độ dài đi chung batch; trả về đúng thứ tự ban đầu"""
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        results = [None] * len(texts)
+
+        with self.lock:
+            if self.model is None:
+                self.load()
+            for start in range(0, len(order), self.batch_size):
+                indices = order[start:start + self.batch_size]
+                for index, translation in zip(indices, self.generate([texts[i] for i in indices])):
+                    results[index] = translation
+
+        return results
+
+    def generate(self, texts):
+        """Một batch qua encoder/decoder"""
+        inputs = self.tokenizer(
+            texts,
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=Config.LOCAL_MT_MAX_LENGTH
+        ).to(self.device)
+        # Không sinh dài hơn số vị trí model hỗ trợ
+        max_positions = getattr(self.model.config, 'max_position_embeddings', None) or Config.LOCAL_MT_MAX_LENGTH
+        with torch.inference_mode():
+            outputs = self.model.generate(
+                **inputs,
+                num_beams=Config.LOCAL_MT_NUM_BEAMS,
+                max_new_tokens=min(Config.LOCAL_MT_MAX_LENGTH, max_positions - 1)
+            )
+        return [text.strip() for text in self.tokenizer.batch_decode(outputs, skip_special_tokens=True)]
+
+    def close(self):
+        with self.lock:
+            self.model = None
+            self.tokenizer = None
+
+
+def local_model_dir(target_lang):
+    """Thư mục model local cho ngôn ngữ đích: LOCAL_MT_MODELS hoặc LOCAL_MT_MODEL_DIR/opus-mt-zh-<mã>"""
+    return Config.LOCAL_MT_MODELS.get(target_lang) or os.path.join(
+        Config.LOCAL_MT_MODEL_DIR,
+        f"opus-mt-zh-{target_lang}"
+    )
+
+
+_local_backends = {}
+_local_backends_lock = threading.Lock()
+
+
+def get_translation_backend(target_lang, name=None):
+    """Backend dịch theo Config.TRANSLATION_BACKEND; model local được load một lần mỗi process"""
+    name = name or Config.TRANSLATION_BACKEND
+    if name == "google":
+        return GoogleBackend(get_async_transport())
+    if name == "local":
+        model_dir = local_model_dir(target_lang)
+        with _local_backends_lock:
+            if model_dir not in _local_backends:
+                _local_backends[model_dir] = LocalSeq2SeqBackend(model_dir)
+            return _local_backends[model_dir]
+    raise ValueError(f"Backend dịch không hợp lệ: {name}")
@@ -0,0 +1,221 @@
+"""
+Translation Memory - Cache bản dịch dùng chung giữa các job (SQLite, WAL)
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from config import Config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    source_lang TEXT NOT NULL,
+    target_lang TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    source_text TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (source_lang, target_lang, backend, source_text)
+);
+CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations(last_used);
+"""
+
+# Dọn bớt bản ghi cũ sau mỗi N lần ghi
+PRUNE_EVERY = 500
+
+
+def normalize_text(text):
+    """Chuẩn hóa key: NFKC (full-width -> half-width), gộp khoảng trắng"""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFKC', text)).strip()
+
+
+class TranslationMemory:
+    """Cache bản dịch theo (ngôn ngữ nguồn, ngôn ngữ đích, text đã chuẩn hóa, backend)
+
+    Mỗi thread dùng một connection riêng; WAL cho phép nhiều job (thread/process) cùng đọc
+    trong khi một job ghi. Vượt max_entries thì xóa các bản ghi lâu không dùng nhất.
+    """
+
+    def __init__(self, path=None, max_entries=None):
+        self.path = path or Config.TRANSLATION_MEMORY_PATH
+        self.max_entries = Config.TRANSLATION_MEMORY_MAX_ENTRIES if max_entries is None else max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._initialized = False
+
+    def connect(self):
+        """Connection của thread hiện tại (tạo file/schema ở lần đầu)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=Config.TRANSLATION_MEMORY_BUSY_TIMEOUT)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+        with self._lock:
+            if not self._initialized:
+                conn.executescript(SCHEMA)
+                self._initialized = True
+
+        self._local.conn = conn
+        return conn
+
+    def get(self, source_lang, target_lang, text, backend):
+        """Bản dịch đã lưu hoặc None"""
+        conn = self.connect()
+        key = (source_lang, target_lang, backend, normalize_text(text))
+        row = conn.execute(
+            "SELECT translation FROM translations "
+            "WHERE source_lang = ? AND target_lang = ? AND backend = ? AND source_text = ?",
+            key
+        ).fetchone()
+        if row is None:
+            return None
+
+        with conn:
+            conn.execute(
+                "UPDATE translations SET last_used = ?, hits = hits + 1 "
+                "WHERE source_lang = ? AND target_lang = ? AND backend = ? AND source_text = ?",
+                (time.time(),) + key
+            )
+        return row[0]
+
+    def put(self, source_lang, target_lang, text, backend, translation):
+        """Lưu một bản dịch"""
+        conn = self.connect()
+        now = time.time()
+        with conn:
+            conn.execute(
+                "INSERT INTO translations "
+                "(source_lang, target_lang, backend, source_text, translation, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (source_lang, target_lang, backend, source_text) "
+                "DO UPDATE SET translation = excluded.translation, last_used = excluded.last_used",
+                (source_lang, target_lang, backend, normalize_text(text), translation, now, now)
+            )
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+
+    def prune(self, max_entries=None):
+        """Xóa các bản ghi lâu không dùng nhất cho tới khi còn max_entries, trả về số đã xóa"""
+        if max_entries is None:
+            max_entries = self.max_entries
+        conn = self.connect()
+        with conn:
+            cursor = conn.execute(
+                "DELETE FROM translations WHERE rowid IN ("
+                "SELECT rowid FROM translations ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (max_entries,)
+            )
+        return cursor.rowcount
+
+    def stats(self):
+        """Số bản ghi, tổng lượt dùng lại, dung lượng file"""
+        conn = self.connect()
+        entries, hits = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM translations"
+        ).fetchone()
+        size = sum(
+            os.path.getsize(self.path + suffix)
+            for suffix in ("", "-wal")
+            if os.path.exists(self.path + suffix)
+        )
+        return {'entries': entries, 'hits': hits, 'size_bytes': size}
+
+    def export_jsonl(self, path):
+        """Xuất toàn bộ ra file JSONL (mỗi dòng một bản dịch), trả về số dòng"""
+        conn = self.connect()
+        rows = conn.execute(
+            "SELECT source_lang, target_lang, backend, source_text, translation, hits "
+            "FROM translations ORDER BY source_lang, target_lang, backend, source_text"
+        )
+        count = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            for source_lang, target_lang, backend, source_text, translation, hits in rows:
+                record = {
+                    'source_lang': source_lang,
+                    'target_lang': target_lang,
+                    'backend': backend,
+                    'source_text': source_text,
+                    'translation': translation,
+                    'hits': hits,
+                }
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                count += 1
+        return count
+
+    def import_jsonl(self, path):
+        """Nhập từ file JSONL (ghi đè bản dịch trùng key), trả về số dòng đã nhập"""
+        conn = self.connect()
+        now = time.time()
+        count = 0
+        with open(path, 'r', encoding='utf-8') as f, conn:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                conn.execute(
+                    "INSERT INTO translations "
+                    "(source_lang, target_lang, backend, source_text, translation, created_at, last_used, hits) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (source_lang, target_lang, backend, source_text) "
+                    "DO UPDATE SET translation = excluded.translation",
+                    (
+                        record['source_lang'],
+                        record['target_lang'],
+                        record['backend'],
+                        normalize_text(record['source_text']),
+                        record['translation'],
+                        now,
+                        now,
+                        int(record.get('hits', 0)),
+                    )
+                )
+                count += 1
+        self.prune()
+        return count
+
+    def clear(self):
+        """Xóa toàn bộ bản dịch"""
+        conn = self.connect()
+        with conn:
+            conn.execute("DELETE FROM translations")
+        conn.execute("VACUUM")
+
+    def close(self):
+        """Đóng connection của thread hiện tại"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_memory = None
+_memory_lock = threading.Lock()
+
+
+def get_translation_memory():
+    """Translation memory dùng chung trong process (None nếu tắt trong Config)"""
+    global _memory
+    if not Config.TRANSLATION_MEMORY_ENABLED:
+        return None
+    with _memory_lock:
+        if _memory is None:
+            _memory = TranslationMemory()
+        return _memory
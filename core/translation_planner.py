@@ -0,0 +1,94 @@
+"""
+Translation Planner - Giảm số đoạn phải dịch: chuẩn hóa, bỏ qua đoạn không cần dịch, gộp đoạn trùng
+"""
+
+import threading
+import unicodedata
+
+from .translation_memory import normalize_text
+
+# Chữ viết của ngôn ngữ đích (tiền tố tên ký tự Unicode): đoạn chỉ gồm chữ này không cần dịch
+TARGET_SCRIPTS = {
+    'vi': ('LATIN',),
+    'en': ('LATIN',),
+    'th': ('THAI',),
+    'ko': ('HANGUL',),
+    'ja': ('HIRAGANA', 'KATAKANA'),
+}
+
+
+def needs_translation(text, target_lang):
+    """Đoạn có chữ cần dịch không
+
+    Không dịch: đoạn không có chữ (dấu câu, "♪", số) và đoạn mà mọi chữ đã thuộc chữ viết
+    của ngôn ngữ đích.
+    """
+    letters = [ch for ch in text if unicodedata.category(ch).startswith('L')]
+    if not letters:
+        return False
+    scripts = TARGET_SCRIPTS.get(target_lang)
+    if not scripts:
+        return True
+    return not all(unicodedata.name(ch, '').startswith(scripts) for ch in letters)
+
+
+class TranslationPlanner:
+    """Kế hoạch dịch của một job (một ngôn ngữ), dùng được khi segments đến dần (streaming)
+
+    admit() nhận từng segment: đoạn không cần dịch trả về ngay (giữ nguyên text), đoạn trùng
+    với đoạn đã gửi thì chờ bản dịch của đoạn đó, chỉ đoạn mới được gửi đi dịch (text đã chuẩn
+    hóa). resolve() chép bản dịch của mỗi đoạn đã gửi cho mọi segment trùng text.
+    """
+
+    def __init__(self, target_lang):
+        self.target_lang = target_lang
+        self.lock = threading.Lock()
+        self.pending = {}  # text chuẩn hóa -> [(index, seg), ...] đang chờ bản dịch
+        self.translations = {}  # text chuẩn hóa -> bản dịch
+        self.unique = 0
+        self.duplicates = 0
+        self.skipped = 0
+
+    def admit(self, index, seg):
+        """Nhận một segment, trả về (segment cần gửi dịch hoặc None, [(index, seg, bản dịch)] đã xong)
+
+        Segment gửi dịch mang text đã chuẩn hóa; đoạn không cần dịch có "bản dịch" là chính nó.
+        """
+        key = normalize_text(seg['text'])
+
+        if not needs_translation(key, self.target_lang):
+            with self.lock:
+                self.skipped += 1
+            return None, [(index, seg, " ".join(seg['text'].split()))]
+
+        with self.lock:
+            if key in self.translations:
+                self.duplicates += 1
+                return None, [(index, seg, self.translations[key])]
+            if key in self.pending:
+                self.duplicates += 1
+                self.pending[key].append((index, seg))
+                return None, []
+            self.unique += 1
+            self.pending[key] = [(index, seg)]
+
+        return dict(seg, text=key), []
+
+    def resolve(self, text, translation):
+        """Bản dịch của một đoạn đã gửi -> [(index, seg)] mọi segment trùng text (kể cả đoạn gửi)
+
+        None nếu text không phải đoạn đang chờ (ví dụ kết quả của đoạn bỏ qua).
+        """
+        key = normalize_text(text)
+        with self.lock:
+            waiting = self.pending.pop(key, None)
+            if waiting is not None:
+                self.translations[key] = translation
+        return waiting
+
+    def describe(self):
+        """Tóm tắt để log"""
+        return (
+            f"{self.unique} đoạn cần dịch, {self.duplicates} đoạn trùng, "
+            f"{self.skipped} đoạn không cần dịch"
+        )
@@ -2,19 +2,104 @@
 Translation Engine - Dịch văn bản
 """
 
+import asyncio
+import sqlite3
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from deep_translator import GoogleTranslator
+from contextlib import nullcontext
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait as futures_wait
 from config import Config
+from utils.cancellation import on_cancel, raise_if_cancelled
+from .translation_memory import get_translation_memory, normalize_text
+from .translation_backends import GoogleBackend, get_translation_backend
+from .translation_planner import TranslationPlanner
+from .reorder_buffer import ReorderBuffer
+from .rate_control import backoff_delay, get_rate_controller, unlimited_async
+from .provider_health import get_provider_health, run_hedged, run_hedged_async
+
+def one_line(text):
+    """Text một dòng: xuống dòng là ký tự phân tách các đoạn trong một gói dịch"""
+    return " ".join(text.split())
+
+
+def make_entry(seg, chinese, vietnamese):
+    """Dict phụ đề từ segment Whisper và bản dịch"""
+    return {
+        'start': seg['start'],
+        'end': seg['end'],
+        'chinese': chinese,
+        'vietnamese': vietnamese
+    }
+
+
+def describe_indices(indices):
+    """Số thứ tự phụ đề (bắt đầu từ 1) của các segment, gộp đoạn liên tiếp: #3, #7-9"""
+    ranges = []
+    for index in sorted(indices):
+        if ranges and index == ranges[-1][1] + 1:
+            ranges[-1][1] = index
+        else:
+            ranges.append([index, index])
+    return ", ".join(
+        f"#{first + 1}" if first == last else f"#{first + 1}-{last + 1}"
+        for first, last in ranges
+    )
+
+
+class UntranslatedError(Exception):
+    """Còn đoạn không dịch được sau mọi lượt dịch lại (UNTRANSLATED_POLICY = "fail")"""
+
+    def __init__(self, untranslated):
+        self.untranslated = untranslated  # {mã ngôn ngữ: [index segment]}
+        details = "; ".join(f"{lang}: {describe_indices(indices)}" for lang, indices in untranslated.items())
+        count = sum(len(indices) for indices in untranslated.values())
+        super().__init__(f"Không dịch được {count} đoạn (số thứ tự phụ đề) - {details}")
+
+
+def failed_entries(items):
+    """Dict phụ đề chưa có bản dịch cho các segment của một phần việc lỗi"""
+    return [(index, make_entry(seg, one_line(seg['text']), None)) for index, seg in items]
+
+
+def acquire_slot(slots, cancel_flag=None):
+    """Chờ chỗ trống trong semaphore, False nếu bị hủy trong lúc chờ"""
+    while not slots.acquire(timeout=Config.CANCEL_POLL_INTERVAL):
+        if cancel_flag and cancel_flag.is_set():
+            return False
+    return True
+
 
 class TranslationEngine:
     """Engine dịch văn bản với parallel processing"""
     
-    def __init__(self, source_lang='zh-CN', target_lang='vi', logger=None):
+    def __init__(self, source_lang='zh-CN', target_lang='vi', logger=None, memory=None, transport=None,
+                 rate=None, backend=None):
         self.source_lang = source_lang
         self.target_lang = target_lang
         self.logger = logger
-        self.translator = GoogleTranslator(source=source_lang, target=target_lang)
+        # Backend dịch (Google online, model local...); transport riêng -> Google qua transport đó
+        if backend is None:
+            backend = GoogleBackend(transport) if transport is not None else get_translation_backend(target_lang)
+        self.backend = backend
+        # Backend chính rồi tới các backend dự phòng (TRANSLATION_FALLBACK_BACKENDS), theo thứ tự
+        self.backends = [backend] + self.fallback_backends()
+        # Translation memory (SQLite) dùng chung giữa các job; None nếu tắt trong Config
+        self.memory = memory if memory is not None else get_translation_memory()
+        # Async transport (aiohttp, keep-alive); None -> backend chạy trên thread pool
+        self.transport = backend.transport
+        # Token bucket + concurrency AIMD dùng chung cho backend; None nếu tắt hoặc backend local
+        if rate is None and Config.RATE_CONTROL_ENABLED and not backend.local:
+            rate = get_rate_controller(backend.name)
+        self.rate = rate
+        self.memory_hits = 0
+        self.memory_misses = 0
+        self.packs_sent = 0
+        self.packed_segments = 0
+        self.pack_fallbacks = 0
+        # Index các segment vẫn lỗi sau lượt dịch lại của lần translate_stream gần nhất
+        self.untranslated = []
+        self.stats_lock = threading.Lock()
     
     def log(self, message):
         """Log message"""
@@ -22,73 +107,704 @@ class TranslationEngine:
             self.logger(message)
     
     def translate_text(self, text, max_retries=None):
-        """Dịch một đoạn text với retry"""
+        """Dịch một đoạn text: tra translation memory trước, chỉ gọi mạng khi chưa có"""
+        cached = self.lookup_memory(text)
+        if cached is not None:
+            return cached
+        return self.translate_uncached(text, max_retries)
+    
+    def translate_uncached(self, text, max_retries=None, wait=True):
+        """Gọi mạng dịch một đoạn text, lưu vào translation memory nếu thành công (None nếu lỗi)"""
+        translation, backend_name = self.request_translation(text, max_retries, wait)
+        if translation is not None:
+            self.store_memory(text, translation, backend_name)
+        return translation
+    
+    def translate_once(self, text):
+        """Lượt chính: mỗi backend thử một lần, worker không sleep (lỗi -> None, dịch lại sau)"""
+        return self.translate_uncached(text, len(self.backends), wait=False)
+    
+    def lookup_memory(self, text):
+        """Bản dịch trong translation memory hoặc None (đếm hit/miss)"""
+        if self.memory is None:
+            return None
+        try:
+            cached = self.memory.get(self.source_lang, self.target_lang, text, self.backend.name)
+        except sqlite3.Error as e:
+            self.log(f"⚠️ Translation memory lỗi: {str(e)}")
+            cached = None
+        
+        with self.stats_lock:
+            if cached is None:
+                self.memory_misses += 1
+            else:
+                self.memory_hits += 1
+        return cached
+    
+    def store_memory(self, text, translation, backend_name):
+        """Lưu bản dịch thành công vào translation memory, theo backend đã dịch ra nó"""
+        if self.memory is None:
+            return
+        try:
+            self.memory.put(self.source_lang, self.target_lang, text, backend_name, translation)
+        except sqlite3.Error as e:
+            self.log(f"⚠️ Không thể lưu translation memory: {str(e)}")
+    
+    def log_memory_stats(self):
+        """Log số đoạn lấy từ translation memory / phải gọi mạng"""
+        total = self.memory_hits + self.memory_misses
+        if self.memory is None or total == 0:
+            return
+        self.log(
+            f"💾 Translation memory: {self.memory_hits}/{total} đoạn có sẵn "
+            f"({self.memory_hits / total * 100:.0f}%), {self.memory_misses} đoạn gọi mạng"
+        )
+    
+    def fallback_backends(self):
+        """Các backend dự phòng dùng được (bỏ qua backend thiếu thư viện/model)"""
+        backends = []
+        for name in Config.TRANSLATION_FALLBACK_BACKENDS:
+            try:
+                backend = get_translation_backend(self.target_lang, name)
+            except (ImportError, OSError, ValueError) as e:
+                self.log(f"⚠️ Bỏ qua backend dự phòng '{name}': {str(e)}")
+                continue
+            if backend.name != self.backend.name:
+                backends.append(backend)
+        return backends
+    
+    def rate_for(self, backend):
+        """Rate controller của backend (None: backend local hoặc tắt rate control)"""
+        if backend is self.backend:
+            return self.rate
+        if backend.local or not Config.RATE_CONTROL_ENABLED:
+            return None
+        return get_rate_controller(backend.name)
+    
+    def choose_backend(self, attempt):
+        """Backend cho lần thử attempt: lần đầu ưu tiên backend chính, mỗi lần thử lại chuyển
+        sang backend kế tiếp; bỏ qua backend đang bị circuit breaker ngắt (None nếu tất cả)"""
+        start = min(attempt, len(self.backends) - 1)
+        for backend in self.backends[start:] + self.backends[:start]:
+            if get_provider_health(backend.name).allow():
+                return backend
+        return None
+    
+    def breaker_wait(self):
+        """Thời gian chờ tới khi một backend đang bị ngắt cho request thử"""
+        return min(get_provider_health(backend.name).retry_in() for backend in self.backends)
+    
+    def call_backend(self, backend, text):
+        """Một request tới backend: rate control, ghi latency/lỗi vào thống kê provider
+        
+        Request kết thúc mà không ghi được kết quả (lỗi khi chờ rate control, bị ngắt) trả lại
+        lượt thử half-open của circuit breaker, nếu không backend bị chặn mãi.
+        """
+        health = get_provider_health(backend.name)
+        rate = self.rate_for(backend)
+        recorded = False
+        try:
+            with rate.request(len(text)) if rate is not None else nullcontext():
+                started = time.monotonic()
+                try:
+                    translation = backend.translate(text, self.source_lang, self.target_lang)
+                except Exception:
+                    health.record_failure(time.monotonic() - started, self.log)
+                    recorded = True
+                    raise
+                health.record_success(time.monotonic() - started)
+                recorded = True
+                return translation
+        finally:
+            if not recorded:
+                health.abandon_probe()
+    
+    def request_translation(self, text, max_retries=None, wait=True):
+        """Gọi dịch với retry, chuyển sang backend dự phòng khi lỗi
+        
+        Trả về (bản dịch, tên backend đã dịch), (None, None) nếu thất bại.
+        Request chậm hơn percentile HEDGE_PERCENTILE của provider được gửi thêm một bản.
+        wait=False: không sleep giữa các lần thử (backoff, chờ circuit breaker).
+        """
         if max_retries is None:
             max_retries = Config.RETRY_ATTEMPTS
         
+        error = None
         for attempt in range(max_retries):
+            backend = self.choose_backend(attempt)
+            if backend is None:
+                error = "mọi backend đang bị ngắt (circuit breaker)"
+                if wait and attempt < max_retries - 1:
+                    time.sleep(self.breaker_wait())
+                continue
+            
             try:
-                return self.translator.translate(text)
+                if backend.local:
+                    return self.call_backend(backend, text), backend.name
+                translation = run_hedged(partial(self.call_backend, backend, text), get_provider_health(backend.name))
+                return translation, backend.name
             except Exception as e:
-                if attempt == max_retries - 1:
-                    self.log(f"⚠️ Không thể dịch: {text[:50]}... - Lỗi: {str(e)}")
-                    return f"[Lỗi dịch] {text}"
-                time.sleep(Config.RETRY_DELAY)
+                error = e
+                # Đã thử hết các backend -> chờ trước khi thử lại
+                if wait and attempt < max_retries - 1 and attempt >= len(self.backends) - 1:
+                    time.sleep(backoff_delay(attempt, getattr(e, 'retry_after', None)))
         
-        return text
+        self.log(f"⚠️ Không thể dịch: {text[:50]}... - Lỗi: {str(error)}")
+        return None, None
     
-    def translate_segments(self, segments, cancel_flag=None):
-        """Dịch nhiều segments song song"""
-        self.log(f"🚀 Đang dịch {len(segments)} đoạn song song...")
+    def translate_segment(self, seg):
+        """Dịch một segment Whisper thành dict phụ đề (bản dịch None nếu lỗi)
         
-        def translate_one(seg):
-            if cancel_flag and cancel_flag.is_set():
-                return None
+        Không tra translation memory: đoạn đã được tra khi chia việc (iter_work).
+        """
+        chinese = seg['text'].strip()
+        try:
+            vietnamese = self.translate_once(chinese)
+        except Exception as e:
+            self.log(f"⚠️ Lỗi dịch segment: {str(e)}")
+            vietnamese = None
+        
+        return make_entry(seg, chinese, vietnamese)
+    
+    def translate_pack(self, items):
+        """Dịch nhiều segment trong một request (mỗi đoạn một dòng)
+        
+        items: [(index, seg), ...], đã tra translation memory khi chia việc nên không tra lại.
+        Nếu bản dịch không tách lại được đúng số dòng, cả gói được dịch lại từng đoạn.
+        Backend batch (model local) nhận thẳng danh sách đoạn.
+        Đoạn lỗi có bản dịch None (được dịch lại sau lượt chính, xem retry_deferred).
+        """
+        if len(items) == 1:
+            index, seg = items[0]
+            return [(index, self.translate_segment(seg))]
+        
+        texts = [one_line(seg['text']) for _, seg in items]
+        if self.backend.batched:
+            lines = self.translate_batch(texts)
+            return [(index, make_entry(seg, text, line)) for (index, seg), text, line in zip(items, texts, lines)]
+        
+        try:
+            translation, backend_name = self.request_translation("\n".join(texts), len(self.backends), wait=False)
+        except Exception as e:
+            self.log(f"⚠️ Lỗi dịch gói: {str(e)}")
+            translation, backend_name = None, None
+        
+        lines = self.split_pack(texts, translation, backend_name)
+        if lines is None:
+            lines = []
+            for text in texts:
+                try:
+                    lines.append(self.translate_once(text))
+                except Exception as e:
+                    self.log(f"⚠️ Lỗi dịch segment: {str(e)}")
+                    lines.append(None)
+        
+        return [(index, make_entry(seg, text, line)) for (index, seg), text, line in zip(items, texts, lines)]
+    
+    def translate_batch(self, texts):
+        """Dịch nhiều đoạn bằng backend batch, lưu translation memory
+        
+        Backend lỗi (hoặc đang bị ngắt) -> dịch từng đoạn qua các backend dự phòng nếu có.
+        """
+        health = get_provider_health(self.backend.name)
+        started = time.monotonic()
+        try:
+            if not health.allow():
+                raise RuntimeError(f"backend '{self.backend.name}' đang bị ngắt")
+            translations = self.backend.translate_batch(texts, self.source_lang, self.target_lang)
+        except Exception as e:
+            health.record_failure(time.monotonic() - started, self.log)
+            self.log(f"⚠️ Lỗi dịch {len(texts)} đoạn: {str(e)}")
+            if len(self.backends) > 1:
+                return [self.translate_once(text) for text in texts]
+            return [None] * len(texts)
+        health.record_success(time.monotonic() - started)
+        
+        with self.stats_lock:
+            self.packs_sent += 1
+            self.packed_segments += len(texts)
+        for text, translation in zip(texts, translations):
+            self.store_memory(text, translation, self.backend.name)
+        return translations
+    
+    def split_pack(self, texts, translation, backend_name):
+        """Tách bản dịch của một gói theo dòng; None nếu không khớp (phải dịch lại từng đoạn)"""
+        lines = [line.strip() for line in translation.split("\n")] if translation else []
+        
+        if len(lines) != len(texts) or not all(lines):
+            with self.stats_lock:
+                self.pack_fallbacks += 1
+            if translation is not None:
+                self.log(f"⚠️ Gói {len(texts)} đoạn tách không khớp ({len(lines)} dòng), dịch lại từng đoạn")
+            return None
+        
+        with self.stats_lock:
+            self.packs_sent += 1
+            self.packed_segments += len(texts)
+        for text, line in zip(texts, lines):
+            self.store_memory(text, line, backend_name)
+        return lines
+    
+    async def call_backend_async(self, backend, text):
+        """Bản async của call_backend (backend không có transport chạy trên thread pool)
+        
+        asyncio.CancelledError (bản hedge thua, job bị hủy) không phải lỗi của provider:
+        không ghi vào circuit breaker, chỉ trả lại lượt thử half-open.
+        """
+        health = get_provider_health(backend.name)
+        rate = self.rate_for(backend)
+        recorded = False
+        try:
+            async with rate.request_async(len(text)) if rate is not None else unlimited_async():
+                started = time.monotonic()
+                try:
+                    if backend.transport is not None:
+                        translation = await backend.translate_async(text, self.source_lang, self.target_lang)
+                    else:
+                        translation = await asyncio.get_running_loop().run_in_executor(
+                            None, backend.translate, text, self.source_lang, self.target_lang
+                        )
+                except Exception:
+                    health.record_failure(time.monotonic() - started, self.log)
+                    recorded = True
+                    raise
+                health.record_success(time.monotonic() - started)
+                recorded = True
+                return translation
+        finally:
+            if not recorded:
+                health.abandon_probe()
+    
+    async def request_translation_async(self, text, max_retries=None, wait=True):
+        """Bản async của request_translation"""
+        if max_retries is None:
+            max_retries = Config.RETRY_ATTEMPTS
+        
+        error = None
+        for attempt in range(max_retries):
+            backend = self.choose_backend(attempt)
+            if backend is None:
+                error = "mọi backend đang bị ngắt (circuit breaker)"
+                if wait and attempt < max_retries - 1:
+                    await asyncio.sleep(self.breaker_wait())
+                continue
             
             try:
-                chinese = seg['text'].strip()
-                vietnamese = self.translate_text(chinese)
-                return {
-                    'start': seg['start'],
-                    'end': seg['end'],
-                    'chinese': chinese,
-                    'vietnamese': vietnamese
-                }
+                if backend.local:
+                    return await self.call_backend_async(backend, text), backend.name
+                translation = await run_hedged_async(
+                    partial(self.call_backend_async, backend, text),
+                    get_provider_health(backend.name)
+                )
+                return translation, backend.name
             except Exception as e:
+                error = e
+                if wait and attempt < max_retries - 1 and attempt >= len(self.backends) - 1:
+                    await asyncio.sleep(backoff_delay(attempt, getattr(e, 'retry_after', None)))
+        
+        self.log(f"⚠️ Không thể dịch: {text[:50]}... - Lỗi: {str(error)}")
+        return None, None
+    
+    async def translate_once_async(self, text):
+        """Bản async của translate_once"""
+        translation, backend_name = await self.request_translation_async(text, len(self.backends), wait=False)
+        if translation is not None:
+            self.store_memory(text, translation, backend_name)
+        return translation
+    
+    async def translate_pack_async(self, items):
+        """Bản async của translate_pack: chạy trong event loop của transport, không chiếm thread"""
+        texts = [one_line(seg['text']) for _, seg in items]
+        
+        if len(items) == 1:
+            lines = [await self.translate_once_async(texts[0])]
+        else:
+            translation, backend_name = await self.request_translation_async(
+                "\n".join(texts), len(self.backends), wait=False
+            )
+            lines = self.split_pack(texts, translation, backend_name)
+            if lines is None:
+                lines = await asyncio.gather(*(self.translate_once_async(text) for text in texts))
+        
+        return [(index, make_entry(seg, text, line)) for (index, seg), text, line in zip(items, texts, lines)]
+    
+    def iter_work(self, segments, on_received, on_cached, planner=None):
+        """Chia segments thành các phần việc [(index, seg), ...] gửi cho worker
+        
+        Đoạn đã có trong translation memory trả về ngay (on_cached), đây là lần tra duy nhất.
+        Chế độ gói: các đoạn còn lại được gom tới giới hạn ký tự / số đoạn của backend (pack_limits()).
+        None trong segments là tín hiệu nguồn đang tạm hết: gửi luôn gói đang gom.
+        planner: chỉ gửi đoạn mới (đã chuẩn hóa); đoạn trùng/không cần dịch không thành việc.
+        """
+        batching = Config.TRANSLATE_BATCH_ENABLED
+        max_chars, max_segments = self.backend.pack_limits()
+        pack = []
+        chars = 0
+        index = 0
+        
+        for seg in segments:
+            if seg is None:
+                if pack:
+                    yield pack
+                    pack, chars = [], 0
+                continue
+            
+            on_received()
+            item = (index, seg)
+            index += 1
+            
+            if planner is not None:
+                seg, ready = planner.admit(item[0], seg)
+                if ready:
+                    on_cached([(i, make_entry(s, one_line(s['text']), t)) for i, s, t in ready])
+                if seg is None:
+                    continue
+                item = (item[0], seg)
+            
+            if not batching:
                 chinese = seg['text'].strip()
-                self.log(f"⚠️ Lỗi dịch segment: {str(e)}")
-                return {
-                    'start': seg['start'],
-                    'end': seg['end'],
-                    'chinese': chinese,
-                    'vietnamese': f"[Lỗi dịch] {chinese}"
-                }
-        
-        results = []
-        max_workers = min(Config.MAX_WORKERS, len(segments))
-        
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {executor.submit(translate_one, seg): i 
-                      for i, seg in enumerate(segments)}
+                cached = self.lookup_memory(chinese)
+                if cached is not None:
+                    on_cached([(item[0], make_entry(seg, chinese, cached))])
+                else:
+                    yield [item]
+                continue
             
-            completed = 0
-            for future in as_completed(futures):
+            text = one_line(seg['text'])
+            cached = self.lookup_memory(text) if text else None
+            if cached is not None or not text:
+                on_cached([(item[0], make_entry(seg, text, cached or ""))])
+                continue
+            
+            size = len(text) + 1
+            if pack and (chars + size > max_chars or len(pack) >= max_segments):
+                yield pack
+                pack, chars = [], 0
+            pack.append(item)
+            chars += size
+        
+        if pack:
+            yield pack
+    
+    def translate_segments(self, segments, cancel_flag=None, progress=None):
+        """Dịch nhiều segments song song"""
+        self.log(f"🚀 Đang dịch {len(segments)} đoạn song song...")
+        return self.translate_stream(segments, cancel_flag, progress, total=len(segments))
+    
+    def translate_stream(self, segments, cancel_flag=None, progress=None, total=None, executor=None,
+                         on_ordered=None):
+        """Dịch song song các segment ngay khi nhận được (segments có thể là generator)
+        
+        Số phần việc đang dịch dở được giới hạn: khi worker bận, việc đọc segments tạm dừng
+        (nguồn phía trước, ví dụ hàng đợi phiên âm, sẽ tự chờ). progress(done, total)
+        nhận total = số đoạn đã nhận nếu chưa biết tổng. executor: thread pool dùng chung
+        (ví dụ giữa các engine dịch nhiều ngôn ngữ), None -> tạo pool MAX_WORKERS riêng.
+        Worker không chờ backoff: đoạn lỗi được dịch lại sau lượt chính (retry_deferred),
+        đoạn vẫn lỗi giữ text gốc và index được ghi vào self.untranslated.
+        on_ordered(entries): nhận kết quả theo thứ tự timeline ngay khi phần đầu liên tục đã
+        dịch xong (ví dụ ghi phụ đề dần); đoạn lỗi giữ lại các đoạn sau tới lượt dịch lại.
+        """
+        ordered = []
+        # Kết quả về theo thứ tự bất kỳ -> trả ra theo index; đoạn lỗi (None) chờ dịch lại
+        buffer = ReorderBuffer(ready=lambda entry: entry['vietnamese'] is not None)
+        order_lock = threading.Lock()
+        write_errors = []
+        lock = threading.Lock()
+        slots = threading.Semaphore(Config.MAX_WORKERS * 2)
+        state = {'received': 0, 'completed': 0}
+        # Mỗi text khác nhau chỉ dịch một lần, kết quả chép lại cho các đoạn trùng
+        planner = TranslationPlanner(self.target_lang) if Config.TRANSLATION_PLANNER_ENABLED else None
+        
+        def on_received():
+            with lock:
+                state['received'] += 1
+        
+        def release(items):
+            with order_lock:
+                entries = buffer.add(items)
+                ordered.extend(entries)
                 if cancel_flag and cancel_flag.is_set():
+                    return
+                if entries and on_ordered is not None and not write_errors:
+                    try:
+                        on_ordered(entries)
+                    except Exception as e:
+                        # Báo lỗi ghi (ví dụ hết dung lượng đĩa) cho người gọi sau khi dịch xong
+                        write_errors.append(e)
+        
+        def finish(items):
+            release(items)
+            with lock:
+                before = state['completed']
+                state['completed'] += len(items)
+                completed = state['completed']
+                received = total or state['received']
+            if progress:
+                progress(completed, received)
+            if before // Config.LOG_BATCH_SIZE != completed // Config.LOG_BATCH_SIZE or completed == total:
+                self.log(f"  ⏳ Đã dịch: {completed}/{received} đoạn")
+        
+        def deliver(items):
+            finish(self.fan_out(planner, items) if planner is not None else items)
+        
+        def translate_work(items):
+            if cancel_flag and cancel_flag.is_set():
+                return
+            try:
+                translated = self.translate_pack(items)
+            except Exception as e:
+                self.log(f"⚠️ Lỗi dịch: {str(e)}")
+                translated = failed_entries(items)
+            deliver(translated)
+        
+        if self.transport is not None:
+            self.translate_stream_async(segments, cancel_flag, on_received, deliver, planner)
+        else:
+            pool = executor or ThreadPoolExecutor(max_workers=Config.MAX_WORKERS)
+            futures = []
+            # Hủy: bỏ ngay các phần việc còn trong hàng đợi của pool
+            unregister = on_cancel(cancel_flag, lambda: [future.cancel() for future in list(futures)])
+            try:
+                for items in self.iter_work(segments, on_received, deliver, planner):
+                    if not acquire_slot(slots, cancel_flag):
+                        break
+                    future = pool.submit(translate_work, items)
+                    future.add_done_callback(lambda _: slots.release())
+                    futures.append(future)
+            finally:
+                unregister()
+                cancelled = cancel_flag and cancel_flag.is_set()
+                if cancelled:
+                    for future in futures:
+                        future.cancel()
+                else:
+                    futures_wait(futures)
+                if executor is None:
+                    # Bị hủy: không chờ request đang chạy dở, kết quả của nó bị bỏ
+                    pool.shutdown(wait=not cancelled)
+        
+        raise_if_cancelled(cancel_flag)
+        self.untranslated = self.retry_deferred(buffer.held(), cancel_flag, executor)
+        raise_if_cancelled(cancel_flag)
+        release([])
+        if self.untranslated:
+            self.log(
+                f"⚠️ {len(self.untranslated)} đoạn không dịch được, giữ nguyên text gốc: "
+                f"{describe_indices(self.untranslated)}"
+            )
+        
+        if planner is not None and (planner.duplicates or planner.skipped):
+            self.log(f"🧮 Trước khi dịch: {planner.describe()}")
+        self.log_memory_stats()
+        self.log_pack_stats()
+        self.log_provider_stats()
+        if self.rate is not None and self.rate.request_count:
+            self.log(f"🚦 Rate control: {self.rate.describe()}")
+        
+        if write_errors:
+            raise write_errors[0]
+        return ordered
+    
+    def translate_stream_async(self, segments, cancel_flag, on_received, finish, planner=None):
+        """Gửi các phần việc vào event loop của transport (tối đa ASYNC_MAX_IN_FLIGHT cùng lúc)"""
+        slots = threading.Semaphore(Config.ASYNC_MAX_IN_FLIGHT)
+        pending = set()
+        lock = threading.Lock()
+        
+        def on_done(future, items):
+            try:
+                if not future.cancelled() and future.exception() is None:
+                    finish(future.result())
+                elif not future.cancelled():
+                    self.log(f"⚠️ Lỗi dịch: {str(future.exception())}")
+                    finish(failed_entries(items))
+            finally:
+                with lock:
+                    pending.discard(future)
+                slots.release()
+        
+        def cancel_pending():
+            # Hủy coroutine trong event loop: request đang gửi dừng ngay, không đợi timeout
+            with lock:
+                waiting = list(pending)
+            for future in waiting:
+                future.cancel()
+        
+        unregister = on_cancel(cancel_flag, cancel_pending)
+        try:
+            for items in self.iter_work(segments, on_received, finish, planner):
+                if not acquire_slot(slots, cancel_flag):
                     break
-                
-                result = future.result()
-                if result:
-                    results.append((futures[future], result))
-                
-                completed += 1
-                if completed % Config.LOG_BATCH_SIZE == 0 or completed == len(segments):
-                    self.log(f"  ⏳ Đã dịch: {completed}/{len(segments)} đoạn")
-        
-        # Sort by original order
-        results.sort(key=lambda x: x[0])
-        return [r[1] for r in results]
+                future = self.transport.submit(self.translate_pack_async(items))
+                with lock:
+                    pending.add(future)
+                future.add_done_callback(partial(on_done, items=items))
+        finally:
+            unregister()
+        
+        if cancel_flag and cancel_flag.is_set():
+            cancel_pending()
+        with lock:
+            waiting = list(pending)
+        futures_wait(waiting)
+    
+    def retry_deferred(self, results, cancel_flag=None, executor=None):
+        """Dịch lại các đoạn lỗi của lượt chính, trả về index các đoạn vẫn lỗi
+        
+        results: [(index, entry), ...], entry lỗi có bản dịch None và được sửa tại chỗ.
+        Mỗi lượt chờ theo DEFERRED_RETRY_DELAYS (trên thread gọi, không chiếm worker) và chờ
+        circuit breaker cho request thử, rồi gửi lại các text lỗi theo gói như lượt chính;
+        text trùng chỉ gửi một lần. Đoạn vẫn lỗi sau lượt cuối giữ nguyên text gốc.
+        """
+        failed = [(index, entry) for index, entry in results if entry['vietnamese'] is None]
+        delays = Config.DEFERRED_RETRY_DELAYS
+        
+        for round_number, delay in enumerate(delays, 1):
+            if not failed:
+                break
+            texts = list(dict.fromkeys(normalize_text(entry['chinese']) for _, entry in failed))
+            self.log(
+                f"🔁 Dịch lại {len(texts)} đoạn lỗi sau {delay}s "
+                f"(lượt {round_number}/{len(delays)})..."
+            )
+            # Provider vừa bị ngắt -> chờ tới lúc được gửi request thử, không đốt lượt vô ích
+            if self.wait_cancellable(delay, cancel_flag) or \
+                    self.wait_cancellable(self.breaker_wait(), cancel_flag):
+                break
+            
+            translations = self.translate_many(texts, cancel_flag, executor)
+            remaining = []
+            for index, entry in failed:
+                translation = translations.get(normalize_text(entry['chinese']))
+                if translation is None:
+                    remaining.append((index, entry))
+                else:
+                    entry['vietnamese'] = translation
+            failed = remaining
+        
+        for _, entry in failed:
+            entry['vietnamese'] = entry['chinese']
+        return sorted(index for index, _ in failed)
+    
+    @staticmethod
+    def wait_cancellable(seconds, cancel_flag=None):
+        """Chờ seconds giây, True nếu bị hủy trong lúc chờ"""
+        if cancel_flag is None:
+            time.sleep(seconds)
+            return False
+        return cancel_flag.wait(seconds)
+    
+    def translate_many(self, texts, cancel_flag=None, executor=None):
+        """Dịch một danh sách text theo gói (như lượt chính), trả về {text: bản dịch hoặc None}
+        
+        Gói đầu tiên được gửi một mình (request thử khi circuit breaker đang half-open), chỉ
+        khi thành công mới gửi song song các gói còn lại. Không tra lại translation memory
+        (các text này đã tra ở lượt chính). executor: thread pool dùng chung nếu có.
+        """
+        packs = self.make_packs(texts)
+        translated = []
+        if not packs:
+            return {}
+        
+        def translate_work(items):
+            if cancel_flag and cancel_flag.is_set():
+                return []
+            if self.transport is not None:
+                return self.transport.submit(self.translate_pack_async(items)).result()
+            return self.translate_pack(items)
+        
+        def wait_all(futures):
+            # Bị hủy: bỏ các gói còn chờ, không chờ request đang chạy
+            while futures_wait(futures, timeout=Config.CANCEL_POLL_INTERVAL).not_done:
+                if cancel_flag and cancel_flag.is_set():
+                    for future in futures:
+                        future.cancel()
+                    return
+        
+        def collect(future):
+            if not future.done() or future.cancelled():
+                return
+            if future.exception() is None:
+                translated.extend(future.result())
+            else:
+                self.log(f"⚠️ Lỗi dịch: {str(future.exception())}")
+        
+        own_executor = executor is None
+        if own_executor:
+            executor = ThreadPoolExecutor(max_workers=Config.MAX_WORKERS)
+        try:
+            probe = executor.submit(translate_work, packs[0])
+            wait_all([probe])
+            collect(probe)
+            # Request thử vẫn lỗi hết -> provider chưa hồi phục, để lượt sau
+            if all(entry['vietnamese'] is None for _, entry in translated):
+                return {texts[index]: entry['vietnamese'] for index, entry in translated}
+            
+            futures = [executor.submit(translate_work, items) for items in packs[1:]]
+            try:
+                wait_all(futures)
+            finally:
+                for future in futures:
+                    future.cancel()
+            for future in futures:
+                collect(future)
+        finally:
+            if own_executor:
+                executor.shutdown(wait=not (cancel_flag and cancel_flag.is_set()))
+        return {texts[index]: entry['vietnamese'] for index, entry in translated}
+    
+    def make_packs(self, texts):
+        """Chia các text thành phần việc [(index, seg), ...] theo pack_limits() của backend"""
+        max_chars, max_segments = self.backend.pack_limits()
+        if not Config.TRANSLATE_BATCH_ENABLED:
+            max_segments = 1
+        packs = []
+        pack = []
+        chars = 0
+        for index, text in enumerate(texts):
+            size = len(text) + 1
+            if pack and (chars + size > max_chars or len(pack) >= max_segments):
+                packs.append(pack)
+                pack, chars = [], 0
+            pack.append((index, {'start': 0, 'end': 0, 'text': text}))
+            chars += size
+        if pack:
+            packs.append(pack)
+        return packs
+    
+    def fan_out(self, planner, items):
+        """Chép bản dịch của mỗi đoạn đã gửi cho mọi segment trùng text (giữ text gốc từng đoạn)"""
+        expanded = []
+        for index, entry in items:
+            waiting = planner.resolve(entry['chinese'], entry['vietnamese'])
+            if waiting is None:
+                expanded.append((index, entry))
+                continue
+            expanded.extend(
+                (seg_index, make_entry(seg, one_line(seg['text']), entry['vietnamese']))
+                for seg_index, seg in waiting
+            )
+        return expanded
+    
+    def log_provider_stats(self):
+        """Log latency, tỉ lệ lỗi, hedge và trạng thái circuit của từng backend đã dùng"""
+        for backend in self.backends:
+            health = get_provider_health(backend.name)
+            if health.requests:
+                self.log(f"📊 {health.describe()}")
+    
+    def log_pack_stats(self):
+        """Log số đoạn đã gói và số request tiết kiệm được"""
+        if not self.packs_sent and not self.pack_fallbacks:
+            return
+        self.log(
+            f"📦 Gói dịch: {self.packed_segments} đoạn trong {self.packs_sent} request"
+            f"{f', {self.pack_fallbacks} gói phải dịch lại từng đoạn' if self.pack_fallbacks else ''}"
+        )
     
     def set_target_language(self, target_lang):
-        """Thay đổi ngôn ngữ đích"""
+        """Thay đổi ngôn ngữ đích (backend local dùng model của ngôn ngữ mới)"""
         self.target_lang = target_lang
-        self.translator = GoogleTranslator(source=self.source_lang, target=target_lang)
\ No newline at end of file
+        if self.backend.local:
+            self.backend = get_translation_backend(target_lang, "local")
+        self.backends = [self.backend] + self.fallback_backends()
\ No newline at end of file
@@ -3,15 +3,73 @@ Video Processor - Xử lý video chính
 """
 
 import os
+import queue
 import sys
-import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait as futures_wait
 from pathlib import Path
 import whisper
 
 from config import Config
-from utils.helpers import sanitize_path, create_output_directory
-from .translator import TranslationEngine
-from .subtitle_writer import SubtitleWriter
+from utils.helpers import sanitize_path, create_output_directory, format_time_duration
+from utils.audio import decode_audio_pcm, write_wav, audio_duration
+from utils.cancellation import CancellationToken, CancelledError, on_cancel, raise_if_cancelled
+from utils.audio_cache import AudioCache
+from utils.vad import detect_speech_regions, concat_regions, plan_chunks
+from utils.ffmpeg_runner import run_ffmpeg, FFmpegError
+from utils.media_probe import probe_media, MediaProbeError
+from utils.progress import ProgressTracker
+from .translator import TranslationEngine, UntranslatedError
+from .subtitle_writer import SubtitleWriter, SubtitleOutputs
+from .parallel_transcriber import ParallelTranscriber, SegmentMerger
+from .model_pool import get_model_pool
+from .checkpoint import TranscriptionCheckpoint
+from .batched_whisper import BatchedWhisper, plan_windows
+
+# Khoảng progress cố định của từng bước (khi không có metadata để ước tính)
+STAGE_RANGES = {
+    'audio': (Config.PROGRESS_AUDIO_START, Config.PROGRESS_AUDIO_COMPLETE),
+    'transcribe': (Config.PROGRESS_TRANSCRIBE_START, Config.PROGRESS_TRANSCRIBE_COMPLETE),
+    'translate': (Config.PROGRESS_TRANSLATE_START, Config.PROGRESS_TRANSLATE_COMPLETE),
+    'subtitle': (Config.PROGRESS_SUBTITLE_START, Config.PROGRESS_SUBTITLE_COMPLETE),
+    'embed': (Config.PROGRESS_EMBED_START, Config.PROGRESS_COMPLETE),
+}
+
+# Đánh dấu trong hàng đợi segment giữa phiên âm và dịch
+_END_OF_SEGMENTS = object()
+
+
+def target_languages(target_lang):
+    """Danh sách mã ngôn ngữ đích (nhận một mã hoặc danh sách), bỏ trùng, giữ thứ tự"""
+    if isinstance(target_lang, str):
+        target_lang = [target_lang]
+    languages = list(dict.fromkeys(target_lang))
+    if not languages:
+        raise ValueError("Chưa chọn ngôn ngữ đích")
+    return languages
+
+
+UNTRANSLATED_POLICIES = ("warn", "fail")
+
+
+def untranslated_policy():
+    """Config.UNTRANSLATED_POLICY đã kiểm tra (gõ sai thì báo lỗi ngay, không âm thầm coi là "warn")"""
+    policy = Config.UNTRANSLATED_POLICY
+    if policy not in UNTRANSLATED_POLICIES:
+        raise ValueError(
+            f"UNTRANSLATED_POLICY không hợp lệ: {policy!r} (chọn {' hoặc '.join(UNTRANSLATED_POLICIES)})"
+        )
+    return policy
+
+
+class _PipelineError:
+    """Lỗi của luồng phiên âm, chuyển sang luồng dịch để raise lại"""
+
+    def __init__(self, error):
+        self.error = error
+
 
 class VideoProcessor:
     """Xử lý video: extract audio, transcribe, translate, embed subtitle"""
@@ -19,9 +77,13 @@ class VideoProcessor:
     def __init__(self, logger=None, progress_callback=None):
         self.logger = logger
         self.progress_callback = progress_callback
-        self.whisper_model = None
-        self.current_model_size = None
         self.subtitle_writer = SubtitleWriter()
+        self.audio_cache = AudioCache(logger=logger) if Config.AUDIO_CACHE_ENABLED else None
+        self.media_info = None
+        self.tracker = None
+        self.stage_fractions = {}
+        # {mã ngôn ngữ: [index segment]} không dịch được ở lần dịch gần nhất
+        self.untranslated = {}
     
     def log(self, message):
         """Log message"""
@@ -33,103 +95,511 @@ class VideoProcessor:
         if self.progress_callback:
             self.progress_callback(value, status, color or Config.COLOR_WARNING)
     
-    def get_whisper_model(self, model_size):
-        """Load Whisper model với caching"""
-        if self.whisper_model is None or self.current_model_size != model_size:
-            self.log(f"📥 Đang load model {model_size}... (cache lần đầu)")
-            self.whisper_model = whisper.load_model(model_size)
-            self.current_model_size = model_size
-            self.log(f"✓ Model {model_size} đã sẵn sàng")
+    def stage_progress(self, stage, fraction, status, color=None):
+        """Update progress theo tiến độ (0..1) của một bước, kèm thời gian còn lại"""
+        self.stage_fractions[stage] = max(fraction, self.stage_fractions.get(stage, 0))
+        if self.tracker:
+            value, eta = self.tracker.update(stage, fraction)
+            if eta and fraction < 1:
+                status = f"{status} ⏱ còn ~{format_time_duration(eta)}"
         else:
-            self.log(f"⚡ Sử dụng model {model_size} đã cache")
-        
-        return self.whisper_model
+            start, end = STAGE_RANGES[stage]
+            value = start + (end - start) * fraction
+            if stage == 'translate' and self.stage_fractions.get('transcribe', 1) < 1:
+                # Đang dịch song song với phiên âm: thanh progress đi theo bước phiên âm
+                return
+        self.update_progress(value, status, color)
     
-    def extract_audio(self, video_path, output_dir, cancel_flag=None):
-        """Tách audio từ video"""
-        if cancel_flag and cancel_flag.is_set():
-            raise Exception("Người dùng đã hủy")
+    def ffmpeg_progress(self, stage, label):
+        """Tạo callback chuyển tiến trình FFmpeg (0..1) sang thanh progress"""
+        def callback(fraction, speed):
+            if fraction is None:
+                return
+            status = f"{label} {fraction * 100:.0f}%"
+            if speed:
+                status += f" (x{speed.rstrip('x')})"
+            self.stage_progress(stage, fraction, status)
+        return callback
+    
+    def probe(self, video_path):
+        """Đọc metadata bằng ffprobe (cache), None nếu không có ffprobe"""
+        try:
+            info = probe_media(video_path)
+        except (FileNotFoundError, MediaProbeError, OSError) as e:
+            self.log(f"⚠️ Không đọc được metadata (ffprobe): {str(e)}")
+            return None
+        self.log(f"🎞️ {info.describe()}")
+        return info
+    
+    def get_whisper_model(self, model_size):
+        """Lấy model Whisper từ pool dùng chung (load nếu chưa có)"""
+        return get_model_pool().get(model_size, logger=self.log)
+    
+    def preload_model(self, model_size, on_status=None):
+        """Load + warm-up model trên thread nền (GUI lúc khởi động hoặc chạy headless)"""
+        return get_model_pool().preload(
+            model_size,
+            warmup=Config.MODEL_WARMUP,
+            on_status=on_status
+        )
+    
+    def extract_audio(self, video_path, output_dir, cancel_flag=None, keep_wav=None):
+        """Tách audio từ video thành mảng PCM float32 trong bộ nhớ"""
+        raise_if_cancelled(cancel_flag)
         
-        self.update_progress(
-            Config.PROGRESS_AUDIO_START,
+        self.stage_progress(
+            'audio',
+            0,
             "🎵 Đang tách âm thanh..."
         )
         self.log("\n[1/5] 🎵 TÁCH ÂM THANH")
         
-        audio_file = os.path.join(output_dir, Config.TEMP_AUDIO_FILE)
+        info = self.media_info or self.probe(video_path)
+        stream = info.best_audio_stream() if info else None
+        if info and len(info.audio_streams) > 1:
+            self.log(f"🔈 Dùng audio track #{stream} ({len(info.audio_streams)} track)")
         
-        cmd = [
-            'ffmpeg', '-i', video_path,
-            '-vn', '-acodec', 'pcm_s16le',
-            '-ar', str(Config.AUDIO_SAMPLE_RATE),
-            '-ac', str(Config.AUDIO_CHANNELS),
-            '-threads', str(Config.CPU_THREADS),
-            '-y', audio_file
-        ]
+        audio = None
+        cache_key = None
+        if self.audio_cache:
+            cache_key = self.audio_cache.make_key(video_path, stream=stream)
+            audio = self.audio_cache.get(cache_key)
+            if audio is not None:
+                self.log("⚡ Sử dụng audio đã cache")
+        
+        if audio is None:
+            # FFmpeg pipe s16le ra stdout -> Whisper không phải decode lại file WAV
+            audio = decode_audio_pcm(
+                video_path,
+                stream=stream,
+                duration=info.duration if info else None,
+                on_progress=self.ffmpeg_progress('audio', "🎵 Đang tách âm thanh..."),
+                cancel_flag=cancel_flag
+            )
+            if self.audio_cache:
+                self.audio_cache.put(cache_key, audio)
         
-        subprocess.run(cmd, check=True, capture_output=True)
+        if keep_wav is None:
+            keep_wav = Config.KEEP_EXTRACTED_AUDIO
+        if keep_wav:
+            audio_file = os.path.join(output_dir, Config.TEMP_AUDIO_FILE)
+            write_wav(audio, audio_file)
+            self.log(f"🐞 Đã ghi file debug: {Config.TEMP_AUDIO_FILE}")
         
-        self.update_progress(
-            Config.PROGRESS_AUDIO_COMPLETE,
+        self.stage_progress(
+            'audio',
+            1,
             "✓ Đã tách âm thanh",
             Config.COLOR_SUCCESS
         )
-        self.log("✅ Tách âm thanh hoàn tất")
+        self.log(f"✅ Tách âm thanh hoàn tất ({format_time_duration(audio_duration(audio))})")
         
-        return audio_file
+        return audio
     
-    def transcribe_audio(self, audio_file, model_size, cancel_flag=None):
-        """Phiên âm audio bằng Whisper"""
-        if cancel_flag and cancel_flag.is_set():
-            raise Exception("Người dùng đã hủy")
+    def transcribe_audio(self, audio, model_size, cancel_flag=None, checkpoint=None):
+        """Phiên âm audio bằng Whisper (mảng float32 16 kHz hoặc đường dẫn file)"""
+        segments = []
+        for chunk_segments in self.iter_transcribe(audio, model_size, cancel_flag, checkpoint=checkpoint):
+            segments.extend(chunk_segments)
         
-        self.update_progress(
-            Config.PROGRESS_TRANSCRIBE_START,
+        return {
+            'text': ''.join(seg['text'] for seg in segments),
+            'segments': segments,
+            'language': 'zh'
+        }
+    
+    def iter_transcribe(self, audio, model_size, cancel_flag=None, stream=False, checkpoint=None):
+        """Phiên âm, trả segments theo từng chunk ngay khi chunk xong (generator)
+        
+        stream=True: phiên âm tuần tự cũng chia chunk (STREAM_CHUNK_SECONDS) để bước dịch
+        bắt đầu sớm; stream=False giữ một lần gọi model.transcribe cho cả file.
+        checkpoint: lưu từng chunk đã xong và bỏ qua các chunk đã có khi chạy lại
+        (luôn chia chunk).
+        """
+        raise_if_cancelled(cancel_flag)
+        
+        self.stage_progress(
+            'transcribe',
+            0,
             f"🎙️ Đang phiên âm (model: {model_size})..."
         )
         self.log(f"\n[2/5] 🎙️ PHIÊN ÂM (Model: {model_size})")
         
-        model = self.get_whisper_model(model_size)
-        result = model.transcribe(
-            audio_file,
-            language='zh',
-            task='transcribe',
-            verbose=False
+        if isinstance(audio, str):
+            audio = whisper.load_audio(audio, sr=Config.AUDIO_SAMPLE_RATE)
+        
+        started = time.time()
+        options = {'language': 'zh', 'task': 'transcribe'}
+        # Một lần gọi model.transcribe cho cả file không có điểm dừng giữa chừng để lưu
+        stream = stream or checkpoint is not None
+        # Audio ngắn hơn một chunk: không đáng để khởi động process pool
+        parallel = (
+            Config.TRANSCRIBE_WORKERS > 1
+            and audio_duration(audio) > Config.TRANSCRIBE_CHUNK_SECONDS
         )
         
-        self.update_progress(
-            Config.PROGRESS_TRANSCRIBE_COMPLETE,
+        # Batch nhiều cửa sổ 30 giây độc lập (không giữ ngữ cảnh giữa các cửa sổ)
+        batched = Config.WHISPER_BATCH_SIZE > 1 and not parallel
+        
+        regions = None
+        if Config.VAD_ENABLED or parallel or stream or batched:
+            regions = self.detect_speech(audio)
+        
+        if Config.VAD_ENABLED and not regions:
+            self.log("⚠️ Không phát hiện giọng nói trong video")
+            source = []
+        elif parallel:
+            source = self.transcribe_parallel(audio, regions, model_size, options, cancel_flag, checkpoint)
+        elif batched:
+            source = self.transcribe_batched(audio, regions, model_size, cancel_flag, checkpoint)
+        elif stream:
+            source = self.transcribe_stream(audio, regions, model_size, options, cancel_flag, checkpoint)
+        else:
+            source = [self.transcribe_single(audio, regions, model_size, options, cancel_flag)]
+        
+        count = 0
+        for segments in source:
+            count += len(segments)
+            yield segments
+        
+        self.stage_progress(
+            'transcribe',
+            1,
             "✓ Phiên âm hoàn tất",
             Config.COLOR_SUCCESS
         )
-        self.log(f"✅ Phiên âm hoàn tất - Tìm thấy {len(result['segments'])} đoạn")
+        self.log(f"✅ Phiên âm hoàn tất - Tìm thấy {count} đoạn")
+        self.log_realtime_factor(time.time() - started, audio_duration(audio))
+    
+    def detect_speech(self, audio):
+        """Tìm các vùng giọng nói (VAD) và log thời lượng được bỏ qua"""
+        regions = detect_speech_regions(audio)
+        
+        if Config.VAD_ENABLED:
+            total = audio_duration(audio)
+            skipped = total - sum(end - start for start, end in regions)
+            percent = (skipped / total * 100) if total else 0
+            self.log(
+                f"🔇 VAD: {len(regions)} vùng giọng nói, bỏ qua "
+                f"{format_time_duration(skipped)} ({percent:.0f}%) khoảng lặng/nhạc nền"
+            )
         
-        return result
+        return regions
     
-    def translate_segments(self, segments, target_lang, cancel_flag=None):
-        """Dịch các segments"""
-        if cancel_flag and cancel_flag.is_set():
-            raise Exception("Người dùng đã hủy")
-        
-        self.update_progress(
-            Config.PROGRESS_TRANSLATE_START,
-            f"🌐 Đang dịch sang {Config.get_language_name(target_lang)}..."
+    @contextmanager
+    def interruptible(self, model, cancel_flag):
+        """Hủy được Whisper giữa chừng: mỗi lần encoder/decoder chạy (mỗi token) kiểm tra cancel_flag
+        
+        Chỉ raise trên thread đang phiên âm: model trong pool có thể được job khác dùng cùng lúc.
+        """
+        if cancel_flag is None:
+            yield
+            return
+        owner = threading.get_ident()
+        
+        def check(module, inputs):
+            if threading.get_ident() == owner:
+                raise_if_cancelled(cancel_flag)
+        
+        hooks = [
+            model.encoder.register_forward_pre_hook(check),
+            model.decoder.register_forward_pre_hook(check)
+        ]
+        try:
+            yield
+        finally:
+            for hook in hooks:
+                hook.remove()
+    
+    def run_whisper(self, audio, model_size, options, done=0.0, total=None, cancel_flag=None):
+        """Gọi model.transcribe, báo progress theo số cửa sổ 30 giây encoder đã chạy
+        
+        done/total: số giây audio đã phiên âm trước đó / tổng cần phiên âm (khi chia chunk)
+        """
+        total = total or audio_duration(audio)
+        windows = [0]
+        
+        def on_window(module, inputs, output):
+            # Mỗi lần encoder chạy ứng với một cửa sổ 30 giây
+            windows[0] += 1
+            processed = done + windows[0] * whisper.audio.CHUNK_LENGTH
+            fraction = min(processed / max(total, 1e-6), 0.99)
+            self.stage_progress('transcribe', fraction, "🎙️ Đang phiên âm...")
+        
+        # lease: model không bị pool unload/evict trong lúc đang phiên âm
+        with get_model_pool().lease(model_size, logger=self.log) as model:
+            hook = model.encoder.register_forward_hook(on_window)
+            try:
+                with self.interruptible(model, cancel_flag):
+                    return model.transcribe(audio, verbose=False, **options)
+            finally:
+                hook.remove()
+    
+    def transcribe_single(self, audio, regions, model_size, options, cancel_flag=None):
+        """Phiên âm bằng một lần gọi model.transcribe (giữ ngữ cảnh cả file)"""
+        timeline = None
+        if Config.VAD_ENABLED:
+            audio, timeline = concat_regions(audio, regions)
+        
+        result = self.run_whisper(audio, model_size, options, cancel_flag=cancel_flag)
+        
+        if timeline:
+            timeline.remap_segments(result['segments'])
+        
+        return result['segments']
+    
+    def transcribe_stream(self, audio, regions, model_size, options, cancel_flag=None, checkpoint=None):
+        """Phiên âm tuần tự theo chunk cắt tại khoảng lặng, trả segments từng chunk"""
+        duration = None if Config.VAD_ENABLED else audio_duration(audio)
+        chunks = plan_chunks(regions, Config.STREAM_CHUNK_SECONDS, duration)
+        total = sum(end - start for regions in chunks for start, end in regions)
+        completed = checkpoint.resume(audio, model_size, chunks) if checkpoint else []
+        merger = SegmentMerger()
+        done = 0.0
+        prompt = None
+        
+        for index, regions in enumerate(chunks):
+            if index < len(completed):
+                segments = completed[index]
+                done += sum(end - start for start, end in regions)
+                prompt = ''.join(seg['text'] for seg in segments).strip() or prompt
+                self.stage_progress('transcribe', done / max(total, 1e-6), "♻️ Đọc checkpoint...")
+                yield merger.add(segments)
+                continue
+            
+            raise_if_cancelled(cancel_flag)
+            
+            chunk_audio, timeline = concat_regions(audio, regions)
+            # Text chunk trước làm prompt: giữ ngữ cảnh (tên riêng, văn phong) qua biên chunk
+            result = self.run_whisper(
+                chunk_audio,
+                model_size,
+                dict(options, initial_prompt=prompt),
+                done,
+                total,
+                cancel_flag
+            )
+            done += audio_duration(chunk_audio)
+            prompt = result['text'].strip() or prompt
+            
+            segments = timeline.remap_segments(result['segments'])
+            if checkpoint:
+                checkpoint.append(index, segments)
+            yield merger.add(segments)
+    
+    def transcribe_batched(self, audio, regions, model_size, cancel_flag=None, checkpoint=None):
+        """Phiên âm theo batch WHISPER_BATCH_SIZE cửa sổ 30 giây, trả segments từng batch"""
+        duration = None if Config.VAD_ENABLED else audio_duration(audio)
+        windows = plan_windows(regions, duration)
+        size = Config.WHISPER_BATCH_SIZE
+        batches = [windows[i:i + size] for i in range(0, len(windows), size)]
+        # Checkpoint lưu theo batch: mỗi batch là một "chunk"
+        chunks = [[region for window in batch for region in window] for batch in batches]
+        completed = checkpoint.resume(audio, model_size, chunks) if checkpoint else []
+        merger = SegmentMerger()
+        
+        self.log(f"📦 Phiên âm {len(windows)} cửa sổ theo batch {size}")
+        
+        for index, batch in enumerate(batches):
+            if index < len(completed):
+                yield merger.add(completed[index])
+                continue
+            
+            raise_if_cancelled(cancel_flag)
+            
+            pieces = [concat_regions(audio, window) for window in batch]
+            with get_model_pool().lease(model_size, logger=self.log) as model:
+                with self.interruptible(model, cancel_flag):
+                    window_segments = BatchedWhisper(model).transcribe([piece for piece, _ in pieces])
+            
+            segments = []
+            for (_, timeline), found in zip(pieces, window_segments):
+                segments.extend(timeline.remap_segments(found))
+            if checkpoint:
+                checkpoint.append(index, segments)
+            
+            self.stage_progress(
+                'transcribe',
+                (index + 1) / len(batches),
+                f"🎙️ Đang phiên âm... ({index + 1}/{len(batches)} batch)"
+            )
+            yield merger.add(segments)
+    
+    def transcribe_parallel(self, audio, regions, model_size, options, cancel_flag=None, checkpoint=None):
+        """Chia audio tại khoảng lặng và phiên âm trên nhiều process, trả segments từng chunk"""
+        # Không bật VAD: chunk phủ liền mạch toàn bộ audio, chỉ dùng khoảng lặng làm điểm cắt
+        duration = None if Config.VAD_ENABLED else audio_duration(audio)
+        chunks = plan_chunks(regions, Config.TRANSCRIBE_CHUNK_SECONDS, duration)
+        completed = checkpoint.resume(audio, model_size, chunks) if checkpoint else []
+        merger = SegmentMerger()
+        
+        for segments in completed:
+            yield merger.add(segments)
+        
+        remaining = chunks[len(completed):]
+        if not remaining:
+            return
+        
+        def on_chunk_done(done, total):
+            done += len(completed)
+            self.stage_progress(
+                'transcribe',
+                done / len(chunks),
+                f"🎙️ Đang phiên âm... ({done}/{len(chunks)} chunk)"
+            )
+        
+        transcriber = ParallelTranscriber(
+            model_size,
+            workers=Config.TRANSCRIBE_WORKERS,
+            logger=self.logger,
+            progress=on_chunk_done
         )
-        self.log(f"\n[3/5] 🌐 DỊCH SANG {Config.get_language_name(target_lang).upper()}")
+        # verbose=None: không in progress bar của Whisper từ nhiều process
+        chunk_iter = transcriber.iter_chunks(audio, remaining, dict(options, verbose=None), cancel_flag)
+        for index, segments in enumerate(chunk_iter, start=len(completed)):
+            if checkpoint:
+                checkpoint.append(index, segments)
+            yield merger.add(segments)
+    
+    def log_realtime_factor(self, elapsed, duration):
+        """Log tốc độ phiên âm theo real-time factor (thời gian xử lý / thời lượng audio)"""
+        if duration <= 0:
+            return
+        rtf = elapsed / duration
+        speed = (1 / rtf) if rtf > 0 else 0
+        self.log(f"⚡ Tốc độ phiên âm: RTF {rtf:.2f} (x{speed:.1f} thời gian thực)")
+    
+    def make_translators(self, target_langs):
+        """Một TranslationEngine cho mỗi ngôn ngữ đích (log có tiền tố ngôn ngữ khi dịch nhiều)"""
+        translators = {}
+        for lang in target_langs:
+            logger = self.logger
+            if len(target_langs) > 1 and self.logger:
+                logger = lambda message, lang=lang: self.logger(f"  [{lang}] {message.strip()}")
+            translators[lang] = TranslationEngine(
+                source_lang='zh-CN',
+                target_lang=lang,
+                logger=logger
+            )
+        return translators
+    
+    def translate_languages(self, translators, sources, cancel_flag, progress, total=None, stop=None,
+                            outputs=None):
+        """Dịch đồng thời sang nhiều ngôn ngữ, trả về {mã ngôn ngữ: segments đã dịch}
         
-        translator = TranslationEngine(
-            source_lang='zh-CN',
-            target_lang=target_lang,
-            logger=self.logger
+        sources: {mã ngôn ngữ: segments hoặc generator}. Các engine dùng chung một thread
+        pool MAX_WORKERS (và rate controller của backend) nên thêm ngôn ngữ không nhân số
+        request đồng thời lên. progress(lang, done, total). Một ngôn ngữ lỗi -> set stop.
+        outputs: SubtitleOutputs nhận bản dịch theo thứ tự ngay khi có (ghi phụ đề dần).
+        """
+        def on_ordered(lang):
+            if outputs is None:
+                return None
+            return lambda entries: outputs.append(lang, entries)
+        
+        if len(translators) == 1:
+            lang, translator = next(iter(translators.items()))
+            progress_lang = lambda done, received: progress(lang, done, received)
+            return {
+                lang: translator.translate_stream(
+                    sources[lang],
+                    cancel_flag,
+                    progress_lang,
+                    total,
+                    on_ordered=on_ordered(lang)
+                )
+            }
+        
+        workers = ThreadPoolExecutor(max_workers=Config.MAX_WORKERS)
+        try:
+            with ThreadPoolExecutor(max_workers=len(translators)) as drivers:
+                futures = {
+                    lang: drivers.submit(
+                        translator.translate_stream,
+                        sources[lang],
+                        cancel_flag,
+                        lambda done, received, lang=lang: progress(lang, done, received),
+                        total,
+                        workers,
+                        on_ordered(lang)
+                    )
+                    for lang, translator in translators.items()
+                }
+                finished, _ = futures_wait(futures.values(), return_when=FIRST_EXCEPTION)
+                if stop is not None and any(future.exception() for future in finished):
+                    stop.set()
+                return {lang: future.result() for lang, future in futures.items()}
+        finally:
+            # Bị hủy: không chờ các request đang chạy dở (kết quả bị bỏ)
+            workers.shutdown(wait=not (cancel_flag and cancel_flag.is_set()))
+    
+    def check_untranslated(self, translators):
+        """Gom các đoạn không dịch được của mọi ngôn ngữ; UNTRANSLATED_POLICY = "fail" -> dừng job"""
+        self.untranslated = {
+            lang: translator.untranslated
+            for lang, translator in translators.items()
+            if translator.untranslated
+        }
+        if self.untranslated and untranslated_policy() == "fail":
+            raise UntranslatedError(self.untranslated)
+    
+    def translate_progress(self, target_langs, scale=None):
+        """Callback progress(lang, done, total) gộp tiến độ các ngôn ngữ thành bước 'translate'
+        
+        scale(): hệ số nhân thêm (ví dụ phần audio đã phiên âm khi dịch song song phiên âm).
+        """
+        fractions = dict.fromkeys(target_langs, 0.0)
+        counts = {}
+        lock = threading.Lock()
+        
+        def progress(lang, done, total):
+            with lock:
+                fractions[lang] = done / total if total else 1
+                counts[lang] = (done, total)
+                fraction = sum(fractions.values()) / len(fractions)
+                done_all = sum(d for d, _ in counts.values())
+                total_all = sum(t for _, t in counts.values())
+            if scale is not None:
+                fraction *= scale()
+            self.stage_progress(
+                'translate',
+                fraction,
+                f"🌐 Đang dịch... ({done_all}/{total_all} đoạn)"
+            )
+        
+        return progress
+    
+    def translate_segments(self, segments, target_langs, cancel_flag=None, outputs=None):
+        """Dịch các segments sang một hoặc nhiều ngôn ngữ, trả về {mã ngôn ngữ: segments đã dịch}
+        
+        outputs: SubtitleOutputs ghi phụ đề dần trong lúc dịch (None -> ghi ở save_subtitles).
+        """
+        raise_if_cancelled(cancel_flag)
+        
+        names = ", ".join(Config.get_language_name(lang) for lang in target_langs)
+        self.stage_progress(
+            'translate',
+            0,
+            f"🌐 Đang dịch sang {names}..."
         )
+        self.log(f"\n[3/5] 🌐 DỊCH SANG {names.upper()}")
         
-        translated = translator.translate_segments(segments, cancel_flag)
+        translators = self.make_translators(target_langs)
+        translated = self.translate_languages(
+            translators,
+            {lang: segments for lang in target_langs},
+            cancel_flag,
+            self.translate_progress(target_langs),
+            total=len(segments),
+            outputs=outputs
+        )
         
-        if cancel_flag and cancel_flag.is_set():
-            raise Exception("Người dùng đã hủy")
+        raise_if_cancelled(cancel_flag)
+        self.check_untranslated(translators)
         
-        self.update_progress(
-            Config.PROGRESS_TRANSLATE_COMPLETE,
+        self.stage_progress(
+            'translate',
+            1,
             "✓ Dịch hoàn tất",
             Config.COLOR_SUCCESS
         )
@@ -137,71 +607,164 @@ class VideoProcessor:
         
         return translated
     
-    def save_subtitles(self, segments, output_dir, target_lang, export_format, cancel_flag=None):
-        """Lưu tất cả các file phụ đề"""
-        if cancel_flag and cancel_flag.is_set():
-            raise Exception("Người dùng đã hủy")
+    def transcribe_and_translate(self, audio, model_size, target_langs, cancel_flag=None, checkpoint=None,
+                                 outputs=None):
+        """Phiên âm và dịch chồng lên nhau: segment đi qua hàng đợi giới hạn sang bước dịch
         
-        self.update_progress(
-            Config.PROGRESS_SUBTITLE_START,
-            "💾 Đang lưu phụ đề..."
-        )
-        self.log("\n[4/5] 💾 LƯU PHỤ ĐỀ")
+        Mỗi ngôn ngữ đích có một hàng đợi riêng, cùng nhận mọi segment từ một lần phiên âm.
+        Trả về (result phiên âm, {mã ngôn ngữ: segments đã dịch}).
+        Tổng thời gian ~ max(phiên âm, dịch).
+        """
+        names = ", ".join(Config.get_language_name(lang) for lang in target_langs)
+        self.log(f"🔀 Dịch sang {names} song song với phiên âm")
         
-        output_prefix = os.path.join(output_dir, "subtitle")
-        format_ext = export_format.lower()
+        queues = {lang: queue.Queue(maxsize=Config.SEGMENT_QUEUE_SIZE) for lang in target_langs}
+        # stop: bên dịch dừng (xong, lỗi hoặc bị hủy) -> Whisper dừng ngay giữa chunk
+        stop = CancellationToken()
+        unregister = on_cancel(cancel_flag, stop.set)
+        transcribed = []
         
-        # Save subtitle files
-        self.subtitle_writer.write_subtitle(
-            segments,
-            f"{output_prefix}_chinese.{format_ext}",
-            'chinese',
-            format_ext
-        )
+        def put(item):
+            # Bên dịch đã dừng (lỗi/hủy) -> không chờ chỗ trống trong hàng đợi nữa
+            for segment_queue in queues.values():
+                while True:
+                    if stop.is_set():
+                        return False
+                    try:
+                        segment_queue.put(item, timeout=Config.TRANSCRIBE_POLL_INTERVAL)
+                        break
+                    except queue.Full:
+                        continue
+            return True
         
-        self.subtitle_writer.write_subtitle(
-            segments,
-            f"{output_prefix}_{target_lang}.{format_ext}",
-            'translated',
-            format_ext
-        )
+        def produce():
+            try:
+                segment_iter = self.iter_transcribe(
+                    audio,
+                    model_size,
+                    stop,
+                    stream=True,
+                    checkpoint=checkpoint
+                )
+                for segments in segment_iter:
+                    transcribed.extend(segments)
+                    for seg in segments:
+                        if not put(seg):
+                            return
+            except Exception as e:
+                put(_PipelineError(e))
+            finally:
+                put(_END_OF_SEGMENTS)
         
-        self.subtitle_writer.write_subtitle(
-            segments,
-            f"{output_prefix}_bilingual.{format_ext}",
-            'bilingual',
-            format_ext
-        )
+        def consume(segment_queue):
+            while True:
+                try:
+                    item = segment_queue.get_nowait()
+                except queue.Empty:
+                    # Phiên âm chưa ra đoạn mới: gửi luôn gói dịch đang gom thay vì chờ đầy
+                    yield None
+                    item = None
+                    while item is None:
+                        # Ngôn ngữ khác bị lỗi hoặc bị hủy -> dừng, không chờ segment nữa
+                        if stop.is_set() or (cancel_flag and cancel_flag.is_set()):
+                            return
+                        try:
+                            item = segment_queue.get(timeout=Config.TRANSCRIBE_POLL_INTERVAL)
+                        except queue.Empty:
+                            continue
+                if item is _END_OF_SEGMENTS:
+                    return
+                if isinstance(item, _PipelineError):
+                    raise item.error
+                yield item
+        
+        def transcribed_fraction():
+            # Chưa biết tổng số đoạn: tiến độ dịch không vượt quá phần audio đã phiên âm
+            return self.stage_fractions.get('transcribe', 0) if producer.is_alive() else 1
+        
+        translators = self.make_translators(target_langs)
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            translated = self.translate_languages(
+                translators,
+                {lang: consume(segment_queue) for lang, segment_queue in queues.items()},
+                cancel_flag,
+                self.translate_progress(target_langs, scale=transcribed_fraction),
+                stop=stop,
+                outputs=outputs
+            )
+        finally:
+            stop.set()
+            unregister()
+            producer.join()
+        
+        raise_if_cancelled(cancel_flag)
+        self.check_untranslated(translators)
         
-        # Save transcript files
-        self.subtitle_writer.write_transcript(
-            segments,
-            f"{output_prefix}_transcript_chinese.txt",
-            'chinese'
+        self.stage_progress(
+            'translate',
+            1,
+            "✓ Dịch hoàn tất",
+            Config.COLOR_SUCCESS
         )
+        self.log(f"✅ Dịch hoàn tất ({len(transcribed)} đoạn x {len(target_langs)} ngôn ngữ)")
+        
+        result = {
+            'text': ''.join(seg['text'] for seg in transcribed),
+            'segments': transcribed,
+            'language': 'zh'
+        }
+        return result, translated
+    
+    def open_subtitles(self, output_dir, export_format, target_langs):
+        """Mở các file phụ đề ghi dần (*.partial.<ext>) trước khi dịch"""
+        return SubtitleOutputs(self.subtitle_writer, output_dir, export_format, target_langs)
+    
+    def save_subtitles(self, translations, output_dir, export_format, cancel_flag=None, outputs=None):
+        """Lưu tất cả các file phụ đề
+        
+        translations: {mã ngôn ngữ: segments đã dịch}. Phụ đề tiếng Trung ghi một lần;
+        dịch nhiều ngôn ngữ thì file song ngữ có thêm mã ngôn ngữ (subtitle_bilingual_en...).
+        outputs: SubtitleOutputs đã được ghi dần trong lúc dịch -> chỉ còn đổi tên các file
+        .partial thành file cuối.
+        """
+        raise_if_cancelled(cancel_flag)
         
-        self.subtitle_writer.write_transcript(
-            segments,
-            f"{output_prefix}_transcript_{target_lang}.txt",
-            'vietnamese'
+        self.stage_progress(
+            'subtitle',
+            0,
+            "💾 Đang lưu phụ đề..."
         )
+        self.log("\n[4/5] 💾 LƯU PHỤ ĐỀ")
         
-        self.update_progress(
-            Config.PROGRESS_SUBTITLE_COMPLETE,
+        if outputs is None:
+            outputs = self.open_subtitles(output_dir, export_format, list(translations))
+            try:
+                for target_lang, segments in translations.items():
+                    outputs.append(target_lang, segments)
+            except BaseException:
+                outputs.abort()
+                raise
+        outputs.commit()
+        
+        self.stage_progress(
+            'subtitle',
+            1,
             "✓ Đã lưu phụ đề",
             Config.COLOR_SUCCESS
         )
         self.log("✅ Đã lưu phụ đề")
         
-        return output_prefix
+        return outputs.prefix
     
     def embed_subtitle(self, video_path, subtitle_path, output_dir, cancel_flag=None):
         """Nhúng phụ đề vào video"""
-        if cancel_flag and cancel_flag.is_set():
-            raise Exception("Người dùng đã hủy")
+        raise_if_cancelled(cancel_flag)
         
-        self.update_progress(
-            Config.PROGRESS_EMBED_START,
+        self.stage_progress(
+            'embed',
+            0,
             "🎬 Đang nhúng phụ đề vào video..."
         )
         self.log("\n[5/5] 🎬 NHÚNG PHỤ ĐỀ")
@@ -223,16 +786,33 @@ class VideoProcessor:
         ]
         
         try:
-            subprocess.run(cmd, check=True, capture_output=True)
+            run_ffmpeg(
+                cmd,
+                duration=self.media_info.duration if self.media_info else None,
+                on_progress=self.ffmpeg_progress('embed', "🎬 Đang nhúng phụ đề..."),
+                cancel_flag=cancel_flag
+            )
             self.log("✅ Đã tạo video có phụ đề")
             return output_video
-        except Exception as e:
+        except (FFmpegError, OSError) as e:
             self.log(f"⚠️ Không thể nhúng phụ đề: {str(e)}")
             self.log("💡 Bạn vẫn có thể sử dụng file phụ đề riêng")
             return None
+        finally:
+            # Không để lại video dở dang khi bị hủy
+            if cancel_flag and cancel_flag.is_set() and os.path.exists(output_video):
+                os.remove(output_video)
     
     def process(self, video_path, model_size, target_lang, export_format, embed_subtitle, cancel_flag=None):
-        """Xử lý video đầy đủ"""
+        """Xử lý video đầy đủ
+        
+        target_lang: mã ngôn ngữ đích hoặc danh sách mã (phiên âm một lần, dịch sang từng
+        ngôn ngữ). Video nhúng phụ đề của ngôn ngữ đầu tiên.
+        """
+        target_langs = target_languages(target_lang)
+        untranslated_policy()
+        self.untranslated = {}
+        outputs = None
         try:
             self.log("\n" + "="*60)
             self.log("🎬 BẮT ĐẦU XỬ LÝ VIDEO")
@@ -242,28 +822,60 @@ class VideoProcessor:
             output_dir = create_output_directory(video_path, Config.OUTPUT_DIR_SUFFIX)
             self.log(f"📁 Thư mục xuất: {output_dir}")
             
+            # Metadata (ffprobe) -> chia progress theo thời lượng, tính ETA
+            self.media_info = self.probe(video_path)
+            if self.media_info:
+                workers = min(
+                    Config.TRANSCRIBE_WORKERS,
+                    max(1, int(self.media_info.duration // Config.TRANSCRIBE_CHUNK_SECONDS))
+                )
+                self.tracker = ProgressTracker.for_job(
+                    self.media_info.duration,
+                    model_size,
+                    embed_subtitle,
+                    workers,
+                    languages=len(target_langs)
+                )
+            
             # Step 1: Extract audio
-            audio_file = self.extract_audio(video_path, output_dir, cancel_flag)
+            audio = self.extract_audio(video_path, output_dir, cancel_flag)
             
-            # Step 2: Transcribe
-            result = self.transcribe_audio(audio_file, model_size, cancel_flag)
+            # Lưu từng chunk đã phiên âm: chạy lại cùng video + model sẽ tiếp tục từ chunk cuối
+            checkpoint = None
+            if Config.TRANSCRIBE_CHECKPOINT:
+                checkpoint = TranscriptionCheckpoint(output_dir, logger=self.logger)
             
-            # Step 3: Translate
-            translated = self.translate_segments(result['segments'], target_lang, cancel_flag)
+            # Phụ đề được ghi dần (*.partial.<ext>) theo thứ tự ngay khi dịch xong từng đoạn
+            outputs = self.open_subtitles(output_dir, export_format, target_langs)
+            self.log(f"📝 Phụ đề đang ghi dần: {Path(outputs.prefix).name}_*.partial.{export_format.lower()}")
+            
+            # Step 2 + 3: Transcribe, translate
+            if Config.STREAMING_PIPELINE:
+                result, translations = self.transcribe_and_translate(
+                    audio,
+                    model_size,
+                    target_langs,
+                    cancel_flag,
+                    checkpoint,
+                    outputs
+                )
+            else:
+                result = self.transcribe_audio(audio, model_size, cancel_flag, checkpoint)
+                translations = self.translate_segments(result['segments'], target_langs, cancel_flag, outputs)
             
             # Step 4: Save subtitles
             subtitle_prefix = self.save_subtitles(
-                translated,
+                translations,
                 output_dir,
-                target_lang,
                 export_format,
-                cancel_flag
+                cancel_flag,
+                outputs
             )
             
             # Step 5: Embed subtitle (optional)
             output_video = None
             if embed_subtitle:
-                subtitle_file = f"{subtitle_prefix}_{target_lang}.srt"
+                subtitle_file = f"{subtitle_prefix}_{target_langs[0]}.srt"
                 output_video = self.embed_subtitle(
                     video_path,
                     subtitle_file,
@@ -271,6 +883,10 @@ class VideoProcessor:
                     cancel_flag
                 )
             
+            # Job xong: phụ đề đã lưu, checkpoint chỉ dùng khi crash/hủy giữa chừng
+            if checkpoint:
+                checkpoint.remove()
+            
             # Success
             self.update_progress(
                 Config.PROGRESS_COMPLETE,
@@ -283,26 +899,39 @@ class VideoProcessor:
             self.log("="*60)
             self.log(f"\n📂 Các file đã tạo trong thư mục: {output_dir}")
             self.log(f"  ├─ subtitle_chinese.{export_format.lower()}")
-            self.log(f"  ├─ subtitle_{target_lang}.{export_format.lower()}")
-            self.log(f"  ├─ subtitle_bilingual.{export_format.lower()}")
+            for lang in target_langs:
+                bilingual = f"bilingual_{lang}" if len(target_langs) > 1 else "bilingual"
+                self.log(f"  ├─ subtitle_{lang}.{export_format.lower()}")
+                self.log(f"  ├─ subtitle_{bilingual}.{export_format.lower()}")
             self.log(f"  ├─ transcript_chinese.txt")
-            self.log(f"  └─ transcript_{target_lang}.txt")
+            for lang in target_langs:
+                branch = "└─" if lang == target_langs[-1] else "├─"
+                self.log(f"  {branch} transcript_{lang}.txt")
             if output_video:
                 self.log(f"  └─ {Path(output_video).name}")
             
             return {
                 'success': True,
                 'output_dir': output_dir,
-                'output_video': output_video
+                'output_video': output_video,
+                'languages': target_langs,
+                'untranslated': self.untranslated
             }
             
+        except CancelledError:
+            self.log(f"\n⚠️ ĐÃ HỦY BỎ")
+            raise
         except Exception as e:
-            if "Người dùng đã hủy" in str(e):
-                self.log(f"\n⚠️ ĐÃ HỦY BỎ")
-                raise
-            else:
-                import traceback
-                self.log(f"\n❌ LỖI: {str(e)}")
-                self.log("\n🔍 Chi tiết lỗi:")
-                self.log(traceback.format_exc())
-                raise
\ No newline at end of file
+            import traceback
+            self.log(f"\n❌ LỖI: {str(e)}")
+            self.log("\n🔍 Chi tiết lỗi:")
+            self.log(traceback.format_exc())
+            raise
+        
+        finally:
+            # Lỗi/hủy: đóng các file phụ đề, giữ lại phần đã ghi (*.partial.<ext>)
+            if outputs is not None:
+                outputs.abort()
+            self.media_info = None
+            self.tracker = None
+            self.stage_fractions = {}
\ No newline at end of file
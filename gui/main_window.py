@@ -11,7 +11,9 @@ import os
 from config import Config
 from utils.settings import SettingsManager
 from utils.dependencies import DependencyChecker
-from utils.helpers import validate_video_file, open_folder
+from utils.helpers import validate_video_file, open_folder, format_time_duration
+from utils.media_probe import probe_media, MediaProbeError
+from utils.cancellation import CancellationToken, CancelledError
 from core.video_processor import VideoProcessor
 
 class VideoTranslatorApp:
@@ -27,12 +29,16 @@ class VideoTranslatorApp:
         self.video_path = tk.StringVar()
         self.model_var = tk.StringVar(value=Config.DEFAULT_MODEL)
         self.embed_var = tk.BooleanVar(value=False)
-        self.target_lang_var = tk.StringVar(value=Config.DEFAULT_LANGUAGE)
+        # Một checkbox cho mỗi ngôn ngữ đích (dịch nhiều ngôn ngữ trong một job)
+        self.target_lang_vars = {
+            name: tk.BooleanVar(value=(name == Config.DEFAULT_LANGUAGE))
+            for name in Config.LANGUAGES
+        }
         self.export_format_var = tk.StringVar(value=Config.DEFAULT_FORMAT)
         
         # State
         self.processing = False
-        self.cancel_flag = threading.Event()
+        self.cancel_flag = CancellationToken()
         self.log_queue = queue.Queue()
         self.result_data = None
         
@@ -51,6 +57,10 @@ class VideoTranslatorApp:
         # Load saved settings
         self.load_settings()
         
+        # Load trước model đã lưu trên thread nền
+        if Config.PRELOAD_MODEL_ON_STARTUP:
+            self.preload_model()
+        
         # Check dependencies on startup
         self.root.after(100, self.check_dependencies)
         
@@ -188,7 +198,7 @@ class VideoTranslatorApp:
         model_combo = ttk.Combobox(
             model_frame,
             textvariable=self.model_var,
-            values=Config.WHISPER_MODELS,
+            values=Config.WHISPER_MODELS + Config.WHISPER_QUANTIZED_MODELS,
             state="readonly",
             width=15,
             font=Config.FONT_NORMAL
@@ -204,9 +214,20 @@ class VideoTranslatorApp:
         )
         self.model_info_label.pack(side="left", padx=(10, 0))
         
+        self.model_status_label = tk.Label(
+            model_frame,
+            text="",
+            font=Config.FONT_SMALL,
+            bg=Config.COLOR_BACKGROUND,
+            fg=Config.COLOR_TEXT_LIGHT
+        )
+        self.model_status_label.pack(side="right")
+        
         def on_model_change(event):
             info = Config.WHISPER_MODEL_INFO.get(self.model_var.get(), "")
             self.model_info_label.config(text=info)
+            if Config.PRELOAD_MODEL_ON_STARTUP:
+                self.preload_model()
         
         model_combo.bind("<<ComboboxSelected>>", on_model_change)
     
@@ -223,15 +244,18 @@ class VideoTranslatorApp:
             fg=Config.COLOR_TEXT
         ).pack(side="left", padx=(0, 10))
         
-        lang_combo = ttk.Combobox(
-            lang_frame,
-            textvariable=self.target_lang_var,
-            values=list(Config.LANGUAGES.keys()),
-            state="readonly",
-            width=20,
-            font=Config.FONT_NORMAL
-        )
-        lang_combo.pack(side="left")
+        for name, var in self.target_lang_vars.items():
+            tk.Checkbutton(
+                lang_frame,
+                text=name,
+                variable=var,
+                font=Config.FONT_NORMAL,
+                bg=Config.COLOR_BACKGROUND
+            ).pack(side="left", padx=(0, 5))
+    
+    def selected_languages(self):
+        """Tên các ngôn ngữ đích đang chọn (theo thứ tự trong Config.LANGUAGES)"""
+        return [name for name, var in self.target_lang_vars.items() if var.get()]
     
     def create_format_selector(self, parent):
         """Tạo selector chọn format"""
@@ -379,6 +403,13 @@ Main Window - Giao diện chính (Part 2: Logic & Handlers)
             self.video_path.set(filename)
             self.log(f"✓ Đã chọn: {os.path.basename(filename)}")
             
+            # Metadata đã được cache khi validate, không chạy lại ffprobe
+            try:
+                info = probe_media(filename)
+                self.log(f"  🎞️ Thời lượng: {format_time_duration(info.duration)} | {info.describe()}")
+            except (FileNotFoundError, MediaProbeError, OSError):
+                pass
+            
             # Save last directory
             self.settings.set("last_directory", os.path.dirname(filename))
     
@@ -397,7 +428,10 @@ Main Window - Giao diện chính (Part 2: Logic & Handlers)
         try:
             self.model_var.set(self.settings.get("model", Config.DEFAULT_MODEL))
             self.embed_var.set(self.settings.get("embed", False))
-            self.target_lang_var.set(self.settings.get("target_lang", Config.DEFAULT_LANGUAGE))
+            # Settings cũ chỉ lưu một ngôn ngữ ("target_lang")
+            languages = self.settings.get("target_langs") or [self.settings.get("target_lang", Config.DEFAULT_LANGUAGE)]
+            for name, var in self.target_lang_vars.items():
+                var.set(name in languages)
             self.export_format_var.set(self.settings.get("export_format", Config.DEFAULT_FORMAT))
             self.log("📂 Đã tải cài đặt đã lưu")
         except Exception as e:
@@ -409,7 +443,7 @@ Main Window - Giao diện chính (Part 2: Logic & Handlers)
             self.settings.update(
                 model=self.model_var.get(),
                 embed=self.embed_var.get(),
-                target_lang=self.target_lang_var.get(),
+                target_langs=self.selected_languages(),
                 export_format=self.export_format_var.get()
             )
             self.settings.save()
@@ -427,6 +461,23 @@ Main Window - Giao diện chính (Part 2: Logic & Handlers)
             self.save_settings()
             self.root.destroy()
     
+    # Model Preload
+    
+    def preload_model(self):
+        """Load trước model đang chọn (job bắt đầu sớm sẽ đợi chính lần load này)"""
+        self.processor.preload_model(self.model_var.get(), on_status=self.on_model_status)
+    
+    def on_model_status(self, state, message):
+        """Hiển thị trạng thái load model (gọi từ thread nền)"""
+        colors = {
+            'loading': Config.COLOR_WARNING,
+            'ready': Config.COLOR_SUCCESS,
+            'error': Config.COLOR_DANGER
+        }
+        color = colors.get(state, Config.COLOR_TEXT_LIGHT)
+        self.root.after(0, lambda: self.model_status_label.config(text=message, fg=color))
+        self.log(message)
+    
     # Processing Methods
     
     def start_processing(self):
@@ -445,9 +496,14 @@ Main Window - Giao diện chính (Part 2: Logic & Handlers)
             messagebox.showerror("Lỗi", f"File không hợp lệ: {message}")
             return
         
+        if not self.selected_languages():
+            messagebox.showerror("Lỗi", "Vui lòng chọn ít nhất một ngôn ngữ đích!")
+            return
+        
         # Start processing
         self.processing = True
-        self.cancel_flag.clear()
+        # Token mới cho mỗi job: job cũ đang dừng dở không bị "bỏ hủy"
+        self.cancel_flag = CancellationToken()
         self.process_btn.config(state="disabled", bg=Config.COLOR_DISABLED)
         self.cancel_btn.config(state="normal")
         self.progress_bar.config(value=0)
@@ -464,27 +520,25 @@ Main Window - Giao diện chính (Part 2: Logic & Handlers)
     
     def process_video(self):
         """Xử lý video trong background thread"""
+        cancel_flag = self.cancel_flag
         try:
             result = self.processor.process(
                 video_path=self.video_path.get(),
                 model_size=self.model_var.get(),
-                target_lang=Config.get_language_code(self.target_lang_var.get()),
+                target_lang=[Config.get_language_code(name) for name in self.selected_languages()],
                 export_format=self.export_format_var.get(),
                 embed_subtitle=self.embed_var.get(),
-                cancel_flag=self.cancel_flag
+                cancel_flag=cancel_flag
             )
             
             self.result_data = result
             self.root.after(0, self.processing_complete)
             
-        except Exception as e:
-            if "Người dùng đã hủy" in str(e):
-                self.root.after(0, self.processing_cancelled)
-            else:
-                self.root.after(0, self.processing_failed)
+        except CancelledError:
+            self.root.after(0, self.processing_cancelled)
         
-        finally:
-            self.cancel_flag.clear()
+        except Exception:
+            self.root.after(0, self.processing_failed)
     
     def processing_complete(self):
         """Xử lý hoàn tất"""
@@ -496,10 +550,13 @@ Main Window - Giao diện chính (Part 2: Logic & Handlers)
             return
         
         output_dir = self.result_data['output_dir']
+        untranslated = sum(len(indices) for indices in self.result_data.get('untranslated', {}).values())
+        warning = f"⚠️ {untranslated} đoạn không dịch được (giữ text gốc), xem log.\n\n" if untranslated else ""
         
         result = messagebox.askyesno(
             "🎉 Thành công!",
             f"Xử lý video hoàn tất!\n\n"
+            f"{warning}"
             f"Các file đã được lưu trong thư mục:\n{output_dir}\n\n"
             f"Bạn có muốn mở thư mục này không?"
         )
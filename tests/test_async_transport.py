@@ -0,0 +1,84 @@
+"""
+Test module - Async translation transport (server HTTP giả lập trên localhost)
+"""
+
+import asyncio
+import socket
+import threading
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+
+from config import Config
+from core.async_transport import AsyncTranslationTransport, TransportError
+from core.translator import TranslationEngine
+
+
+@pytest.fixture
+def fake_google():
+    """Server giả trang /m: dịch từng dòng thành 'vi:<dòng>', đếm request và kết nối"""
+    stats = {'requests': 0, 'in_flight': 0, 'max_in_flight': 0, 'peers': set()}
+
+    async def handle(request):
+        stats['requests'] += 1
+        stats['in_flight'] += 1
+        stats['max_in_flight'] = max(stats['max_in_flight'], stats['in_flight'])
+        stats['peers'].add(request.transport.get_extra_info('peername'))
+        await asyncio.sleep(0.05)
+        stats['in_flight'] -= 1
+        text = request.query['q']
+        if text == "slow":
+            await asyncio.sleep(1)
+        lines = "\n".join(f"vi:{line}" for line in text.split("\n"))
+        return web.Response(text=f'<div class="result-container">{lines}</div>', content_type="text/html")
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+
+    loop = asyncio.new_event_loop()
+    app = web.Application()
+    app.router.add_get("/m", handle)
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    yield f"http://127.0.0.1:{port}/m", stats
+
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+
+
+def test_many_in_flight_over_pooled_connections(fake_google, monkeypatch):
+    url, stats = fake_google
+    monkeypatch.setattr(Config, "TRANSLATION_MEMORY_ENABLED", False)
+    monkeypatch.setattr(Config, "TRANSLATE_BATCH_ENABLED", False)
+    monkeypatch.setattr(Config, "RATE_CONTROL_ENABLED", False)
+    transport = AsyncTranslationTransport(url=url, max_connections=8)
+    try:
+        engine = TranslationEngine(target_lang='vi', transport=transport)
+        segments = [{'start': i, 'end': i + 1, 'text': f"句{i}"} for i in range(200)]
+        results = engine.translate_segments(segments)
+    finally:
+        transport.close()
+
+    assert [r['vietnamese'] for r in results] == [f"vi:句{i}" for i in range(200)]
+    assert stats['max_in_flight'] == 8
+    # Keep-alive: 200 request chỉ dùng tối đa 8 kết nối
+    assert len(stats['peers']) <= 8
+
+
+def test_request_timeout(fake_google):
+    url, _ = fake_google
+    transport = AsyncTranslationTransport(url=url, timeout=0.5)
+    try:
+        with pytest.raises(TransportError):
+            transport.translate("slow", "zh-CN", "vi")
+    finally:
+        transport.close()
@@ -0,0 +1,59 @@
+"""
+Test module - Giải mã PCM từ FFmpeg vào mảng float32 cấp sẵn
+"""
+
+import shutil
+
+import numpy as np
+import pytest
+
+from utils.audio import PCM_SCALE, PcmBuffer, build_pcm_command, decode_audio_pcm
+from utils.ffmpeg_runner import run_ffmpeg
+
+needs_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="cần ffmpeg")
+
+# 3 giây sine 440 Hz, không cần file mẫu
+SOURCE = "sine=frequency=440:duration=3"
+
+
+def pcm_command():
+    cmd = build_pcm_command(SOURCE)
+    return cmd[:2] + ['-f', 'lavfi'] + cmd[2:]
+
+
+@pytest.mark.parametrize("duration", [None, 0.5, 3.0])
+def test_chunks_split_mid_sample(duration):
+    """Khối cắt giữa mẫu 16-bit, thời lượng thiếu/không biết -> kết quả vẫn giống giải mã một lần"""
+    rng = np.random.default_rng(0)
+    raw = rng.integers(-32768, 32768, 48000, dtype=np.int16).astype('<i2').tobytes()
+    pcm = PcmBuffer(duration)
+    position = 0
+    while position < len(raw):
+        size = int(rng.integers(1, 5000))
+        pcm.write(memoryview(raw)[position:position + size])
+        position += size
+
+    expected = np.frombuffer(raw, dtype='<i2').astype(np.float32) / PCM_SCALE
+    result = pcm.result()
+    assert result.dtype == np.float32
+    assert np.array_equal(result, expected)
+
+
+@needs_ffmpeg
+def test_decode_matches_captured_stdout(monkeypatch):
+    monkeypatch.setattr("utils.audio.build_pcm_command", lambda video_path, stream=None: pcm_command())
+    raw = run_ffmpeg(pcm_command(), capture_stdout=True)
+
+    audio = decode_audio_pcm(SOURCE, duration=3.0)
+
+    assert np.array_equal(audio, np.frombuffer(raw, dtype='<i2').astype(np.float32) / PCM_SCALE)
+
+
+@needs_ffmpeg
+def test_sink_error_stops_ffmpeg():
+    class FailingSink:
+        def write(self, chunk):
+            raise MemoryError("hết bộ nhớ")
+
+    with pytest.raises(MemoryError):
+        run_ffmpeg(pcm_command(), stdout_sink=FailingSink())
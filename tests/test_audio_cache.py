@@ -0,0 +1,56 @@
+"""
+Test module - Audio cache
+"""
+
+import os
+
+import numpy as np
+
+from utils.audio_cache import AudioCache
+
+
+def test_put_then_get_memmap(tmp_path):
+    """Audio lưu vào cache được mở lại bằng memmap"""
+    cache = AudioCache(cache_dir=str(tmp_path), max_bytes=1024 * 1024)
+    audio = np.linspace(-1, 1, 1000, dtype=np.float32)
+
+    cache.put("abc", audio)
+    cached = cache.get("abc")
+
+    assert isinstance(cached, np.memmap)
+    assert np.array_equal(cached, audio)
+    assert cache.get("missing") is None
+
+
+def test_key_changes_with_content(tmp_path):
+    """Key thay đổi khi nội dung video thay đổi"""
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"a" * 100)
+    cache = AudioCache(cache_dir=str(tmp_path / "cache"))
+    key1 = cache.make_key(str(video))
+
+    video.write_bytes(b"b" * 100)
+    os.utime(video, ns=(0, 0))
+    key2 = cache.make_key(str(video))
+
+    assert key1 != key2
+    assert cache.make_key(str(video), sample_rate=8000) != key2
+
+
+def test_lru_eviction(tmp_path):
+    """Vượt dung lượng thì xóa file ít dùng nhất"""
+    audio = np.zeros(100, dtype=np.float32)  # 400 bytes
+    cache = AudioCache(cache_dir=str(tmp_path), max_bytes=1000)
+
+    cache.put("a", audio)
+    cache.put("b", audio)
+    os.utime(cache.path_for("a"), (1, 1))
+    os.utime(cache.path_for("b"), (2, 2))
+    cache.get("a")  # a vừa được dùng -> b là ít dùng nhất
+
+    cache.put("c", audio)
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+    assert cache.total_size() <= 1000
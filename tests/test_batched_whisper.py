@@ -0,0 +1,45 @@
+"""
+Test module - Batched Whisper
+"""
+
+from core.batched_whisper import parse_segments, plan_windows
+
+
+class FakeTokenizer:
+    """Token < 100: chữ; 100 = eot; >= 101: timestamp (0.02 giây mỗi bước)"""
+    eot = 100
+    timestamp_begin = 101
+
+    def decode(self, tokens):
+        return "".join(chr(ord('a') + t) for t in tokens)
+
+
+def ts(seconds):
+    return 101 + round(seconds / 0.02)
+
+
+def test_parse_segments_splits_on_timestamp_pairs():
+    tokens = [ts(0.0), 0, 1, ts(1.0), ts(1.5), 2, ts(3.0)]
+    segments = parse_segments(tokens, FakeTokenizer(), duration=10.0)
+    assert [(s['start'], s['end'], s['text']) for s in segments] == [
+        (0.0, 1.0, "ab"),
+        (1.5, 3.0, "c"),
+    ]
+
+
+def test_parse_segments_unterminated_tail_runs_to_window_end():
+    tokens = [ts(0.0), 0, ts(2.0), ts(2.0), 3, 4]
+    segments = parse_segments(tokens, FakeTokenizer(), duration=5.0)
+    assert segments[-1] == {'start': 2.0, 'end': 5.0, 'text': "de"}
+
+
+def test_plan_windows_packs_regions_up_to_30_seconds():
+    regions = [(0, 10), (20, 35), (40, 50), (60, 100)]
+    windows = plan_windows(regions)
+    assert all(sum(e - s for s, e in w) <= 30 for w in windows)
+    assert windows[0] == [(0, 10), (20, 35)]
+    assert sum(e - s for w in windows for s, e in w) == sum(e - s for s, e in regions)
+
+    # Không bật VAD: phủ liền mạch toàn bộ audio
+    covered = plan_windows([(5, 10)], duration=70.0)
+    assert covered[0][0][0] == 0.0 and covered[-1][-1][1] == 70.0
@@ -0,0 +1,127 @@
+"""
+Test module - Hủy job: thời gian từ lúc bấm hủy tới khi mọi bước dừng hẳn
+"""
+
+import shutil
+import threading
+import time
+
+import numpy as np
+import pytest
+import torch
+from whisper.model import ModelDimensions, Whisper
+
+from config import Config
+from core import video_processor
+from core.model_pool import WhisperModelPool
+from core.translation_backends import TranslationBackend
+from core.translator import TranslationEngine
+from core.video_processor import VideoProcessor
+from utils.cancellation import CancellationToken, CancelledError
+from utils.ffmpeg_runner import run_ffmpeg
+
+
+def run_and_cancel(target, delay):
+    """Chạy target trên thread riêng, hủy sau delay giây, trả về (lỗi, số giây từ lúc hủy tới khi dừng)"""
+    token = CancellationToken()
+    outcome = {}
+
+    def worker():
+        try:
+            target(token)
+        except BaseException as e:
+            outcome['error'] = e
+        outcome['stopped'] = time.monotonic()
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    time.sleep(delay)
+    cancelled_at = time.monotonic()
+    token.cancel()
+    thread.join(timeout=10)
+    assert not thread.is_alive()
+    return outcome.get('error'), outcome['stopped'] - cancelled_at
+
+
+def test_token_callbacks():
+    token = CancellationToken()
+    calls = []
+    unregister = token.on_cancel(lambda: calls.append("a"))
+    token.on_cancel(lambda: calls.append("b"))
+    unregister()
+    token.cancel()
+    token.cancel()
+    token.on_cancel(lambda: calls.append("c"))  # đã hủy -> gọi ngay
+    assert calls == ["b", "c"]
+    with pytest.raises(CancelledError):
+        token.raise_if_cancelled()
+
+
+def test_whisper_interrupted_mid_chunk(monkeypatch):
+    """Một chunk 2 phút (model weight ngẫu nhiên) dừng trong vòng 2 giây sau khi hủy"""
+    torch.manual_seed(0)
+    dims = ModelDimensions(
+        n_mels=80, n_audio_ctx=1500, n_audio_state=64, n_audio_head=1, n_audio_layer=1,
+        n_vocab=51865, n_text_ctx=448, n_text_state=64, n_text_head=1, n_text_layer=1
+    )
+    model = Whisper(dims).eval()
+    pool = WhisperModelPool(max_mb=1000, idle_timeout=0, loader=lambda model_size, logger=None: model)
+    monkeypatch.setattr(video_processor, "get_model_pool", lambda: pool)
+    monkeypatch.setattr(Config, "VAD_ENABLED", False)
+    monkeypatch.setattr(Config, "TRANSCRIBE_WORKERS", 1)
+    monkeypatch.setattr(Config, "WHISPER_BATCH_SIZE", 1)
+
+    audio = np.random.default_rng(0).uniform(-0.5, 0.5, 16000 * 120).astype(np.float32)
+    processor = VideoProcessor(logger=lambda msg: None)
+
+    error, latency = run_and_cancel(
+        lambda token: processor.transcribe_audio(audio, "random-tiny", token),
+        delay=0.5
+    )
+
+    assert isinstance(error, CancelledError)
+    assert latency < 2.0
+
+
+class SlowBackend(TranslationBackend):
+    """Mỗi request mất 5 giây"""
+    name = "slow-cancel"
+
+    def __init__(self):
+        self.calls = 0
+
+    def translate(self, text, source, target):
+        self.calls += 1
+        time.sleep(5)
+        return text
+
+
+def test_translation_stops_without_waiting_for_queue(monkeypatch):
+    """Hủy khi đang dịch: trả về ngay, các gói còn trong hàng đợi không được gửi"""
+    monkeypatch.setattr(Config, "MAX_WORKERS", 2)
+    monkeypatch.setattr(Config, "TRANSLATE_BATCH_ENABLED", False)
+    monkeypatch.setattr(Config, "TRANSLATION_MEMORY_ENABLED", False)
+    monkeypatch.setattr(Config, "RATE_CONTROL_ENABLED", False)
+    backend = SlowBackend()
+    engine = TranslationEngine(target_lang='vi', backend=backend)
+    segments = [{'start': i, 'end': i + 1, 'text': f"句子{i}"} for i in range(20)]
+
+    error, latency = run_and_cancel(lambda token: engine.translate_stream(segments, token), delay=0.3)
+
+    assert isinstance(error, CancelledError)
+    assert latency < 0.5
+    assert backend.calls <= Config.MAX_WORKERS
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="cần ffmpeg")
+def test_ffmpeg_stopped_on_cancel():
+    """FFmpeg chạy tốc độ thực (-re) 60 giây dừng trong vòng 1 giây sau khi hủy"""
+    cmd = [
+        "ffmpeg", "-hide_banner", "-re", "-f", "lavfi", "-i", "anullsrc=r=16000:cl=mono",
+        "-t", "60", "-f", "null", "-"
+    ]
+
+    error, latency = run_and_cancel(lambda token: run_ffmpeg(cmd, duration=60, cancel_flag=token), delay=0.5)
+
+    assert isinstance(error, CancelledError)
+    assert latency < 1.0
@@ -0,0 +1,70 @@
+"""
+Test module - Checkpoint phiên âm
+"""
+
+import os
+
+import numpy as np
+
+from config import Config
+from core.checkpoint import TranscriptionCheckpoint
+from core.video_processor import VideoProcessor
+
+AUDIO = np.linspace(-1, 1, 16000, dtype=np.float32)
+CHUNKS = [[(0.0, 0.4)], [(0.4, 0.7)], [(0.7, 1.0)]]
+
+
+def segment(start, text):
+    return {'start': start, 'end': start + 0.1, 'text': text, 'tokens': [1, 2]}
+
+
+def test_resume_skips_completed_chunks_and_partial_line(tmp_path):
+    checkpoint = TranscriptionCheckpoint(str(tmp_path))
+    assert checkpoint.resume(AUDIO, "small", CHUNKS) == []
+    checkpoint.append(0, [segment(0.0, "一")])
+    checkpoint.append(1, [segment(0.4, "二")])
+
+    # Crash khi đang ghi chunk thứ 3
+    with open(checkpoint.path, 'a', encoding='utf-8') as f:
+        f.write('{"chunk": 2, "segm')
+
+    completed = TranscriptionCheckpoint(str(tmp_path)).resume(AUDIO, "small", CHUNKS)
+    assert [[s['text'] for s in chunk] for chunk in completed] == [["一"], ["二"]]
+
+    # File đã được dọn phần ghi dở -> ghi tiếp và đọc lại được
+    checkpoint.append(2, [segment(0.7, "三")])
+    assert len(TranscriptionCheckpoint(str(tmp_path)).resume(AUDIO, "small", CHUNKS)) == 3
+
+
+def test_settings_change_starts_over(tmp_path):
+    checkpoint = TranscriptionCheckpoint(str(tmp_path))
+    checkpoint.resume(AUDIO, "small", CHUNKS)
+    checkpoint.append(0, [segment(0.0, "一")])
+
+    assert checkpoint.resume(AUDIO, "medium", CHUNKS) == []
+    assert checkpoint.resume(AUDIO, "medium", CHUNKS[:2]) == []
+    assert checkpoint.resume(AUDIO[::-1].copy(), "medium", CHUNKS[:2]) == []
+
+
+def test_checkpoint_removed_after_successful_job(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Config, "TRANSCRIBE_CHECKPOINT", True)
+    monkeypatch.setattr(Config, "STREAMING_PIPELINE", True)
+    processor = VideoProcessor(logger=lambda message: None)
+    monkeypatch.setattr(processor, "probe", lambda video_path: None)
+    monkeypatch.setattr(processor, "extract_audio", lambda *args: AUDIO)
+    paths = []
+
+    def transcribe_and_translate(audio, model_size, target_langs, cancel_flag, checkpoint, outputs):
+        checkpoint.resume(audio, model_size, CHUNKS)
+        checkpoint.append(0, [segment(0.0, "一")])
+        paths.append(checkpoint.path)
+        entries = [{'start': 0.0, 'end': 0.1, 'chinese': "一", 'vietnamese': "một"}]
+        outputs.append('vi', entries)
+        return {'segments': entries}, {'vi': entries}
+
+    monkeypatch.setattr(processor, "transcribe_and_translate", transcribe_and_translate)
+    result = processor.process("video.mp4", "small", "vi", "SRT", False)
+
+    assert not os.path.exists(paths[0])
+    assert os.path.exists(os.path.join(result['output_dir'], "subtitle_vi.srt"))
@@ -0,0 +1,79 @@
+"""
+Test module - FFmpegRunner: tiến trình từ dòng -progress, stderr chỉ giữ N dòng cuối
+"""
+
+import io
+
+import pytest
+
+from config import Config
+from utils import ffmpeg_runner
+from utils.ffmpeg_runner import FFmpegError, FFmpegRunner
+
+PROGRESS_BLOCKS = (
+    "Duration: 00:00:10.00, start: 0.000000, bitrate: 256 kb/s\n"
+    "out_time_us=2500000\nspeed=2.5x\nprogress=continue\n"
+    "out_time_us=5000000\nspeed=N/A\nprogress=continue\n"
+    "out_time_us=N/A\nprogress=continue\n"
+    "out_time_us=9900000\nspeed=3x\nprogress=end\n"
+)
+
+
+def fake_popen(stderr, returncode):
+    """subprocess.Popen giả: stderr định sẵn, thoát với returncode"""
+    class FakeProcess:
+        def __init__(self, cmd, stdin=None, stdout=None, stderr=None):
+            self.cmd = cmd
+            self.stdout = None
+            self.stderr = io.BytesIO(stderr_bytes)
+            self.returncode = None
+
+        def wait(self, timeout=None):
+            self.returncode = returncode
+            return returncode
+
+        def poll(self):
+            return self.returncode
+
+    stderr_bytes = stderr.encode('utf-8')
+    return FakeProcess
+
+
+def test_progress_from_canned_lines(monkeypatch):
+    """Thời lượng lấy từ log; progress=end -> 100%"""
+    monkeypatch.setattr(ffmpeg_runner.subprocess, "Popen", fake_popen(PROGRESS_BLOCKS, 0))
+    reports = []
+
+    runner = FFmpegRunner(
+        ["ffmpeg", "-i", "in.mp4"], on_progress=lambda fraction, speed: reports.append((fraction, speed))
+    )
+    runner.run()
+
+    assert runner.cmd[:4] == ["ffmpeg", "-progress", "pipe:2", "-nostats"]
+    assert runner.duration == 10.0
+    assert reports == [(0.25, "2.5x"), (0.5, None), (None, None), (1.0, "3x")]
+    # Dòng -progress không lẫn vào log
+    assert list(runner.stderr_tail) == ["Duration: 00:00:10.00, start: 0.000000, bitrate: 256 kb/s"]
+
+
+def test_out_time_ms_is_microseconds(monkeypatch):
+    """FFmpeg cũ chỉ có out_time_ms, giá trị thực chất là micro giây"""
+    monkeypatch.setattr(ffmpeg_runner.subprocess, "Popen", fake_popen("out_time_ms=1000000\nprogress=continue\n", 0))
+    reports = []
+
+    FFmpegRunner(["ffmpeg"], duration=4.0, on_progress=lambda fraction, speed: reports.append(fraction)).run()
+
+    assert reports == [0.25]
+
+
+def test_error_keeps_last_stderr_lines(monkeypatch):
+    monkeypatch.setattr(Config, "FFMPEG_STDERR_LINES", 3)
+    log = "".join(f"dòng {i}\nprogress=continue\n" for i in range(10))
+    monkeypatch.setattr(ffmpeg_runner.subprocess, "Popen", fake_popen(log, 1))
+
+    with pytest.raises(FFmpegError) as info:
+        FFmpegRunner(["ffmpeg", "-i", "missing.mp4"]).run()
+
+    assert info.value.returncode == 1
+    assert info.value.stderr_tail == ["dòng 7", "dòng 8", "dòng 9"]
+    assert str(info.value) == "FFmpeg lỗi (mã 1):\ndòng 7\ndòng 8\ndòng 9"
@@ -0,0 +1,41 @@
+"""
+Test module - Media probe
+"""
+
+from utils.media_probe import MediaInfo
+
+
+def make_info(streams, fmt=None):
+    return MediaInfo("video.mkv", {'format': fmt or {}, 'streams': streams})
+
+
+def test_duration_falls_back_to_streams():
+    """Container không có duration -> lấy từ stream dài nhất"""
+    info = make_info([
+        {'codec_type': 'video', 'codec_name': 'h264', 'duration': '61.5'},
+        {'codec_type': 'audio', 'codec_name': 'aac', 'duration': '60.0'},
+    ])
+
+    assert info.duration == 61.5
+    assert info.has_audio
+    assert info.video_codec == 'h264'
+
+
+def test_best_audio_stream_prefers_chinese_track():
+    """Ưu tiên audio track tiếng Trung, rồi tới track mặc định"""
+    info = make_info([
+        {'codec_type': 'video'},
+        {'codec_type': 'audio', 'tags': {'language': 'eng'}, 'disposition': {'default': 1}},
+        {'codec_type': 'audio', 'tags': {'language': 'chi'}, 'disposition': {'default': 0}},
+    ], {'duration': '10'})
+
+    assert info.best_audio_stream() == 1
+    assert info.best_audio_stream(languages=['fre']) == 0
+
+
+def test_no_audio():
+    """Video không có audio track"""
+    info = make_info([{'codec_type': 'video'}], {'duration': '10'})
+
+    assert not info.has_audio
+    assert info.best_audio_stream() is None
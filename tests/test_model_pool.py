@@ -0,0 +1,62 @@
+"""
+Test module - Whisper model pool
+"""
+
+import threading
+import time
+
+import torch
+
+from core.model_pool import WhisperModelPool
+
+
+def make_loader(calls, delay=0.0):
+    """Loader giả: model 1 MB, đếm số lần load
+
+    Test dùng tên model không có trong Config.WHISPER_MODEL_RAM_MB (ước tính 0 MB trước khi load)
+    """
+    def loader(model_size, logger=None):
+        calls.append(model_size)
+        time.sleep(delay)
+        return torch.nn.Linear(512, 512, bias=False)  # 1 MB fp32
+    return loader
+
+
+def test_concurrent_jobs_share_one_load():
+    """Nhiều luồng cùng lấy một model -> chỉ load một lần"""
+    calls = []
+    pool = WhisperModelPool(max_mb=100, idle_timeout=0, loader=make_loader(calls, delay=0.2))
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(pool.get("m3"))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert calls == ["m3"]
+    assert all(model is results[0] for model in results)
+
+
+def test_lru_eviction_skips_models_in_use():
+    """Vượt giới hạn RAM -> bỏ model ít dùng nhất, không bỏ model đang dùng"""
+    calls = []
+    pool = WhisperModelPool(max_mb=2.5, idle_timeout=0, loader=make_loader(calls))
+
+    with pool.lease("m1"):
+        pool.get("m2")
+        pool.get("m3")  # m2 ít dùng nhất, m1 đang được dùng
+        assert sorted(pool.loaded_models()) == ["m1", "m3"]
+
+    pool.get("m3")
+    assert calls == ["m1", "m2", "m3"]
+
+
+def test_unload_idle():
+    """Model không dùng quá idle_timeout bị unload"""
+    pool = WhisperModelPool(max_mb=100, idle_timeout=0.05, loader=make_loader([]))
+    pool.get("m1")
+    with pool.lease("m2"):
+        time.sleep(0.1)
+        assert pool.unload_idle() == ["m1"]
+    assert pool.loaded_models() == ["m2"]
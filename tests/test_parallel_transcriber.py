@@ -0,0 +1,43 @@
+"""
+Test module - Phiên âm song song: chunk xong không theo thứ tự vẫn được gộp đúng thứ tự và timeline
+"""
+
+import time
+from multiprocessing.pool import ThreadPool
+from types import SimpleNamespace
+
+import numpy as np
+
+from core import parallel_transcriber
+from core.parallel_transcriber import ParallelTranscriber
+
+SR = 16000
+
+
+def fake_transcribe(audio, options):
+    """Whisper giả: audio là số thứ tự mẫu; chunk càng sớm càng chậm, mỗi chunk một câu ở 0.5-1.5s"""
+    first = int(audio[0])
+    time.sleep(0.3 - first / SR / 100)
+    return [{'start': 0.5, 'end': 1.5, 'text': f"句{first // SR}"}], 0.0
+
+
+def test_out_of_order_results_merged_in_order(monkeypatch):
+    monkeypatch.setattr(parallel_transcriber, "multiprocessing", SimpleNamespace(
+        get_context=lambda method: SimpleNamespace(Pool=ThreadPool)
+    ))
+    monkeypatch.setattr(parallel_transcriber, "_init_worker", lambda model_size, threads: None)
+    monkeypatch.setattr(parallel_transcriber, "_transcribe_chunk", fake_transcribe)
+    finished = []
+    audio = np.arange(30 * SR, dtype=np.float32)
+    chunks = [[(0.0, 5.0)], [(8.0, 10.0), (12.0, 14.0)], [(20.0, 30.0)]]
+
+    segments = ParallelTranscriber("tiny", workers=3, progress=lambda done, total: finished.append(done)).transcribe(
+        audio, chunks, {}
+    )
+
+    assert [(s['id'], s['text'], s['start'], s['end']) for s in segments] == [
+        (0, "句0", 0.5, 1.5),
+        (1, "句8", 8.5, 9.5),
+        (2, "句20", 20.5, 21.5)
+    ]
+    assert finished == [1, 2, 3]
@@ -0,0 +1,119 @@
+"""
+Test module - Circuit breaker, hedged request và backend dự phòng
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from config import Config
+from core.provider_health import ProviderHealth, get_provider_health
+from core.translation_backends import TranslationBackend
+from core.translation_memory import TranslationMemory
+from core.translator import TranslationEngine
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.setattr(Config, "TRANSLATION_MEMORY_ENABLED", False)
+    monkeypatch.setattr(Config, "RATE_CONTROL_ENABLED", False)
+    monkeypatch.setattr(Config, "RETRY_DELAY", 0.01)
+
+
+class FakeBackend(TranslationBackend):
+    """Backend giả: lỗi nếu fail=True, lần gọi đầu chậm nếu slow_first"""
+
+    def __init__(self, name, fail=False, slow_first=0.0):
+        self.name = name
+        self.fail = fail
+        self.slow_first = slow_first
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def translate(self, text, source, target):
+        with self.lock:
+            self.calls += 1
+            first = self.calls == 1
+        if self.fail:
+            raise RuntimeError("provider down")
+        if first and self.slow_first:
+            time.sleep(self.slow_first)
+        return f"{self.name}:{text}"
+
+
+def test_breaker_opens_then_probes_once(monkeypatch):
+    monkeypatch.setattr(Config, "BREAKER_FAILURE_THRESHOLD", 3)
+    monkeypatch.setattr(Config, "BREAKER_RESET_SECONDS", 0.1)
+    health = ProviderHealth("breaker-test")
+
+    for _ in range(3):
+        assert health.allow()
+        health.record_failure(0.01)
+    assert not health.allow()
+
+    time.sleep(0.12)
+    assert health.allow()
+    assert not health.allow()  # chỉ một request thử khi half-open
+    health.record_success(0.01)
+    assert health.allow()
+
+
+def test_slow_request_is_hedged(monkeypatch):
+    monkeypatch.setattr(Config, "HEDGE_MIN_DELAY", 0.05)
+    monkeypatch.setattr(Config, "HEDGE_MAX_RATIO", 1.0)
+    backend = FakeBackend("hedge-test", slow_first=1.0)
+    health = get_provider_health(backend.name)
+    for _ in range(Config.HEDGE_MIN_SAMPLES):
+        health.record_success(0.01)
+
+    engine = TranslationEngine(target_lang='vi', backend=backend)
+    started = time.monotonic()
+    assert engine.request_translation("你好") == ("hedge-test:你好", "hedge-test")
+
+    assert time.monotonic() - started < 0.6
+    assert health.hedges == 1 and health.hedge_wins == 1
+
+
+def test_failover_to_next_backend():
+    primary = FakeBackend("down-test", fail=True)
+    fallback = FakeBackend("backup-test")
+    engine = TranslationEngine(target_lang='vi', backend=primary)
+    engine.backends = [primary, fallback]
+
+    assert engine.request_translation("你好") == ("backup-test:你好", "backup-test")
+    assert primary.calls == 1
+    assert get_provider_health("down-test").errors == 1
+
+
+def test_cancelled_probe_releases_half_open(monkeypatch):
+    """Request thử bị hủy (asyncio.CancelledError) không giữ breaker ở half-open mãi"""
+    monkeypatch.setattr(Config, "BREAKER_FAILURE_THRESHOLD", 1)
+    monkeypatch.setattr(Config, "BREAKER_RESET_SECONDS", 0)
+    backend = FakeBackend("cancel-probe-test", slow_first=0.5)
+    health = get_provider_health(backend.name)
+    health.record_failure(0.01)
+    engine = TranslationEngine(target_lang='vi', backend=backend)
+
+    async def cancel_probe():
+        task = asyncio.ensure_future(engine.request_translation_async("你好"))
+        await asyncio.sleep(0.05)
+        assert health.probing
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_probe())
+    assert health.allow()
+
+
+def test_fallback_translation_stored_under_fallback_backend(tmp_path):
+    primary = FakeBackend("memory-down-test", fail=True)
+    fallback = FakeBackend("memory-backup-test")
+    engine = TranslationEngine(target_lang='vi', backend=primary, memory=TranslationMemory(str(tmp_path / "tm.db")))
+    engine.backends = [primary, fallback]
+
+    assert engine.translate_text("你好") == "memory-backup-test:你好"
+    assert engine.memory.get('zh-CN', 'vi', "你好", "memory-backup-test") == "memory-backup-test:你好"
+    assert engine.memory.get('zh-CN', 'vi', "你好", "memory-down-test") is None
@@ -0,0 +1,69 @@
+"""
+Test module - Whisper int8
+"""
+
+import torch
+import whisper
+from whisper.model import ModelDimensions, Whisper
+
+from config import Config
+from core import quantized_whisper
+from core.model_pool import WhisperModelPool
+from core.quantized_whisper import load_quantized_model, split_model_name
+
+
+def make_model():
+    """Model Whisper nhỏ, weight ngẫu nhiên (không cần tải checkpoint)"""
+    torch.manual_seed(0)
+    dims = ModelDimensions(
+        n_mels=80, n_audio_ctx=16, n_audio_state=32, n_audio_head=2, n_audio_layer=1,
+        n_vocab=64, n_text_ctx=8, n_text_state=32, n_text_head=2, n_text_layer=1
+    )
+    return Whisper(dims).eval()
+
+
+def test_split_model_name():
+    assert split_model_name("small-int8") == ("small", True)
+    assert split_model_name("medium") == ("medium", False)
+
+
+def test_quantized_model_cached_on_disk(tmp_path, monkeypatch):
+    """Lần đầu lượng tử hóa và lưu cache, lần sau load từ cache cho kết quả giống hệt"""
+    calls = []
+
+    def fake_load_model(name, device=None):
+        calls.append(name)
+        return make_model()
+
+    monkeypatch.setattr(whisper, "load_model", fake_load_model)
+
+    first = load_quantized_model("m1", cache_dir=str(tmp_path))
+    second = load_quantized_model("m1", cache_dir=str(tmp_path))
+
+    assert calls == ["m1"]
+    assert quantized_whisper.cache_path("m1", str(tmp_path)) in [str(p) for p in tmp_path.iterdir()]
+    assert isinstance(second.encoder.blocks[0].mlp[0], torch.ao.nn.quantized.dynamic.Linear)
+
+    mel = torch.randn(1, 80, 32)
+    with torch.no_grad():
+        assert torch.equal(first.encoder(mel), second.encoder(mel))
+
+
+def test_cache_hit_skips_fp32_build_and_quantization(tmp_path, monkeypatch):
+    """Cache hit: không tạo model fp32, không gọi quantize_dynamic; log hit/miss qua pool"""
+    monkeypatch.setattr(whisper, "load_model", lambda name, device=None: make_model())
+    load_quantized_model("m2", cache_dir=str(tmp_path))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("không được gọi khi cache hit")
+
+    monkeypatch.setattr(whisper, "load_model", fail)
+    monkeypatch.setattr(torch.ao.quantization, "quantize_dynamic", fail)
+    monkeypatch.setattr(whisper.model.Whisper, "__init__", fail)
+    monkeypatch.setattr(Config, "QUANTIZED_MODEL_DIR", str(tmp_path))
+
+    messages = []
+    model = WhisperModelPool(max_mb=1000, idle_timeout=0).get("m2-int8", logger=messages.append)
+
+    assert isinstance(model.encoder.blocks[0].mlp[0], torch.ao.nn.quantized.dynamic.Linear)
+    assert any("int8 đã cache" in message for message in messages)
@@ -0,0 +1,77 @@
+"""
+Test module - Rate control (token bucket, AIMD, backoff có jitter)
+"""
+
+import time
+from email.utils import formatdate
+
+import pytest
+
+from config import Config
+from core.async_transport import TransportError
+from core.rate_control import (
+    AdaptiveConcurrency, RateController, TokenBucket, backoff_delay, parse_retry_after
+)
+from core.translator import TranslationEngine
+
+
+def test_token_bucket_waits_after_burst():
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    # Bucket hết: request thứ 3 phải chờ ~1/10 giây, thứ 4 chờ ~2/10 giây
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.02)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.02)
+
+
+def test_backoff_full_jitter_and_retry_after():
+    for attempt in range(6):
+        delay = backoff_delay(attempt, base=0.5, cap=4)
+        assert 0 <= delay <= min(4, 0.5 * 2 ** attempt)
+    assert backoff_delay(0, retry_after="3", base=0.5) >= 3
+    assert parse_retry_after(formatdate(time.time() + 60, usegmt=True)) == pytest.approx(60, abs=2)
+    assert parse_retry_after("soon") is None
+
+
+def test_aimd_increase_and_decrease():
+    limiter = AdaptiveConcurrency(initial=4, minimum=1, maximum=8)
+    for _ in range(40):
+        limiter.acquire()
+        limiter.release(latency=0.1)
+    assert limiter.limit == 8
+
+    limiter.acquire()
+    limiter.release(latency=0.1, ok=False, throttled=True)
+    assert limiter.limit == 8 * Config.RATE_DECREASE_FACTOR
+    # Cả loạt lỗi cùng lúc chỉ giảm một lần
+    limiter.acquire()
+    limiter.release(latency=0.1, ok=False, throttled=True)
+    assert limiter.limit == 8 * Config.RATE_DECREASE_FACTOR
+
+
+class ThrottlingTransport:
+    """Transport giả: trả 429 + Retry-After cho vài lần gọi đầu"""
+
+    def __init__(self, failures, retry_after="0.2"):
+        self.failures = failures
+        self.retry_after = retry_after
+        self.calls = []
+
+    def translate(self, text, source, target):
+        self.calls.append(time.monotonic())
+        if len(self.calls) <= self.failures:
+            raise TransportError("HTTP 429", status=429, retry_after=self.retry_after)
+        return f"vi:{text}"
+
+
+def test_engine_honours_retry_after(monkeypatch):
+    monkeypatch.setattr(Config, "TRANSLATION_MEMORY_ENABLED", False)
+    monkeypatch.setattr(Config, "RETRY_DELAY", 0.01)
+    transport = ThrottlingTransport(failures=1)
+    rate = RateController(requests_per_second=0, chars_per_second=0, concurrency=AdaptiveConcurrency(initial=4))
+    engine = TranslationEngine(target_lang='vi', transport=transport, rate=rate)
+
+    assert engine.request_translation("你好") == ("vi:你好", engine.backend.name)
+    assert transport.calls[1] - transport.calls[0] >= 0.2
+    assert rate.throttled_count == 1
+    assert rate.concurrency.limit < 4
@@ -0,0 +1,163 @@
+"""
+Test module - Ghi phụ đề dần (*.partial.<ext>) và đổi tên khi xong
+"""
+
+import io
+import os
+
+import pytest
+
+from core.subtitle_writer import SubtitleOutputs, SubtitleWriter
+from utils.helpers import format_timestamp_ass, format_timestamp_srt, format_timestamp_vtt
+
+MODES = ('chinese', 'translated', 'bilingual')
+
+
+def entries(start, count):
+    return [
+        {'start': i, 'end': i + 1.5, 'chinese': f"句{i}", 'vietnamese': f"câu {i}"}
+        for i in range(start, start + count)
+    ]
+
+
+def test_partial_files_readable_while_running(tmp_path):
+    outputs = SubtitleOutputs(SubtitleWriter(), str(tmp_path), "SRT", ['vi', 'en'])
+    outputs.append('vi', entries(0, 2))
+
+    partial = tmp_path / "subtitle_vi.partial.srt"
+    assert partial.read_text(encoding='utf-8') == (
+        "1\n00:00:00,000 --> 00:00:01,500\ncâu 0\n\n"
+        "2\n00:00:01,000 --> 00:00:02,500\ncâu 1\n\n"
+    )
+    assert (tmp_path / "subtitle_chinese.partial.srt").exists()
+    assert not (tmp_path / "subtitle_vi.srt").exists()
+
+    outputs.append('vi', entries(2, 1))
+    outputs.append('en', entries(0, 3))
+    outputs.commit()
+
+    files = sorted(os.listdir(tmp_path))
+    assert not [name for name in files if ".partial." in name]
+    assert "subtitle_bilingual_en.srt" in files
+    assert (tmp_path / "subtitle_vi.srt").read_text(encoding='utf-8').startswith("1\n")
+    assert "3\n00:00:02,000" in (tmp_path / "subtitle_vi.srt").read_text(encoding='utf-8')
+    assert (tmp_path / "subtitle_transcript_chinese.txt").read_text(encoding='utf-8') == "句0\n句1\n句2"
+
+
+def test_abort_keeps_partial_output(tmp_path):
+    outputs = SubtitleOutputs(SubtitleWriter(), str(tmp_path), "VTT", ['vi'])
+    outputs.append('vi', entries(0, 1))
+    outputs.abort()
+
+    assert (tmp_path / "subtitle_vi.partial.vtt").read_text(encoding='utf-8').startswith("WEBVTT\n\n")
+    assert not (tmp_path / "subtitle_vi.vtt").exists()
+
+
+def test_single_pass_matches_per_file_writer(tmp_path):
+    """Ghi một lượt (từng nhóm đoạn, nhiều ngôn ngữ) cho nội dung giống hệt ghi từng file"""
+    writer = SubtitleWriter()
+    translations = {lang: entries(0, 7) for lang in ('vi', 'en')}
+    outputs = SubtitleOutputs(writer, str(tmp_path), "ASS", list(translations))
+    for start, end in ((0, 3), (3, 4), (4, 7)):
+        for lang, segments in translations.items():
+            outputs.append(lang, segments[start:end])
+    outputs.commit()
+
+    writer.write_subtitle(translations['en'], str(tmp_path / "en.ass"), 'bilingual', 'ass')
+    writer.write_transcript(translations['vi'], str(tmp_path / "chinese.txt"), 'chinese')
+    assert (tmp_path / "subtitle_bilingual_en.ass").read_bytes() == (tmp_path / "en.ass").read_bytes()
+    assert (tmp_path / "subtitle_transcript_chinese.txt").read_bytes() == (tmp_path / "chinese.txt").read_bytes()
+
+
+
+def baseline_subtitle(segments, mode, format_type):
+    """Writer gốc (trước khi ghi một lượt): từng dòng một f.write, chuỗi format giữ nguyên văn"""
+    f = io.StringIO()
+    if format_type == 'srt':
+        for i, seg in enumerate(segments, 1):
+            start = format_timestamp_srt(seg['start'])
+            end = format_timestamp_srt(seg['end'])
+            f.write(f"{i}\n")
+            f.write(f"{start} --> {end}\n")
+            if mode == 'chinese':
+                f.write(f"{seg['chinese']}\n\n")
+            elif mode == 'translated':
+                f.write(f"{seg['vietnamese']}\n\n")
+            else:  # bilingual
+                f.write(f"{seg['chinese']}\n{seg['vietnamese']}\n\n")
+    elif format_type == 'vtt':
+        f.write("WEBVTT\n\n")
+        for seg in segments:
+            start = format_timestamp_vtt(seg['start'])
+            end = format_timestamp_vtt(seg['end'])
+            f.write(f"{start} --> {end}\n")
+            if mode == 'chinese':
+                f.write(f"{seg['chinese']}\n\n")
+            elif mode == 'translated':
+                f.write(f"{seg['vietnamese']}\n\n")
+            else:  # bilingual
+                f.write(f"{seg['chinese']}\n{seg['vietnamese']}\n\n")
+    else:
+        f.write("[Script Info]\n")
+        f.write("Title: Video Translator Subtitle\n")
+        f.write("ScriptType: v4.00+\n")
+        f.write("WrapStyle: 0\n")
+        f.write("ScaledBorderAndShadow: yes\n")
+        f.write("YCbCr Matrix: TV.601\n\n")
+        f.write("[V4+ Styles]\n")
+        f.write("Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, "
+                "OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, "
+                "ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+                "Alignment, MarginL, MarginR, MarginV, Encoding\n")
+        f.write("Style: Default,Arial,20,&H00FFFFFF,&H000000FF,&H00000000,&H00000000,"
+                "-1,0,0,0,100,100,0,0,1,2,2,2,10,10,10,1\n\n")
+        f.write("[Events]\n")
+        f.write("Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n")
+        for seg in segments:
+            start = format_timestamp_ass(seg['start'])
+            end = format_timestamp_ass(seg['end'])
+            if mode == 'chinese':
+                text = seg['chinese']
+            elif mode == 'translated':
+                text = seg['vietnamese']
+            else:  # bilingual
+                text = f"{seg['chinese']}\\N{seg['vietnamese']}"
+            f.write(f"Dialogue: 0,{start},{end},Default,,0,0,0,,{text}\n")
+    return f.getvalue()
+
+
+def baseline_transcript(segments, language):
+    """Transcript của writer gốc"""
+    return '\n'.join([seg.get(language, '') for seg in segments])
+
+
+def read(path):
+    with open(path, encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("format_type", ["srt", "vtt", "ass"])
+def test_output_identical_to_baseline_writer(tmp_path, format_type):
+    """Mọi file (ghi từng file và ghi một lượt) giống hệt byte-by-byte writer gốc"""
+    segments = [
+        {'start': 0.0, 'end': 2.9999, 'chinese': "你好", 'vietnamese': "Xin chào"},
+        {'start': 3599.9996, 'end': 3725.125, 'chinese': "再见", 'vietnamese': ""},
+        {'start': 36000.004, 'end': 36001.5, 'chinese': "谢谢", 'vietnamese': "Cảm ơn"}
+    ]
+    writer = SubtitleWriter()
+    for mode in MODES:
+        path = str(tmp_path / f"{mode}.{format_type}")
+        writer.write_subtitle(segments, path, mode, format_type)
+        assert read(path) == baseline_subtitle(segments, mode, format_type)
+
+    outputs = SubtitleOutputs(writer, str(tmp_path), format_type, ['vi'])
+    outputs.append('vi', segments[:1])
+    outputs.append('vi', segments[1:])
+    outputs.commit()
+
+    prefix = str(tmp_path / "subtitle")
+    assert read(f"{prefix}_chinese.{format_type}") == baseline_subtitle(segments, 'chinese', format_type)
+    assert read(f"{prefix}_vi.{format_type}") == baseline_subtitle(segments, 'translated', format_type)
+    assert read(f"{prefix}_bilingual.{format_type}") == baseline_subtitle(segments, 'bilingual', format_type)
+    assert read(f"{prefix}_transcript_chinese.txt") == baseline_transcript(segments, 'chinese')
+    assert read(f"{prefix}_transcript_vi.txt") == baseline_transcript(segments, 'vietnamese')
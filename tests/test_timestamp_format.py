@@ -0,0 +1,68 @@
+"""
+Test module - Format timestamp phụ đề: làm tròn đúng và bản NumPy cho cả mảng giống hệt từng giá trị
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+import pytest
+
+from utils.helpers import (
+    format_timestamp_ass, format_timestamp_srt, format_timestamp_vtt,
+    format_timestamps_ass, format_timestamps_srt, format_timestamps_vtt,
+    seconds_to_units, seconds_to_units_batch
+)
+
+FORMATTERS = [
+    (format_timestamp_srt, format_timestamps_srt),
+    (format_timestamp_vtt, format_timestamps_vtt),
+    (format_timestamp_ass, format_timestamps_ass)
+]
+
+
+def random_times(seed, count=20000):
+    """Thời điểm ngẫu nhiên kèm các giá trị khó: sát biên làm tròn, đúng nửa đơn vị, âm, > 100 giờ"""
+    rng = np.random.default_rng(seed)
+    units = rng.integers(0, 10 ** 8, count)
+    return np.concatenate([
+        rng.uniform(0, 4 * 3600, count),
+        units / 1000,
+        (units + 0.5) / 1000,
+        (units + 0.5) / 100,
+        np.nextafter(units / 1000, 0),
+        np.nextafter(units / 1000, np.inf),
+        rng.uniform(0, 0.002, 1000),
+        [0.0, -0.4, -3.0, 2.9999, 2.995, 3599.9996, 359999.9996, 360000.0, 4e6]
+    ])
+
+
+def exact_units(seconds, per_second):
+    """Làm tròn nửa lên trên giá trị thập phân chính xác của số float"""
+    value = Decimal(float(seconds)) * per_second
+    return max(0, int(value.quantize(Decimal(1), rounding=ROUND_HALF_UP)))
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("per_second", [1000, 100])
+def test_units_correctly_rounded(seed, per_second):
+    times = random_times(seed, count=2000)
+    expected = [exact_units(t, per_second) for t in times]
+    assert [seconds_to_units(t, per_second) for t in times] == expected
+    assert seconds_to_units_batch(times, per_second).tolist() == expected
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("scalar, batch", FORMATTERS)
+def test_batch_identical_to_scalar(seed, scalar, batch):
+    times = random_times(seed)
+    assert batch(times) == [scalar(t) for t in times]
+    assert batch(times.tolist()[:5]) == [scalar(t) for t in times[:5]]
+    assert batch([]) == []
+
+
+def test_rounding_consistent_across_formats():
+    assert format_timestamp_srt(2.9999) == "00:00:03,000"
+    assert format_timestamp_vtt(2.9999) == "00:00:03.000"
+    assert format_timestamp_ass(2.9999) == "0:00:03.00"
+    assert format_timestamps_srt([3599.9996, 360000.0]) == ["01:00:00,000", "100:00:00,000"]
+    assert format_timestamps_ass([36000.004]) == ["10:00:00.00"]
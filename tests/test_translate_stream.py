@@ -0,0 +1,240 @@
+"""
+Test module - Dịch song song với phiên âm (streaming) và gói nhiều đoạn mỗi request
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from config import Config
+from core.parallel_transcriber import SegmentMerger
+from core.reorder_buffer import ReorderBuffer
+from core.translation_backends import TranslationBackend
+from core.translator import TranslationEngine, UntranslatedError, describe_indices
+from core.video_processor import VideoProcessor
+from utils.cancellation import CancelledError
+
+
+@pytest.fixture(autouse=True)
+def offline_engine(monkeypatch):
+    """Không dùng translation memory và async transport thật (engine giả lập lớp mạng)"""
+    monkeypatch.setattr(Config, "TRANSLATION_MEMORY_ENABLED", False)
+    monkeypatch.setattr(Config, "ASYNC_TRANSPORT_ENABLED", False)
+
+
+def make_engine(requests, translated_at=None, drop_line=False):
+    """Engine với lớp mạng giả: dịch từng dòng, ghi lại các request"""
+    engine = TranslationEngine(target_lang='vi')
+
+    def request_translation(text, max_retries=None, wait=True):
+        requests.append(text)
+        lines = text.split("\n")
+        for line in lines:
+            if translated_at is not None:
+                translated_at[line] = time.time()
+        if drop_line and len(lines) > 1:
+            lines = lines[:-1]
+        return "\n".join(f"vi:{line}" for line in lines), engine.backend.name
+
+    engine.request_translation = request_translation
+    return engine
+
+
+def segments(n):
+    return [{'start': i, 'end': i + 1, 'text': f"句{i}"} for i in range(n)]
+
+
+def test_translation_starts_before_source_finishes():
+    """Đoạn đầu được dịch trước khi nguồn (phiên âm) trả đoạn cuối; kết quả giữ thứ tự"""
+    translated_at = {}
+    produced_last = []
+
+    def source():
+        for seg in segments(5):
+            yield seg
+            yield None  # nguồn tạm hết -> gửi gói đang gom
+            time.sleep(0.05)
+        produced_last.append(time.time())
+
+    results = make_engine([], translated_at).translate_stream(source())
+
+    assert [r['vietnamese'] for r in results] == [f"vi:句{i}" for i in range(5)]
+    assert translated_at["句0"] < produced_last[0]
+
+
+def test_translate_stream_stops_on_cancel():
+    cancel = threading.Event()
+
+    def source():
+        yield {'start': 0, 'end': 1, 'text': "甲"}
+        cancel.set()
+        yield {'start': 1, 'end': 2, 'text': "乙"}
+
+    with pytest.raises(CancelledError):
+        make_engine([]).translate_stream(source(), cancel_flag=cancel)
+
+
+def test_segments_packed_into_few_requests(monkeypatch):
+    monkeypatch.setattr(Config, "TRANSLATE_BATCH_MAX_SEGMENTS", 40)
+    requests = []
+    results = make_engine(requests).translate_segments(segments(100))
+
+    assert len(requests) == 3
+    assert all(len(r) <= Config.TRANSLATE_BATCH_MAX_CHARS for r in requests)
+    assert [r['vietnamese'] for r in results] == [f"vi:句{i}" for i in range(100)]
+
+
+def test_pack_split_mismatch_falls_back_per_segment():
+    requests = []
+    results = make_engine(requests, drop_line=True).translate_segments(segments(3))
+
+    assert requests[1:] == ["句0", "句1", "句2"]
+    assert [r['vietnamese'] for r in results] == ["vi:句0", "vi:句1", "vi:句2"]
+
+
+def test_segment_merger_drops_boundary_duplicates():
+    merger = SegmentMerger(tolerance=1.0)
+    first = merger.add([{'start': 0, 'end': 5, 'text': "你好"}])
+    second = merger.add([
+        {'start': 5.5, 'end': 6, 'text': "你好"},
+        {'start': 6, 'end': 8, 'text': "再见"}
+    ])
+    assert [s['id'] for s in first + second] == [0, 1]
+    assert second[0]['text'] == "再见"
+
+
+def test_one_transcription_fans_out_to_all_languages(monkeypatch):
+    """Phiên âm một lần, mỗi ngôn ngữ nhận đủ segment và dịch bằng engine riêng"""
+    def request_translation(self, text, max_retries=None, wait=True):
+        return "\n".join(f"{self.target_lang}:{line}" for line in text.split("\n")), self.backend.name
+
+    monkeypatch.setattr(TranslationEngine, "request_translation", request_translation)
+    processor = VideoProcessor()
+    calls = []
+
+    def iter_transcribe(audio, model_size, cancel_flag=None, stream=False, checkpoint=None):
+        calls.append(model_size)
+        yield segments(3)
+        yield [{'start': 3, 'end': 4, 'text': "句3"}]
+
+    processor.iter_transcribe = iter_transcribe
+    result, translations = processor.transcribe_and_translate(None, "tiny", ['vi', 'en', 'th'])
+
+    assert calls == ["tiny"]
+    assert len(result['segments']) == 4
+    for lang in ('vi', 'en', 'th'):
+        assert [r['vietnamese'] for r in translations[lang]] == [f"{lang}:句{i}" for i in range(4)]
+
+
+def test_planner_translates_each_unique_text_once():
+    """Đoạn trùng (sau chuẩn hóa) dịch một lần; ♪, dấu câu, chữ Latin giữ nguyên"""
+    requests = []
+    texts = ["你好！", "♪ ♪", "你好!", "OK", "...", "  你好！ ", "再见", "ＯＫ"]
+    source = [{'start': i, 'end': i + 1, 'text': text} for i, text in enumerate(texts)]
+
+    results = make_engine(requests).translate_segments(source)
+
+    assert sorted("\n".join(requests).split("\n")) == ["你好!", "再见"]
+    assert [r['vietnamese'] for r in results] == [
+        "vi:你好!", "♪ ♪", "vi:你好!", "OK", "...", "vi:你好!", "vi:再见", "ＯＫ"
+    ]
+    # Text gốc từng đoạn được giữ trong phụ đề tiếng Trung
+    assert results[0]['chinese'] == "你好！"
+
+
+class OutageBackend(TranslationBackend):
+    """Backend giả: lỗi trong outage giây đầu; text chứa "坏" luôn lỗi"""
+
+    def __init__(self, name, outage):
+        self.name = name
+        self.until = time.monotonic() + outage
+        self.calls = 0
+
+    def translate(self, text, source, target):
+        self.calls += 1
+        if time.monotonic() < self.until or "坏" in text:
+            raise RuntimeError("provider down")
+        return "\n".join(f"vi:{line}" for line in text.split("\n"))
+
+
+def test_failed_segments_retried_after_main_pass(monkeypatch):
+    """Worker không chờ backoff; đoạn lỗi được dịch lại sau lượt chính, đoạn vẫn lỗi giữ text gốc"""
+    monkeypatch.setattr(Config, "RATE_CONTROL_ENABLED", False)
+    monkeypatch.setattr(Config, "RETRY_DELAY", 5)  # worker sleep backoff -> test chậm
+    monkeypatch.setattr(Config, "DEFERRED_RETRY_DELAYS", [0.1, 0.1])
+    monkeypatch.setattr(Config, "BREAKER_FAILURE_THRESHOLD", 1000)
+    engine = TranslationEngine(target_lang='vi', backend=OutageBackend("deferred-test", outage=0.05))
+    texts = [f"句{i}" for i in range(6)] + ["坏"] + ["句0"]
+    source = [{'start': i, 'end': i + 1, 'text': text} for i, text in enumerate(texts)]
+
+    started = time.monotonic()
+    results = engine.translate_segments(source)
+
+    assert time.monotonic() - started < 2
+    assert [r['vietnamese'] for r in results] == [f"vi:句{i}" for i in range(6)] + ["坏", "vi:句0"]
+    assert engine.untranslated == [6]
+
+
+def test_deferred_retry_waits_for_open_breaker(monkeypatch):
+    """Sự cố làm ngắt provider: lượt dịch lại chờ circuit cho request thử rồi mới gửi hết"""
+    monkeypatch.setattr(Config, "RATE_CONTROL_ENABLED", False)
+    monkeypatch.setattr(Config, "TRANSLATE_BATCH_MAX_SEGMENTS", 5)
+    monkeypatch.setattr(Config, "DEFERRED_RETRY_DELAYS", [0, 0, 0])
+    monkeypatch.setattr(Config, "BREAKER_FAILURE_THRESHOLD", 2)
+    monkeypatch.setattr(Config, "BREAKER_RESET_SECONDS", 0.3)
+    backend = OutageBackend("breaker-deferred-test", outage=0.1)
+    engine = TranslationEngine(target_lang='vi', backend=backend)
+
+    results = engine.translate_segments(segments(60))
+
+    assert [r['vietnamese'] for r in results] == [f"vi:句{i}" for i in range(60)]
+    assert engine.untranslated == []
+
+
+def test_untranslated_policy(monkeypatch):
+    assert describe_indices([0, 4, 5, 6, 9]) == "#1, #5-7, #10"
+    processor = VideoProcessor()
+    translators = {'vi': SimpleNamespace(untranslated=[4]), 'en': SimpleNamespace(untranslated=[])}
+
+    processor.check_untranslated(translators)
+    assert processor.untranslated == {'vi': [4]}
+
+    monkeypatch.setattr(Config, "UNTRANSLATED_POLICY", "fail")
+    with pytest.raises(UntranslatedError, match="vi: #5"):
+        processor.check_untranslated(translators)
+
+    monkeypatch.setattr(Config, "UNTRANSLATED_POLICY", "fial")
+    with pytest.raises(ValueError):
+        processor.check_untranslated(translators)
+
+
+def test_reorder_buffer_releases_contiguous_prefix():
+    buffer = ReorderBuffer(ready=lambda entry: entry is not None)
+    assert buffer.add([(1, "b"), (2, None)]) == []
+    assert buffer.add([(0, "a"), (3, "d")]) == ["a", "b"]
+    # Đoạn 2 chưa sẵn sàng giữ lại đoạn 3
+    assert buffer.held() == [(2, None), (3, "d")]
+    assert buffer.add([(2, "c")]) == ["c", "d"]
+
+
+def test_results_delivered_in_timeline_order(monkeypatch):
+    """on_ordered nhận kết quả theo đúng thứ tự dù gói về không theo thứ tự"""
+    monkeypatch.setattr(Config, "TRANSLATE_BATCH_MAX_SEGMENTS", 2)
+    engine = make_engine([])
+    request = engine.request_translation
+
+    def slow_first(text, max_retries=None, wait=True):
+        if "句0" in text.split("\n"):
+            time.sleep(0.2)
+        return request(text, max_retries, wait)
+
+    engine.request_translation = slow_first
+    released = []
+    results = engine.translate_stream(segments(20), on_ordered=lambda entries: released.append(list(entries)))
+
+    assert [e['chinese'] for batch in released for e in batch] == [f"句{i}" for i in range(20)]
+    # Các gói sau về trước gói đầu: chúng được giữ lại rồi trả ra cùng lúc với gói đầu
+    assert len(released[0]) > 2
+    assert [r['vietnamese'] for r in results] == [f"vi:句{i}" for i in range(20)]
@@ -0,0 +1,49 @@
+"""
+Test module - Backend dịch local (batch, sắp theo độ dài) phía sau TranslationEngine
+"""
+
+import pytest
+
+pytest.importorskip("transformers")
+
+from config import Config
+from core.translation_backends import LocalSeq2SeqBackend
+from core.translator import TranslationEngine
+
+
+class FakeLocalBackend(LocalSeq2SeqBackend):
+    """Model giả: ghi lại các batch, 'dịch' bằng cách thêm tiền tố"""
+
+    def __init__(self, model_dir, batch_size):
+        super().__init__(model_dir, batch_size=batch_size)
+        self.batches = []
+
+    def load(self):
+        self.model = object()
+
+    def generate(self, texts):
+        self.batches.append(list(texts))
+        return [f"vi:{text}" for text in texts]
+
+
+def test_batches_sorted_by_length_and_order_restored(tmp_path):
+    backend = FakeLocalBackend(str(tmp_path), batch_size=2)
+    texts = ["aaaa", "a", "aaa", "aa", "aaaaa"]
+
+    assert backend.translate_batch(texts, 'zh-CN', 'vi') == [f"vi:{t}" for t in texts]
+    assert backend.batches == [["a", "aa"], ["aaa", "aaaa"], ["aaaaa"]]
+
+
+def test_engine_sends_segment_lists_to_local_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "TRANSLATION_MEMORY_ENABLED", False)
+    monkeypatch.setattr(Config, "LOCAL_MT_PACK_SEGMENTS", 64)
+    backend = FakeLocalBackend(str(tmp_path), batch_size=16)
+    engine = TranslationEngine(target_lang='vi', backend=backend)
+    segments = [{'start': i, 'end': i + 1, 'text': f"句{i}"} for i in range(100)]
+
+    results = engine.translate_segments(segments)
+
+    assert engine.rate is None
+    assert [r['vietnamese'] for r in results] == [f"vi:句{i}" for i in range(100)]
+    # Không ghép dòng: mỗi batch là danh sách đoạn, tối đa LOCAL_MT_BATCH_SIZE
+    assert all(len(batch) <= 16 and all("\n" not in t for t in batch) for batch in backend.batches)
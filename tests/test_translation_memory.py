@@ -0,0 +1,98 @@
+"""
+Test module - Translation memory (SQLite)
+"""
+
+import threading
+
+import pytest
+
+from config import Config
+from core.translation_memory import TranslationMemory
+from core.translator import TranslationEngine
+
+
+def make_engine(memory, requests):
+    """Engine với lớp mạng giả: đếm số lần gọi mạng"""
+    engine = TranslationEngine(target_lang='vi', memory=memory)
+
+    def request_translation(text, max_retries=None, wait=True):
+        requests.append(text)
+        return f"vi:{text}", engine.backend.name
+
+    engine.request_translation = request_translation
+    return engine
+
+
+def test_cache_hit_skips_network_across_jobs(tmp_path):
+    path = str(tmp_path / "tm.db")
+    requests = []
+
+    first = make_engine(TranslationMemory(path), requests)
+    assert first.translate_text("大家好") == "vi:大家好"
+
+    # Job khác (memory mới, cùng file); full-width/khoảng trắng được chuẩn hóa
+    second = make_engine(TranslationMemory(path), requests)
+    assert second.translate_text(" 大家好 ") == "vi:大家好"
+    assert second.translate_text("大家好！") == "vi:大家好！"
+
+    assert requests == ["大家好", "大家好！"]
+    assert (second.memory_hits, second.memory_misses) == (1, 1)
+
+
+def test_failed_translation_not_cached(tmp_path):
+    engine = TranslationEngine(target_lang='vi', memory=TranslationMemory(str(tmp_path / "tm.db")))
+    engine.request_translation = lambda text, max_retries=None, wait=True: (None, None)
+    assert engine.translate_text("你好") is None
+    assert engine.memory.get('zh-CN', 'vi', "你好", engine.backend.name) is None
+
+
+def test_prune_export_import(tmp_path):
+    memory = TranslationMemory(str(tmp_path / "tm.db"), max_entries=2)
+    for i in range(3):
+        memory.put('zh-CN', 'vi', f"句{i}", 'google', f"câu {i}")
+    memory.get('zh-CN', 'vi', "句0", 'google')  # dùng lại -> không bị xóa
+
+    assert memory.prune() == 1
+    assert memory.get('zh-CN', 'vi', "句1", 'google') is None
+
+    export_path = str(tmp_path / "tm.jsonl")
+    assert memory.export_jsonl(export_path) == 2
+
+    other = TranslationMemory(str(tmp_path / "other.db"))
+    assert other.import_jsonl(export_path) == 2
+    assert other.get('zh-CN', 'vi', "句2", 'google') == "câu 2"
+
+
+def test_concurrent_threads(tmp_path):
+    memory = TranslationMemory(str(tmp_path / "tm.db"))
+
+    def worker(n):
+        for i in range(20):
+            memory.put('zh-CN', 'vi', f"{n}-{i}", 'google', "x")
+            memory.get('zh-CN', 'vi', f"{n}-{i}", 'google')
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert memory.stats()['entries'] == 80
+
+
+@pytest.mark.parametrize("batching", [True, False])
+def test_memory_looked_up_once_per_segment(tmp_path, monkeypatch, batching):
+    """Đoạn lẻ (gói một đoạn) không bị tra translation memory lần nữa khi dịch"""
+    monkeypatch.setattr(Config, "TRANSLATE_BATCH_ENABLED", batching)
+    monkeypatch.setattr(Config, "TRANSLATE_BATCH_MAX_SEGMENTS", 1)
+    monkeypatch.setattr(Config, "ASYNC_TRANSPORT_ENABLED", False)
+    memory = TranslationMemory(str(tmp_path / "tm.db"))
+    memory.put('zh-CN', 'vi', "句0", 'google', "câu 0")
+    requests = []
+    engine = make_engine(memory, requests)
+    segments = [{'start': i, 'end': i + 1, 'text': f"句{i}"} for i in range(4)]
+
+    results = engine.translate_segments(segments)
+
+    assert [r['vietnamese'] for r in results] == ["câu 0", "vi:句1", "vi:句2", "vi:句3"]
+    assert sorted(requests) == ["句1", "句2", "句3"]
+    assert (engine.memory_hits, engine.memory_misses) == (1, 3)
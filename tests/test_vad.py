@@ -0,0 +1,79 @@
+"""
+Test module - Voice activity detection
+"""
+
+import numpy as np
+
+from utils.vad import detect_speech_regions, concat_regions, plan_chunks
+
+SR = 16000
+
+
+def voiced(seconds, seed=0):
+    """Tín hiệu giống giọng nói: hài âm 150 Hz, biên độ dao động 4 Hz"""
+    t = np.arange(int(seconds * SR)) / SR
+    carrier = sum(np.sin(2 * np.pi * 150 * k * t) / k for k in range(1, 6))
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * 4 * t)) ** 2
+    noise = np.random.default_rng(seed).normal(0, 0.001, len(t))
+    return (0.1 * carrier * envelope + noise).astype(np.float32)
+
+
+def silence(seconds):
+    return np.random.default_rng(1).normal(0, 0.0005, int(seconds * SR)).astype(np.float32)
+
+
+def tone(seconds):
+    """Âm đều (giống nhạc nền kéo dài) -> không phải giọng nói"""
+    t = np.arange(int(seconds * SR)) / SR
+    return (0.2 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+
+def test_detects_speech_and_skips_silence_and_tone():
+    """Chỉ vùng giọng nói được giữ lại"""
+    audio = np.concatenate([silence(3), voiced(3), silence(3), tone(4), voiced(2)])
+    regions = detect_speech_regions(audio, SR)
+
+    assert len(regions) == 2
+    (s1, e1), (s2, e2) = regions
+    assert 2.5 <= s1 <= 3.1 and 5.9 <= e1 <= 6.5
+    assert 12.5 <= s2 <= 13.1 and e2 == len(audio) / SR
+
+
+def test_silence_only_has_no_regions():
+    """Audio toàn khoảng lặng -> không có vùng nào"""
+    assert detect_speech_regions(silence(5), SR) == []
+    assert detect_speech_regions(np.zeros(0, dtype=np.float32), SR) == []
+
+
+def test_timeline_maps_back_to_original():
+    """Timestamp trên audio đã ghép được map về timeline gốc"""
+    audio = np.zeros(20 * SR, dtype=np.float32)
+    speech, timeline = concat_regions(audio, [(2.0, 5.0), (10.0, 12.0)], SR)
+
+    assert len(speech) == 5 * SR
+    segments = [
+        {'start': 0.5, 'end': 3.0},   # Kết thúc đúng chỗ nối -> thuộc vùng đầu
+        {'start': 3.0, 'end': 4.5},   # Bắt đầu đúng chỗ nối -> thuộc vùng sau
+    ]
+    timeline.remap_segments(segments)
+
+    assert segments[0] == {'start': 2.5, 'end': 5.0}
+    assert segments[1] == {'start': 10.0, 'end': 11.5}
+
+
+def test_chunks_cut_in_middle_of_silence():
+    """Chunk phủ liền mạch cả audio, không chồng nhau, điểm cắt nằm giữa khoảng lặng"""
+    regions = [(0.0, 10.0), (12.0, 20.0), (25.0, 28.0)]
+
+    assert plan_chunks(regions, 15) == [[(0.0, 10.0)], [(12.0, 20.0)], [(25.0, 28.0)]]
+    assert plan_chunks(regions, 15, duration=30.0) == [[(0.0, 11.0)], [(11.0, 22.5)], [(22.5, 30.0)]]
+    # Vùng ngắn gần nhau được gom vào cùng chunk
+    assert plan_chunks([(0.0, 3.0), (4.0, 6.0), (20.0, 21.0)], 10) == [[(0.0, 3.0), (4.0, 6.0)], [(20.0, 21.0)]]
+
+
+def test_long_region_split_and_short_final_chunk():
+    """Vùng dài hơn chunk_seconds bị cắt; chunk cuối ngắn hơn vẫn được giữ"""
+    chunks = plan_chunks([(0.0, 40.0)], 15, duration=42.0)
+    assert chunks == [[(0.0, 15.0)], [(15.0, 30.0)], [(30.0, 42.0)]]
+    # Không có giọng nói: chia đều theo chunk_seconds
+    assert plan_chunks([], 15, duration=35.0) == [[(0.0, 15.0)], [(15.0, 30.0)], [(30.0, 35.0)]]
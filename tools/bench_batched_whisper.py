@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark - So sánh phiên âm tuần tự (model.transcribe) và batched Whisper
+
+Ví dụ:
+    python tools/bench_batched_whisper.py video.mp4 --model small --seconds 300 --batch-sizes 4,8,16
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import Config
+from core.batched_whisper import BatchedWhisper, plan_windows
+from core.model_pool import load_whisper_model
+from utils.audio import audio_duration, decode_audio_pcm
+from utils.vad import concat_regions, detect_speech_regions
+
+
+def run_sequential(model, audio):
+    """Đường hiện tại: một lần model.transcribe trên audio đã ghép vùng giọng nói"""
+    started = time.time()
+    result = model.transcribe(audio, language='zh', verbose=None, fp16=model.device.type == 'cuda')
+    return time.time() - started, len(result['segments'])
+
+
+def run_batched(model, audio, windows, batch_size):
+    """Batched: các cửa sổ 30 giây độc lập, batch_size cửa sổ mỗi lần"""
+    batched = BatchedWhisper(model)
+    started = time.time()
+    count = 0
+    for i in range(0, len(windows), batch_size):
+        pieces = [concat_regions(audio, window)[0] for window in windows[i:i + batch_size]]
+        count += sum(len(segments) for segments in batched.transcribe(pieces))
+    return time.time() - started, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched Whisper trên CPU")
+    parser.add_argument("video", help="File video/audio")
+    parser.add_argument("--model", default="small", help="Model Whisper (vd: small, small-int8)")
+    parser.add_argument("--seconds", type=float, default=300, help="Chỉ dùng N giây đầu (0 = cả file)")
+    parser.add_argument("--batch-sizes", default="4,8", help="Các batch size cần đo, cách nhau bởi dấu phẩy")
+    parser.add_argument("--no-vad", action="store_true", help="Không lọc khoảng lặng, chia đều cả audio")
+    args = parser.parse_args()
+
+    audio = decode_audio_pcm(args.video)
+    if args.seconds:
+        audio = audio[:int(args.seconds * Config.AUDIO_SAMPLE_RATE)]
+    duration = audio_duration(audio)
+
+    if args.no_vad:
+        speech = audio
+        windows = plan_windows([], duration)
+    else:
+        regions = detect_speech_regions(audio)
+        speech, _ = concat_regions(audio, regions)
+        windows = plan_windows(regions)
+    print(f"Audio {duration:.0f}s, giọng nói {audio_duration(speech):.0f}s, {len(windows)} cửa sổ")
+
+    model = load_whisper_model(args.model)
+    # Chạy thử để đo không tính thời gian khởi tạo kernel
+    BatchedWhisper(model).transcribe([speech[:Config.AUDIO_SAMPLE_RATE]])
+
+    elapsed, count = run_sequential(model, speech)
+    print(f"{'tuần tự':>12}: {elapsed:7.1f}s  RTF {elapsed / duration:.3f}  {count} đoạn")
+
+    for size in (int(s) for s in args.batch_sizes.split(",")):
+        elapsed, count = run_batched(model, audio, windows, size)
+        print(f"{f'batch {size}':>12}: {elapsed:7.1f}s  RTF {elapsed / duration:.3f}  {count} đoạn")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark - Ghi phụ đề từng file (mỗi file duyệt lại mọi đoạn) so với một lượt cho mọi file
+
+Lưu ý: "từng file" là SubtitleWriter hiện tại gọi riêng cho mỗi file (đã ghi một lần write và
+format timestamp theo mảng), không phải writer gốc ghi từng dòng; số đo chỉ cho thấy lợi ích của
+việc ghi một lượt. Output giống hệt writer gốc được kiểm tra trong tests/test_subtitle_writer.py.
+
+Ví dụ:
+    python tools/bench_subtitle_writer.py --segments 100000 --langs vi,en --format srt
+"""
+
+import argparse
+import filecmp
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.subtitle_writer import SubtitleOutputs, SubtitleWriter
+
+
+def make_translations(count, langs):
+    """Các đoạn giả lập: timestamp ngẫu nhiên tăng dần, text ngắn"""
+    rng = random.Random(0)
+    segments = []
+    time_now = 0.0
+    for i in range(count):
+        start = time_now + rng.uniform(0, 1)
+        time_now = start + rng.uniform(0.5, 6)
+        segments.append({'start': start, 'end': time_now, 'chinese': f"这是第{i}句话"})
+    return {
+        lang: [dict(seg, vietnamese=f"{lang} câu thứ {i}") for i, seg in enumerate(segments)]
+        for lang in langs
+    }
+
+
+def run_per_file(writer, translations, output_dir, ext):
+    """Mỗi file một lần gọi writer hiện tại (2 + 3 x số ngôn ngữ lần duyệt các đoạn)"""
+    prefix = os.path.join(output_dir, "subtitle")
+    first = next(iter(translations.values()))
+    multiple = len(translations) > 1
+    started = time.perf_counter()
+    writer.write_subtitle(first, f"{prefix}_chinese.{ext}", 'chinese', ext)
+    writer.write_transcript(first, f"{prefix}_transcript_chinese.txt", 'chinese')
+    for lang, segments in translations.items():
+        bilingual = f"bilingual_{lang}" if multiple else "bilingual"
+        writer.write_subtitle(segments, f"{prefix}_{lang}.{ext}", 'translated', ext)
+        writer.write_subtitle(segments, f"{prefix}_{bilingual}.{ext}", 'bilingual', ext)
+        writer.write_transcript(segments, f"{prefix}_transcript_{lang}.txt")
+    return time.perf_counter() - started
+
+
+def run_single_pass(writer, translations, output_dir, ext):
+    """SubtitleOutputs: timestamp format một lần, mọi file của một ngôn ngữ trong một lượt"""
+    started = time.perf_counter()
+    outputs = SubtitleOutputs(writer, output_dir, ext, list(translations))
+    for lang, segments in translations.items():
+        outputs.append(lang, segments)
+    outputs.commit()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ghi phụ đề")
+    parser.add_argument("--segments", type=int, default=100000, help="Số đoạn giả lập")
+    parser.add_argument("--langs", default="vi", help="Các ngôn ngữ đích, cách nhau bởi dấu phẩy")
+    parser.add_argument("--format", default="srt", choices=["srt", "vtt", "ass"])
+    parser.add_argument("--repeat", type=int, default=3, help="Số lần đo (lấy nhanh nhất)")
+    args = parser.parse_args()
+
+    translations = make_translations(args.segments, args.langs.split(","))
+    writer = SubtitleWriter()
+
+    with tempfile.TemporaryDirectory() as per_file_dir, tempfile.TemporaryDirectory() as single_dir:
+        per_file = min(run_per_file(writer, translations, per_file_dir, args.format) for _ in range(args.repeat))
+        single = min(run_single_pass(writer, translations, single_dir, args.format) for _ in range(args.repeat))
+
+        names = sorted(os.listdir(per_file_dir))
+        _, mismatch, errors = filecmp.cmpfiles(per_file_dir, single_dir, names, shallow=False)
+        if mismatch or errors:
+            print(f"❌ Output khác nhau: {mismatch + errors}")
+            sys.exit(1)
+
+    print(f"{args.segments} đoạn, {len(translations)} ngôn ngữ, {len(names)} file {args.format}")
+    print(f"{'từng file':>12}: {per_file:7.3f}s")
+    print(f"{'một lượt':>12}: {single:7.3f}s  (x{per_file / single:.2f})")
+
+
+if __name__ == "__main__":
+    main()
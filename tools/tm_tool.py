@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Translation Memory Tool - Xem thống kê, xuất/nhập, dọn translation memory
+
+Ví dụ:
+    python tools/tm_tool.py stats
+    python tools/tm_tool.py export tm_backup.jsonl
+    python tools/tm_tool.py import tm_backup.jsonl
+    python tools/tm_tool.py prune --max-entries 50000
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import Config
+from core.translation_memory import TranslationMemory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quản lý translation memory (SQLite)")
+    parser.add_argument("--db", default=Config.TRANSLATION_MEMORY_PATH, help="File SQLite")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("stats", help="Số bản dịch, lượt dùng lại, dung lượng")
+    export = sub.add_parser("export", help="Xuất ra file JSONL")
+    export.add_argument("path")
+    import_ = sub.add_parser("import", help="Nhập từ file JSONL (ghi đè key trùng)")
+    import_.add_argument("path")
+    prune = sub.add_parser("prune", help="Xóa bản dịch lâu không dùng nhất")
+    prune.add_argument("--max-entries", type=int, default=Config.TRANSLATION_MEMORY_MAX_ENTRIES)
+    sub.add_parser("clear", help="Xóa toàn bộ")
+
+    args = parser.parse_args()
+    memory = TranslationMemory(args.db)
+
+    if args.command == "stats":
+        stats = memory.stats()
+        print(f"📁 {args.db}")
+        print(f"   {stats['entries']} bản dịch, {stats['hits']} lượt dùng lại, "
+              f"{stats['size_bytes'] / (1024 * 1024):.1f} MB")
+    elif args.command == "export":
+        print(f"✅ Đã xuất {memory.export_jsonl(args.path)} bản dịch -> {args.path}")
+    elif args.command == "import":
+        print(f"✅ Đã nhập {memory.import_jsonl(args.path)} bản dịch")
+    elif args.command == "prune":
+        print(f"🧹 Đã xóa {memory.prune(args.max_entries)} bản dịch")
+    elif args.command == "clear":
+        memory.clear()
+        print("🧹 Đã xóa toàn bộ translation memory")
+
+
+if __name__ == "__main__":
+    main()
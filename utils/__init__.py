@@ -10,10 +10,14 @@ from .helpers import (
     validate_video_file,
     format_timestamp_srt,
     format_timestamp_vtt,
-    format_timestamp_ass
+    format_timestamp_ass,
+    format_timestamps_srt,
+    format_timestamps_vtt,
+    format_timestamps_ass
 )
 from .settings import SettingsManager
 from .dependencies import DependencyChecker
+from .cancellation import CancellationToken, CancelledError
 
 __all__ = [
     'check_ffmpeg',
@@ -24,6 +28,11 @@ __all__ = [
     'format_timestamp_srt',
     'format_timestamp_vtt',
     'format_timestamp_ass',
+    'format_timestamps_srt',
+    'format_timestamps_vtt',
+    'format_timestamps_ass',
     'SettingsManager',
-    'DependencyChecker'
+    'DependencyChecker',
+    'CancellationToken',
+    'CancelledError'
 ]
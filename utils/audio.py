@@ -0,0 +1,98 @@
+"""
+Audio Utilities - Giải mã audio PCM từ video
+"""
+
+import wave
+
+import numpy as np
+
+from config import Config
+from .ffmpeg_runner import run_ffmpeg
+
+# Whisper nhận PCM float32 trong khoảng [-1, 1]
+PCM_SCALE = 32768.0
+
+
+def build_pcm_command(video_path, sample_rate=None, channels=None, stream=None):
+    """Lệnh FFmpeg xuất PCM s16le ra stdout (không ghi file)"""
+    cmd = ['ffmpeg', '-nostdin', '-i', video_path]
+    if stream is not None:
+        cmd += ['-map', f'0:a:{stream}']
+    return cmd + [
+        '-vn', '-f', 's16le', '-acodec', 'pcm_s16le',
+        '-ar', str(sample_rate or Config.AUDIO_SAMPLE_RATE),
+        '-ac', str(channels or Config.AUDIO_CHANNELS),
+        '-threads', str(Config.CPU_THREADS),
+        '-'
+    ]
+
+
+class PcmBuffer:
+    """Nhận PCM s16le từ FFmpeg theo từng khối, đổi ngay sang float32 vào mảng cấp sẵn
+
+    Không giữ bytes thô của cả file: bộ nhớ đỉnh ~ mảng float32 kết quả. Biết thời lượng
+    thì cấp đủ một lần (cộng PCM_BUFFER_MARGIN giây), không thì mảng lớn dần.
+    """
+
+    def __init__(self, duration=None, sample_rate=None, channels=None):
+        rate = (sample_rate or Config.AUDIO_SAMPLE_RATE) * (channels or Config.AUDIO_CHANNELS)
+        capacity = int((duration + Config.PCM_BUFFER_MARGIN) * rate) if duration else rate * 60
+        self.audio = np.empty(capacity, dtype=np.float32)
+        self.size = 0
+        self.odd_byte = b''  # Khối bị cắt giữa một mẫu 16-bit
+
+    def write(self, chunk):
+        """Đổi một khối PCM s16le sang float32, ghi nối vào mảng"""
+        if self.odd_byte:
+            chunk = self.odd_byte + bytes(chunk)
+        usable = len(chunk) - len(chunk) % 2
+        self.odd_byte = bytes(chunk[usable:])
+        samples = np.frombuffer(chunk, dtype='<i2', count=usable // 2)
+
+        end = self.size + len(samples)
+        if end > len(self.audio):
+            self._grow(end)
+        np.divide(samples, np.float32(PCM_SCALE), out=self.audio[self.size:end])
+        self.size = end
+
+    def _grow(self, needed):
+        """Thời lượng ước tính thiếu: cấp mảng lớn hơn (ít nhất gấp 1.5) và chép phần đã có"""
+        audio = np.empty(max(needed, int(len(self.audio) * 1.5)), dtype=np.float32)
+        audio[:self.size] = self.audio[:self.size]
+        self.audio = audio
+
+    def result(self):
+        """Mảng float32 đã giải mã (trả lại phần cấp dư cho hệ thống, không chép mảng)"""
+        if len(self.audio) != self.size:
+            self.audio.resize(self.size, refcheck=False)
+        return self.audio
+
+
+def decode_audio_pcm(video_path, stream=None, duration=None, on_progress=None, cancel_flag=None):
+    """Giải mã audio của video thành mảng float32 (một lần FFmpeg duy nhất)"""
+    cmd = build_pcm_command(video_path, stream=stream)
+    pcm = PcmBuffer(duration)
+    run_ffmpeg(
+        cmd,
+        duration=duration,
+        on_progress=on_progress,
+        cancel_flag=cancel_flag,
+        stdout_sink=pcm
+    )
+    return pcm.result()
+
+
+def write_wav(audio, filename, sample_rate=None, channels=None):
+    """Ghi mảng float32 ra file WAV 16-bit (chỉ dùng để debug)"""
+    pcm = np.clip(audio, -1.0, 1.0 - 1.0 / PCM_SCALE) * PCM_SCALE
+    with wave.open(filename, 'wb') as f:
+        f.setnchannels(channels or Config.AUDIO_CHANNELS)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate or Config.AUDIO_SAMPLE_RATE)
+        f.writeframes(pcm.astype('<i2').tobytes())
+    return filename
+
+
+def audio_duration(audio, sample_rate=None):
+    """Thời lượng (giây) của mảng audio"""
+    return len(audio) / float(sample_rate or Config.AUDIO_SAMPLE_RATE)
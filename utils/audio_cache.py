@@ -0,0 +1,143 @@
+"""
+Audio Cache - Cache PCM đã giải mã theo nội dung video
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+from config import Config
+
+CACHE_VERSION = 1
+CACHE_EXT = ".f32"
+
+
+class AudioCache:
+    """Lưu PCM float32 ra file raw, mở lại bằng numpy.memmap, giới hạn dung lượng (LRU)"""
+
+    def __init__(self, cache_dir=None, max_bytes=None, logger=None):
+        self.cache_dir = cache_dir or Config.AUDIO_CACHE_DIR
+        if max_bytes is None:
+            max_bytes = Config.AUDIO_CACHE_MAX_MB * 1024 * 1024
+        self.max_bytes = max_bytes
+        self.logger = logger
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def log(self, message):
+        """Log message"""
+        if self.logger:
+            self.logger(message)
+
+    def make_key(self, video_path, sample_rate=None, channels=None, stream=None):
+        """Tạo key từ nội dung, kích thước, mtime của video và tham số audio"""
+        stat = os.stat(video_path)
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f"v{CACHE_VERSION}|{stat.st_size}|{stat.st_mtime_ns}|".encode())
+        digest.update(f"{sample_rate or Config.AUDIO_SAMPLE_RATE}|{channels or Config.AUDIO_CHANNELS}|".encode())
+        digest.update(f"{stream}|".encode())
+
+        # Hash phần đầu và cuối file: đủ phân biệt nội dung khi đã có size + mtime,
+        # không phải đọc lại toàn bộ video nhiều GB mỗi lần chạy
+        sample_bytes = Config.AUDIO_CACHE_HASH_SAMPLE_MB * 1024 * 1024
+        with open(video_path, 'rb') as f:
+            digest.update(f.read(sample_bytes))
+            if stat.st_size > 2 * sample_bytes:
+                f.seek(-sample_bytes, os.SEEK_END)
+            digest.update(f.read(sample_bytes))
+
+        return digest.hexdigest()
+
+    def path_for(self, key):
+        """Đường dẫn file cache của key"""
+        return os.path.join(self.cache_dir, key + CACHE_EXT)
+
+    def get(self, key):
+        """Lấy audio đã cache (memmap) hoặc None"""
+        path = self.path_for(key)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return None
+
+        # Đánh dấu vừa dùng cho LRU (atime không đáng tin trên nhiều hệ thống)
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        if size == 0:
+            return np.zeros(0, dtype=np.float32)
+
+        # mode='c': copy-on-write, torch.from_numpy không cảnh báo mảng read-only
+        return np.memmap(path, dtype='<f4', mode='c')
+
+    def put(self, key, audio):
+        """Lưu audio vào cache (ghi atomic) rồi dọn cache nếu vượt dung lượng"""
+        audio = np.ascontiguousarray(audio, dtype='<f4')
+        if audio.nbytes > self.max_bytes:
+            self.log("⚠️ Audio lớn hơn dung lượng cache, bỏ qua cache")
+            return audio
+
+        self.evict(reserve=audio.nbytes)
+
+        path = self.path_for(key)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        try:
+            audio.tofile(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.log(f"⚠️ Không thể ghi cache audio: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        return audio
+
+    def entries(self):
+        """Danh sách (mtime, size, path) các file cache, cũ nhất trước"""
+        result = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(CACHE_EXT):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            result.append((stat.st_mtime, stat.st_size, path))
+        result.sort()
+        return result
+
+    def total_size(self):
+        """Tổng dung lượng cache (bytes)"""
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, reserve=0):
+        """Xóa các file ít dùng nhất tới khi đủ chỗ cho reserve bytes"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+
+        for _, size, path in entries:
+            if total + reserve <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # File đang được memmap (Windows) -> bỏ qua
+                continue
+            total -= size
+            removed += 1
+
+        if removed:
+            self.log(f"🧹 Đã dọn {removed} file cache audio cũ")
+
+        return removed
+
+    def clear(self):
+        """Xóa toàn bộ cache"""
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
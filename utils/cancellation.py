@@ -0,0 +1,76 @@
+"""
+Cancellation - Token hủy dùng chung cho mọi bước của một job và lỗi CancelledError
+"""
+
+import threading
+
+CANCEL_MESSAGE = "Người dùng đã hủy"
+
+
+class CancelledError(Exception):
+    """Job bị người dùng hủy"""
+
+    def __init__(self, message=CANCEL_MESSAGE):
+        super().__init__(message)
+
+
+class CancellationToken(threading.Event):
+    """threading.Event có thêm callback khi hủy
+
+    Dùng được ở mọi chỗ nhận cancel_flag (is_set/wait/set/clear). Callback đăng ký bằng
+    on_cancel() chạy ngay trên thread gọi cancel(): dừng FFmpeg, hủy request dịch đang
+    chờ... nên các bước không phải đợi tới lần kiểm tra cờ kế tiếp.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._callbacks = []
+        self._callbacks_lock = threading.Lock()
+
+    def set(self):
+        with self._callbacks_lock:
+            if self.is_set():
+                return
+            super().set()
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                # Một bước dọn dẹp lỗi không được chặn các bước còn lại
+                pass
+
+    cancel = set
+
+    def on_cancel(self, callback):
+        """Gọi callback khi bị hủy (ngay lập tức nếu đã hủy), trả về hàm hủy đăng ký"""
+        with self._callbacks_lock:
+            if not self.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._unregister(callback)
+        callback()
+        return lambda: None
+
+    def _unregister(self, callback):
+        with self._callbacks_lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self):
+        raise_if_cancelled(self)
+
+
+def raise_if_cancelled(cancel_flag):
+    """Raise CancelledError nếu cancel_flag (CancellationToken hoặc threading.Event) đã bật"""
+    if cancel_flag is not None and cancel_flag.is_set():
+        raise CancelledError()
+
+
+def on_cancel(cancel_flag, callback):
+    """Đăng ký callback khi hủy, trả về hàm hủy đăng ký
+
+    threading.Event thường không có callback: bên gọi vẫn phải kiểm tra cờ định kỳ.
+    """
+    if isinstance(cancel_flag, CancellationToken):
+        return cancel_flag.on_cancel(callback)
+    return lambda: None
@@ -0,0 +1,201 @@
+"""
+FFmpeg Runner - Chạy FFmpeg có tiến trình, hủy được, stderr giới hạn
+"""
+
+import re
+import subprocess
+import threading
+from collections import deque
+
+from config import Config
+from .cancellation import CancelledError, on_cancel
+
+_PROGRESS_LINE = re.compile(r'^([a-z_0-9]+)=(.*)$')
+_DURATION_LINE = re.compile(r'Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)')
+
+
+class FFmpegError(Exception):
+    """FFmpeg thoát với mã lỗi"""
+
+    def __init__(self, returncode, stderr_tail):
+        self.returncode = returncode
+        self.stderr_tail = stderr_tail
+        last_lines = "\n".join(stderr_tail[-5:])
+        super().__init__(f"FFmpeg lỗi (mã {returncode}):\n{last_lines}")
+
+
+class FFmpegRunner:
+    """Chạy một lệnh FFmpeg với -progress pipe:2 và theo dõi cancel_flag
+
+    stdout_sink: object có write(chunk) nhận stdout theo từng khối ngay khi đọc được (chunk là
+    memoryview của buffer dùng lại, chỉ hợp lệ trong lần gọi), thay cho capture_stdout (bytes).
+    """
+
+    def __init__(self, cmd, duration=None, on_progress=None, cancel_flag=None,
+                 capture_stdout=False, stdout_sink=None):
+        # -progress là option toàn cục, đặt ngay sau tên chương trình
+        self.cmd = [cmd[0], '-progress', 'pipe:2', '-nostats'] + list(cmd[1:])
+        self.duration = duration
+        self.on_progress = on_progress
+        self.cancel_flag = cancel_flag
+        self.capture_stdout = capture_stdout
+        self.stdout_sink = stdout_sink
+        self.stderr_tail = deque(maxlen=Config.FFMPEG_STDERR_LINES)
+        self.process = None
+        self._stdout_chunks = []
+        self._stdout_error = None
+        self._progress = {}
+
+    def run(self):
+        """Chạy FFmpeg, trả về stdout (bytes) nếu capture_stdout"""
+        read_stdout = self.capture_stdout or self.stdout_sink is not None
+        self.process = subprocess.Popen(
+            self.cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE if read_stdout else subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        )
+
+        readers = [threading.Thread(target=self._read_stderr, daemon=True)]
+        if read_stdout:
+            readers.append(threading.Thread(target=self._read_stdout, daemon=True))
+        for reader in readers:
+            reader.start()
+
+        # CancellationToken: dừng FFmpeg ngay khi hủy, không đợi tới lần kiểm tra cờ kế tiếp
+        unregister = on_cancel(self.cancel_flag, self.signal_stop)
+        try:
+            cancelled = self._wait()
+        finally:
+            unregister()
+
+        for reader in readers:
+            reader.join()
+
+        if cancelled:
+            raise CancelledError()
+
+        if self._stdout_error is not None:
+            raise self._stdout_error
+
+        if self.process.returncode != 0:
+            raise FFmpegError(self.process.returncode, list(self.stderr_tail))
+
+        if self.capture_stdout and self.stdout_sink is None:
+            return b''.join(self._stdout_chunks)
+        return None
+
+    def _wait(self):
+        """Đợi FFmpeg kết thúc, dừng tiến trình con nếu bị hủy"""
+        while True:
+            try:
+                self.process.wait(timeout=Config.FFMPEG_POLL_INTERVAL)
+                # Bị dừng bởi callback hủy -> báo hủy, không phải lỗi FFmpeg
+                return bool(self.cancel_flag and self.cancel_flag.is_set())
+            except subprocess.TimeoutExpired:
+                pass
+
+            if self.cancel_flag and self.cancel_flag.is_set():
+                self.terminate()
+                return True
+
+    def signal_stop(self):
+        """Gửi tín hiệu dừng, không chờ (gọi từ thread bấm hủy, ví dụ GUI)"""
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+
+    def terminate(self):
+        """Dừng FFmpeg trong thời gian giới hạn (terminate rồi kill)"""
+        if self.process is None or self.process.poll() is not None:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=Config.FFMPEG_TERMINATE_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+    def _read_stdout(self):
+        """Đọc stdout theo từng khối để FFmpeg không bị nghẽn pipe"""
+        stream = self.process.stdout
+        if self.stdout_sink is None:
+            while True:
+                chunk = stream.read(Config.FFMPEG_READ_CHUNK)
+                if not chunk:
+                    break
+                self._stdout_chunks.append(chunk)
+            return
+
+        # Một buffer dùng lại cho mọi khối, sink xử lý xong mới đọc khối tiếp
+        buffer = bytearray(Config.FFMPEG_READ_CHUNK)
+        view = memoryview(buffer)
+        try:
+            while True:
+                size = stream.readinto(buffer)
+                if not size:
+                    break
+                self.stdout_sink.write(view[:size])
+        except Exception as e:
+            # Sink lỗi (ví dụ hết bộ nhớ): dừng FFmpeg, không để tiến trình nghẽn pipe
+            self._stdout_error = e
+            self.signal_stop()
+            stream.read()
+
+    def _read_stderr(self):
+        """Tách dòng -progress (key=value) khỏi log, log chỉ giữ N dòng cuối"""
+        for raw in self.process.stderr:
+            line = raw.decode('utf-8', errors='replace').rstrip()
+            match = _PROGRESS_LINE.match(line)
+            if not match:
+                if line:
+                    self.stderr_tail.append(line)
+                if self.duration is None:
+                    self._parse_duration(line)
+                continue
+
+            key, value = match.groups()
+            self._progress[key] = value
+            if key == 'progress':
+                self._report_progress()
+
+    def _parse_duration(self, line):
+        """Lấy thời lượng input từ log FFmpeg khi chưa biết trước"""
+        match = _DURATION_LINE.search(line)
+        if match:
+            hours, minutes, seconds = match.groups()
+            self.duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    def _report_progress(self):
+        """Gọi on_progress(fraction, speed) sau mỗi block tiến trình"""
+        if not self.on_progress:
+            return
+        if self.cancel_flag and self.cancel_flag.is_set():
+            return
+
+        fraction = None
+        out_time_us = self._progress.get('out_time_us') or self._progress.get('out_time_ms')
+        if self.duration and out_time_us and out_time_us.lstrip('-').isdigit():
+            # out_time_ms thực chất cũng là micro giây (quirk của FFmpeg)
+            fraction = min(max(int(out_time_us) / 1e6 / self.duration, 0.0), 1.0)
+        if self._progress.get('progress') == 'end':
+            fraction = 1.0
+
+        speed = self._progress.get('speed', '').strip()
+        if speed in ('', 'N/A'):
+            speed = None
+
+        self.on_progress(fraction, speed)
+
+
+def run_ffmpeg(cmd, duration=None, on_progress=None, cancel_flag=None, capture_stdout=False,
+               stdout_sink=None):
+    """Chạy lệnh FFmpeg qua FFmpegRunner"""
+    runner = FFmpegRunner(
+        cmd,
+        duration=duration,
+        on_progress=on_progress,
+        cancel_flag=cancel_flag,
+        capture_stdout=capture_stdout,
+        stdout_sink=stdout_sink
+    )
+    return runner.run()
@@ -7,6 +7,10 @@ import sys
 import os
 from pathlib import Path
 
+import numpy as np
+
+from .media_probe import probe_media, MediaProbeError
+
 def check_ffmpeg():
     """Kiểm tra FFmpeg đã cài đặt chưa"""
     try:
@@ -54,29 +58,89 @@ def open_folder(folder_path):
     except Exception:
         return False
 
+def seconds_to_units(seconds, per_second):
+    """Làm tròn thời điểm (giây) tới số nguyên đơn vị (1000: mili giây, 100: centi giây)
+
+    Làm tròn nửa lên theo giá trị chính xác của số float (không cắt bớt: 2.9999 giây ->
+    3000 ms; không có sai số của phép nhân float), giá trị âm thành 0.
+    """
+    numerator, denominator = float(seconds).as_integer_ratio()
+    return max(0, (2 * numerator * per_second + denominator) // (2 * denominator))
+
+def seconds_to_units_batch(seconds, per_second):
+    """Như seconds_to_units cho cả mảng thời điểm (thời điểm < 2^52 giây), trả về mảng int64"""
+    values = np.maximum(np.asarray(seconds, dtype=np.float64).ravel(), 0.0)
+    # values = mantissa * 2^exponent = numerator / 2^shift, numerator nguyên 53 bit (chính xác)
+    mantissa, exponent = np.frexp(values)
+    numerator = (mantissa * 2.0 ** 53).astype(np.uint64) * np.uint64(per_second)
+    shift = 53 - exponent.astype(np.int64)
+    units = np.zeros(len(values), dtype=np.uint64)
+    # shift >= 64: values < 2^-11 giây, làm tròn về 0
+    exact = shift < 64
+    shift = shift[exact].astype(np.uint64)
+    units[exact] = (numerator[exact] + (np.uint64(1) << (shift - np.uint64(1)))) >> shift
+    return units.astype(np.int64)
+
+def _format_clock(units, per_second, separator, frac_digits, hour_digits):
+    """h:mm:ss<separator>fraction từ số nguyên đơn vị"""
+    hours, rest = divmod(units, 3600 * per_second)
+    minutes, rest = divmod(rest, 60 * per_second)
+    secs, frac = divmod(rest, per_second)
+    return f"{hours:0{hour_digits}d}:{minutes:02d}:{secs:02d}{separator}{frac:0{frac_digits}d}"
+
+def _format_clock_batch(seconds, per_second, separator, frac_digits, hour_digits):
+    """Như _format_clock cho cả mảng thời điểm: ghép từng chữ số bằng NumPy, trả về list str
+
+    Giờ vượt quá hour_digits chữ số (video rất dài) được format riêng từng giá trị.
+    """
+    units = seconds_to_units_batch(seconds, per_second)
+    hours, rest = np.divmod(units, 3600 * per_second)
+    minutes, rest = np.divmod(rest, 60 * per_second)
+    secs, frac = np.divmod(rest, per_second)
+
+    fields = [(hours, hour_digits), (":", 1), (minutes, 2), (":", 1), (secs, 2),
+              (separator, 1), (frac, frac_digits)]
+    width = sum(size for _, size in fields)
+    chars = np.empty((len(units), width), dtype=np.uint8)
+    column = 0
+    for value, size in fields:
+        if isinstance(value, str):
+            chars[:, column] = ord(value)
+        else:
+            for power in range(size - 1, -1, -1):
+                chars[:, column] = value // 10 ** power % 10 + ord("0")
+                column += 1
+            continue
+        column += 1
+
+    formatted = chars.view(f"S{width}").ravel().astype(f"U{width}").tolist()
+    for index in np.flatnonzero(hours >= 10 ** hour_digits).tolist():
+        formatted[index] = _format_clock(int(units[index]), per_second, separator, frac_digits, hour_digits)
+    return formatted
+
 def format_timestamp_srt(seconds):
     """Chuyển đổi giây sang timestamp SRT (00:00:00,000)"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    millis = int((seconds % 1) * 1000)
-    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+    return _format_clock(seconds_to_units(seconds, 1000), 1000, ",", 3, 2)
 
 def format_timestamp_vtt(seconds):
     """Chuyển đổi giây sang timestamp VTT (00:00:00.000)"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    millis = int((seconds % 1) * 1000)
-    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}"
+    return _format_clock(seconds_to_units(seconds, 1000), 1000, ".", 3, 2)
 
 def format_timestamp_ass(seconds):
     """Chuyển đổi giây sang timestamp ASS (0:00:00.00)"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    centisecs = int((seconds % 1) * 100)
-    return f"{hours}:{minutes:02d}:{secs:02d}.{centisecs:02d}"
+    return _format_clock(seconds_to_units(seconds, 100), 100, ".", 2, 1)
+
+def format_timestamps_srt(seconds):
+    """Timestamp SRT cho cả mảng thời điểm (giống hệt format_timestamp_srt từng giá trị)"""
+    return _format_clock_batch(seconds, 1000, ",", 3, 2)
+
+def format_timestamps_vtt(seconds):
+    """Timestamp VTT cho cả mảng thời điểm (giống hệt format_timestamp_vtt từng giá trị)"""
+    return _format_clock_batch(seconds, 1000, ".", 3, 2)
+
+def format_timestamps_ass(seconds):
+    """Timestamp ASS cho cả mảng thời điểm (giống hệt format_timestamp_ass từng giá trị)"""
+    return _format_clock_batch(seconds, 100, ".", 2, 1)
 
 def sanitize_path(path):
     """Làm sạch đường dẫn cho FFmpeg"""
@@ -114,6 +178,21 @@ def validate_video_file(file_path):
     if os.path.getsize(file_path) == 0:
         return False, "File rỗng"
     
+    # Đọc metadata bằng ffprobe để loại sớm file hỏng/cắt cụt/không có âm thanh
+    try:
+        info = probe_media(file_path)
+    except FileNotFoundError:
+        # Không có ffprobe -> chỉ kiểm tra cơ bản như trên
+        return True, "OK"
+    except (MediaProbeError, OSError) as e:
+        return False, f"File hỏng hoặc không đọc được ({str(e)})"
+    
+    if not info.has_audio:
+        return False, "Video không có âm thanh"
+    
+    if info.duration <= 0:
+        return False, "Không xác định được thời lượng video"
+    
     return True, "OK"
 
 def format_time_duration(seconds):
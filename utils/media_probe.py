@@ -0,0 +1,136 @@
+"""
+Media Probe - Đọc metadata video bằng ffprobe (có cache)
+"""
+
+import json
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+
+from config import Config
+
+
+class MediaProbeError(Exception):
+    """ffprobe không đọc được file"""
+
+
+class MediaInfo:
+    """Metadata của một file media: thời lượng, streams, codec, bitrate"""
+
+    def __init__(self, path, data):
+        self.path = path
+        self.data = data
+        fmt = data.get('format', {})
+        self.format_name = fmt.get('format_name', '')
+        self.duration = _to_float(fmt.get('duration'))
+        self.bit_rate = _to_int(fmt.get('bit_rate'))
+        self.streams = data.get('streams', [])
+        self.video_streams = [s for s in self.streams if s.get('codec_type') == 'video']
+        self.audio_streams = [s for s in self.streams if s.get('codec_type') == 'audio']
+
+        # Một số container không ghi duration ở format -> lấy từ stream dài nhất
+        if not self.duration:
+            durations = [_to_float(s.get('duration')) for s in self.streams]
+            self.duration = max([d for d in durations if d] or [0.0])
+
+    @property
+    def has_audio(self):
+        return bool(self.audio_streams)
+
+    @property
+    def video_codec(self):
+        return self.video_streams[0].get('codec_name') if self.video_streams else None
+
+    def best_audio_stream(self, languages=None):
+        """Chọn audio track (chỉ số trong các audio stream, dùng cho -map 0:a:N)"""
+        if not self.audio_streams:
+            return None
+        languages = languages or Config.PREFERRED_AUDIO_LANGUAGES
+
+        def score(item):
+            index, stream = item
+            tags = stream.get('tags', {})
+            disposition = stream.get('disposition', {})
+            language = tags.get('language', '').lower()
+            return (
+                language in languages,
+                bool(disposition.get('default')),
+                int(stream.get('channels') or 0),
+                -index
+            )
+
+        index, _ = max(enumerate(self.audio_streams), key=score)
+        return index
+
+    def describe(self):
+        """Mô tả ngắn gọn để log"""
+        parts = [f"{self.duration:.1f}s"]
+        if self.video_codec:
+            parts.append(f"video {self.video_codec}")
+        if self.audio_streams:
+            codecs = ", ".join(s.get('codec_name', '?') for s in self.audio_streams)
+            parts.append(f"{len(self.audio_streams)} audio ({codecs})")
+        if self.bit_rate:
+            parts.append(f"{self.bit_rate // 1000} kb/s")
+        return " | ".join(parts)
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def probe_media(path):
+    """Chạy ffprobe một lần cho mỗi file (cache theo path + mtime + size)"""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    cmd = [
+        'ffprobe', '-v', 'error',
+        '-print_format', 'json',
+        '-show_format', '-show_streams',
+        path
+    ]
+    try:
+        result = subprocess.run(
+            cmd,
+            capture_output=True,
+            timeout=Config.PROBE_TIMEOUT
+        )
+    except subprocess.TimeoutExpired:
+        raise MediaProbeError("ffprobe quá thời gian chờ")
+
+    if result.returncode != 0:
+        message = result.stderr.decode('utf-8', errors='replace').strip().splitlines()
+        raise MediaProbeError(message[-1] if message else "ffprobe lỗi")
+
+    try:
+        info = MediaInfo(path, json.loads(result.stdout.decode('utf-8', errors='replace')))
+    except ValueError:
+        raise MediaProbeError("Không đọc được kết quả ffprobe")
+
+    with _cache_lock:
+        _cache[key] = info
+        while len(_cache) > Config.PROBE_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+    return info
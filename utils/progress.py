@@ -0,0 +1,56 @@
+"""
+Progress Tracker - Tính % hoàn thành và thời gian còn lại theo khối lượng từng bước
+"""
+
+import time
+
+from config import Config
+
+
+class ProgressTracker:
+    """Chia thanh progress theo thời gian ước tính của từng bước, hiệu chỉnh theo thực tế"""
+
+    def __init__(self, estimates):
+        # estimates: [(stage, số giây ước tính), ...] theo thứ tự thực hiện
+        self.stages = [name for name, _ in estimates]
+        self.estimates = dict(estimates)
+        self.total = sum(self.estimates.values()) or 1.0
+        self.done = {name: 0.0 for name in self.stages}
+        self.started = time.time()
+
+    @classmethod
+    def for_job(cls, duration, model_size, embed, workers=1, languages=1):
+        """Ước tính thời gian từng bước từ thời lượng video (ffprobe)"""
+        rtf = Config.ESTIMATE_WHISPER_RTF.get(model_size, 1.0)
+        segments = duration / 60.0 * Config.ESTIMATE_SEGMENTS_PER_MINUTE
+        estimates = [
+            ('audio', duration / Config.ESTIMATE_AUDIO_SPEED),
+            ('transcribe', duration * rtf / max(1, workers)),
+            ('translate', segments * languages * Config.ESTIMATE_TRANSLATE_SECONDS / Config.MAX_WORKERS),
+            ('subtitle', 1.0),
+        ]
+        if embed:
+            estimates.append(('embed', duration / Config.ESTIMATE_EMBED_SPEED))
+        return cls(estimates)
+
+    def percent(self):
+        """% hoàn thành theo khối lượng công việc"""
+        finished = sum(self.estimates[name] * self.done[name] for name in self.stages)
+        return min(100.0, finished / self.total * 100.0)
+
+    def update(self, stage, fraction):
+        """Cập nhật tiến độ của một bước, trả về (percent, số giây còn lại hoặc None)"""
+        if stage in self.done:
+            self.done[stage] = min(max(fraction, self.done[stage]), 1.0)
+        return self.percent(), self.eta()
+
+    def eta(self):
+        """Thời gian còn lại: phần việc còn lại x tốc độ thực tế đã đo"""
+        percent = self.percent()
+        if percent <= 0 or percent >= 100:
+            return None
+        elapsed = time.time() - self.started
+        # Quá sớm để tin tốc độ thực tế -> dùng ước tính ban đầu
+        if percent < Config.ETA_MIN_PERCENT:
+            return self.total * (100.0 - percent) / 100.0
+        return elapsed * (100.0 - percent) / percent
@@ -42,7 +42,7 @@ class SettingsManager:
         return {
             "model": Config.DEFAULT_MODEL,
             "embed": False,
-            "target_lang": Config.DEFAULT_LANGUAGE,
+            "target_langs": [Config.DEFAULT_LANGUAGE],
             "export_format": Config.DEFAULT_FORMAT,
             "last_directory": str(Path.home()),
             "window_geometry": None
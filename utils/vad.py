@@ -0,0 +1,200 @@
+"""
+Voice Activity Detection - Lọc khoảng lặng/nhạc nền trước khi phiên âm
+"""
+
+import numpy as np
+
+from config import Config
+
+# Số frame xử lý mỗi lần, giới hạn bộ nhớ tạm với video nhiều giờ
+_BLOCK_FRAMES = 20000
+
+
+def frame_features(audio, sample_rate=None, frame_ms=None):
+    """Tính năng lượng (dBFS) và tỉ lệ zero-crossing cho từng frame"""
+    sample_rate = sample_rate or Config.AUDIO_SAMPLE_RATE
+    frame_len = int(sample_rate * (frame_ms or Config.VAD_FRAME_MS) / 1000)
+    n_frames = len(audio) // frame_len
+
+    energy_db = np.empty(n_frames, dtype=np.float32)
+    zcr = np.empty(n_frames, dtype=np.float32)
+
+    for start in range(0, n_frames, _BLOCK_FRAMES):
+        stop = min(start + _BLOCK_FRAMES, n_frames)
+        frames = np.asarray(audio[start * frame_len:stop * frame_len], dtype=np.float32)
+        frames = frames.reshape(stop - start, frame_len)
+
+        power = np.einsum('ij,ij->i', frames, frames) / frame_len
+        energy_db[start:stop] = 10.0 * np.log10(power + 1e-10)
+
+        crossings = np.count_nonzero(np.diff(np.signbit(frames), axis=1), axis=1)
+        zcr[start:stop] = crossings / (frame_len - 1)
+
+    return energy_db, zcr
+
+
+def energy_modulation(energy_db, window):
+    """Trung vị |Δ năng lượng| giữa các frame liên tiếp trong cửa sổ trượt
+
+    Giọng nói lên xuống theo âm tiết nên dao động lớn; nhạc nền/âm kéo dài thì đều.
+    Dùng trung vị để một bước nhảy đơn lẻ (bắt đầu/kết thúc nhạc) không bị tính là dao động.
+    """
+    n = len(energy_db)
+    if n == 0:
+        return energy_db
+    window = max(1, min(window, n))
+    delta = np.abs(np.diff(energy_db, prepend=energy_db[0]))
+
+    half = window // 2
+    padded = np.pad(delta, (half, window - 1 - half), mode='edge')
+    result = np.empty(n, dtype=np.float32)
+    for start in range(0, n, _BLOCK_FRAMES):
+        stop = min(start + _BLOCK_FRAMES, n)
+        windows = np.lib.stride_tricks.sliding_window_view(padded[start:stop + window - 1], window)
+        result[start:stop] = np.median(windows, axis=1)
+    return result
+
+
+def mask_to_regions(mask):
+    """Chuyển mảng bool theo frame thành danh sách (frame_start, frame_end)"""
+    padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+    edges = np.diff(padded)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def merge_regions(regions, max_gap):
+    """Gộp các vùng cách nhau không quá max_gap"""
+    merged = []
+    for start, end in regions:
+        if merged and start - merged[-1][1] <= max_gap:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def detect_speech_regions(audio, sample_rate=None):
+    """Tìm các vùng có giọng nói, trả về [(start_sec, end_sec), ...]"""
+    sample_rate = sample_rate or Config.AUDIO_SAMPLE_RATE
+    frame_sec = Config.VAD_FRAME_MS / 1000.0
+    duration = len(audio) / float(sample_rate)
+
+    energy_db, zcr = frame_features(audio, sample_rate)
+    if len(energy_db) == 0:
+        return []
+
+    # Ngưỡng thích nghi: nền nhiễu (percentile thấp) + margin, không dưới mức tuyệt đối
+    noise_floor = float(np.percentile(energy_db, Config.VAD_NOISE_PERCENTILE))
+    threshold = max(noise_floor + Config.VAD_ENERGY_MARGIN_DB, Config.VAD_MIN_ENERGY_DB)
+
+    mask = (energy_db > threshold) & (zcr <= Config.VAD_MAX_ZCR)
+
+    if Config.VAD_MIN_MODULATION_DB > 0:
+        window = int(Config.VAD_MODULATION_WINDOW_MS / Config.VAD_FRAME_MS)
+        mask &= energy_modulation(energy_db, window) >= Config.VAD_MIN_MODULATION_DB
+
+    frames = mask_to_regions(mask)
+    frames = merge_regions(frames, Config.VAD_MERGE_GAP_MS / Config.VAD_FRAME_MS)
+
+    min_frames = Config.VAD_MIN_SPEECH_MS / Config.VAD_FRAME_MS
+    padding = Config.VAD_PADDING_MS / 1000.0
+
+    regions = []
+    for start, end in frames:
+        if end - start < min_frames:
+            continue
+        regions.append((
+            max(0.0, start * frame_sec - padding),
+            min(duration, end * frame_sec + padding)
+        ))
+
+    # Padding có thể làm các vùng chồng lên nhau
+    return merge_regions(regions, 0.0)
+
+
+class TimelineMap:
+    """Ánh xạ thời gian trên audio đã ghép các vùng giọng nói về timeline gốc"""
+
+    def __init__(self, regions):
+        self.orig_starts = np.array([start for start, _ in regions], dtype=np.float64)
+        lengths = np.array([end - start for start, end in regions], dtype=np.float64)
+        self.lengths = lengths
+        self.concat_starts = np.concatenate(([0.0], np.cumsum(lengths)[:-1])) if len(regions) else lengths
+
+    def to_original(self, t, is_end=False):
+        """Đổi thời điểm t (giây trên audio đã ghép) sang timeline gốc"""
+        if len(self.orig_starts) == 0:
+            return t
+        # Điểm kết thúc đúng tại chỗ nối thuộc về vùng trước đó
+        side = 'left' if is_end else 'right'
+        idx = int(np.searchsorted(self.concat_starts, t, side=side)) - 1
+        idx = min(max(idx, 0), len(self.orig_starts) - 1)
+        offset = min(max(t - self.concat_starts[idx], 0.0), self.lengths[idx])
+        return float(self.orig_starts[idx] + offset)
+
+    def remap_segments(self, segments):
+        """Cập nhật start/end của các segment Whisper về timeline gốc"""
+        for seg in segments:
+            seg['start'] = self.to_original(seg['start'])
+            seg['end'] = max(seg['start'], self.to_original(seg['end'], is_end=True))
+        return segments
+
+
+def concat_regions(audio, regions, sample_rate=None):
+    """Ghép các vùng giọng nói thành một mảng, kèm TimelineMap để map ngược"""
+    sample_rate = sample_rate or Config.AUDIO_SAMPLE_RATE
+    pieces = []
+    sample_regions = []
+    for start, end in regions:
+        s = int(round(start * sample_rate))
+        e = int(round(end * sample_rate))
+        pieces.append(audio[s:e])
+        sample_regions.append((s / sample_rate, e / sample_rate))
+
+    if pieces:
+        speech = np.concatenate(pieces).astype(np.float32, copy=False)
+    else:
+        speech = np.zeros(0, dtype=np.float32)
+
+    return speech, TimelineMap(sample_regions)
+
+
+def split_long_regions(regions, max_seconds):
+    """Cắt các vùng dài hơn max_seconds thành nhiều đoạn"""
+    result = []
+    for start, end in regions:
+        while end - start > max_seconds:
+            result.append((start, start + max_seconds))
+            start += max_seconds
+        result.append((start, end))
+    return result
+
+
+def plan_chunks(regions, chunk_seconds, duration=None):
+    """Chia audio thành các chunk dài tối đa chunk_seconds, cắt tại khoảng lặng
+
+    Trả về danh sách chunk, mỗi chunk là danh sách vùng [(start, end), ...].
+    Nếu truyền duration, các chunk phủ liền mạch toàn bộ audio (cắt ở giữa khoảng lặng)
+    thay vì chỉ chứa các vùng giọng nói.
+    """
+    groups = []
+    for start, end in split_long_regions(regions, chunk_seconds):
+        if groups and end - groups[-1][0][0] <= chunk_seconds:
+            groups[-1].append((start, end))
+        else:
+            groups.append([(start, end)])
+
+    if duration is None:
+        return groups
+
+    if not groups:
+        cuts = list(np.arange(0.0, duration, chunk_seconds)) + [duration]
+    else:
+        cuts = [0.0]
+        for prev, nxt in zip(groups, groups[1:]):
+            cuts.append((prev[-1][1] + nxt[0][0]) / 2.0)
+        cuts.append(duration)
+
+    return [[(float(s), float(e))] for s, e in zip(cuts, cuts[1:]) if e > s]